@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core import pdf
+
+
+class Command(BaseCommand):
+    help = "Muestra el uso en disco de la caché de PDFs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Elimina todos los PDFs en caché",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            removed = pdf.evict(0)
+            self.stdout.write(self.style.SUCCESS(f"{removed} PDFs eliminados de la caché"))
+            return
+
+        # Los aciertos/fallos se cuentan en cada worker web: ver /api/orders/pdf-cache-stats/
+        stats = pdf.stats()
+        self.stdout.write(
+            f"Archivos: {stats['files']} ({stats['size_bytes'] / 1024 / 1024:.1f} MB "
+            f"de {settings.PDF_CACHE_MAX_BYTES / 1024 / 1024:.0f} MB)"
+        )
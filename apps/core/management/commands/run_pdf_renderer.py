@@ -0,0 +1,49 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.pdf_renderer import serve
+
+
+class Command(BaseCommand):
+    help = "Inicia el servicio de renderizado de PDFs con un pool de procesos dedicado"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address",
+            default=settings.PDF_RENDER_ADDRESS,
+            help='Dirección de escucha ("unix:/ruta/al/socket" o "host:puerto"); por defecto PDF_RENDER_ADDRESS',
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.PDF_RENDER_WORKERS,
+            help="Cantidad de procesos de renderizado (máximo de PDFs en paralelo)",
+        )
+        parser.add_argument(
+            "--max-queue",
+            type=int,
+            default=settings.PDF_RENDER_MAX_QUEUE,
+            help="Trabajos que pueden esperar en cola antes de rechazar nuevos",
+        )
+
+    def handle(self, *args, **options):
+        if not options["address"]:
+            raise CommandError("Configure PDF_RENDER_ADDRESS o use --address")
+        if options["workers"] < 1:
+            raise CommandError("--workers debe ser al menos 1")
+
+        # Las métricas de cola y renderizado se reportan por logging
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Servicio de PDFs en {options['address']} "
+                f"({options['workers']} procesos, cola máxima {options['max_queue']})"
+            )
+        )
+        try:
+            serve(options["address"], options["workers"], options["max_queue"])
+        except KeyboardInterrupt:
+            self.stdout.write("Servicio de PDFs detenido")
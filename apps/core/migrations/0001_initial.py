@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Sequence",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("scope", models.CharField(max_length=100, unique=True, verbose_name="Ámbito")),
+                ("last_value", models.BigIntegerField(default=0, verbose_name="Último Valor")),
+            ],
+            options={
+                "verbose_name": "Sequence",
+                "verbose_name_plural": "Sequences",
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:10
+
+from django.db import migrations
+
+
+def remove_pdf_cache_counters(apps, schema_editor):
+    # Los aciertos/fallos de la caché de PDFs ahora se cuentan en memoria (apps.core.pdf.stats)
+    Sequence = apps.get_model("core", "Sequence")
+    Sequence.objects.filter(scope__in=["pdf_cache:hits", "pdf_cache:misses"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_pdf_cache_counters, migrations.RunPython.noop),
+    ]
@@ -12,3 +12,20 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Sequence(models.Model):
+    """
+    Contador atómico por ámbito (ej: "order:20261017", "exam:EX").
+    Ver apps.core.sequences para la asignación de valores.
+    """
+
+    scope = models.CharField(max_length=100, unique=True, verbose_name="Ámbito")
+    last_value = models.BigIntegerField(default=0, verbose_name="Último Valor")
+
+    class Meta:
+        verbose_name = "Sequence"
+        verbose_name_plural = "Sequences"
+
+    def __str__(self):
+        return f"{self.scope}: {self.last_value}"
@@ -0,0 +1,140 @@
+"""
+Paginación por cursor (keyset) para los listados
+
+En lugar de OFFSET + COUNT(*), cada página se obtiene con
+WHERE (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC LIMIT n,
+por lo que el costo no depende de qué tan profunda sea la página. El cursor es
+opaco para el usuario (base64 de created_at, id y la dirección).
+
+El total es opcional: exacto hasta un límite (COUNT sobre una subconsulta con
+LIMIT) o estimado con las estadísticas de PostgreSQL cuando no hay filtros.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db import connection, models
+
+CURSOR_PARAM = "cursor"
+
+# Direcciones del cursor: páginas posteriores o anteriores a la fila del cursor
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def encode_cursor(created_at, pk, direction):
+    payload = json.dumps([created_at.isoformat(), pk, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple (created_at, pk, direction) o None si el cursor es inválido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return datetime.fromisoformat(created_at), int(pk), direction
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        return None
+
+
+class CursorPage:
+    """Página de resultados con los enlaces a la página anterior y siguiente"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, next_url, previous_url):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_url = next_url
+        self.previous_url = previous_url
+        self.count = None
+        self.count_is_capped = False
+        self.count_is_estimate = False
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginationMixin:
+    """
+    Reemplaza la paginación por OFFSET de ListView por paginación por cursor sobre (created_at, id).
+
+    El queryset de la vista se reordena por -created_at, -id. Los demás parámetros
+    GET (filtros) se conservan en los enlaces.
+
+    Atributos:
+        paginate_by: Tamaño de página (igual que en ListView)
+        cursor_count: None (sin total), "capped" (exacto hasta cursor_count_limit)
+            o "estimated" (estadísticas de PostgreSQL si no hay filtros; si no, "capped")
+        cursor_count_limit: Máximo de filas a contar con "capped"
+    """
+
+    cursor_count = "capped"
+    cursor_count_limit = 1000
+
+    def paginate_queryset(self, queryset, page_size):
+        decoded = decode_cursor(self.request.GET.get(CURSOR_PARAM, ""))
+
+        if decoded is None:
+            rows = list(queryset.order_by("-created_at", "-id")[: page_size + 1])
+            has_next = len(rows) > page_size
+            has_previous = False
+            rows = rows[:page_size]
+        else:
+            created_at, pk, direction = decoded
+            if direction == NEXT:
+                after = models.Q(created_at__lt=created_at) | models.Q(created_at=created_at, id__lt=pk)
+                rows = list(queryset.filter(after).order_by("-created_at", "-id")[: page_size + 1])
+                has_next = len(rows) > page_size
+                has_previous = True
+                rows = rows[:page_size]
+            else:
+                before = models.Q(created_at__gt=created_at) | models.Q(created_at=created_at, id__gt=pk)
+                rows = list(queryset.filter(before).order_by("created_at", "id")[: page_size + 1])
+                has_previous = len(rows) > page_size
+                has_next = True
+                rows = rows[:page_size][::-1]
+
+        next_url = (
+            self._cursor_url(encode_cursor(rows[-1].created_at, rows[-1].pk, NEXT)) if has_next and rows else None
+        )
+        previous_url = None
+        if has_previous and rows:
+            previous_url = self._cursor_url(encode_cursor(rows[0].created_at, rows[0].pk, PREVIOUS))
+
+        page = CursorPage(rows, has_next, has_previous, next_url, previous_url)
+        if self.cursor_count:
+            self._set_count(page, queryset)
+
+        return None, page, rows, page.has_other_pages()
+
+    def _cursor_url(self, cursor):
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        params[CURSOR_PARAM] = cursor
+        return f"?{params.urlencode()}"
+
+    def _set_count(self, page, queryset):
+        if self.cursor_count == "estimated" and connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                page.count = row[0]
+                page.count_is_estimate = True
+                return
+
+        # COUNT(*) sobre una subconsulta con LIMIT: nunca recorre más de cursor_count_limit + 1 filas
+        count = queryset.order_by()[: self.cursor_count_limit + 1].count()
+        page.count = min(count, self.cursor_count_limit)
+        page.count_is_capped = count > self.cursor_count_limit
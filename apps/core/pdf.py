@@ -0,0 +1,229 @@
+"""
+Renderizado de PDFs con caché en disco
+
+Cada PDF se guarda en MEDIA_ROOT/pdf_cache/ con nombre igual al hash de sus
+datos de entrada más la versión del template, por lo que cualquier cambio en
+los datos o en el template genera una clave nueva y el PDF anterior deja de
+usarse. El directorio se limita a PDF_CACHE_MAX_BYTES eliminando primero los
+archivos usados hace más tiempo (LRU por fecha de modificación, que se
+actualiza en cada acierto).
+
+Los aciertos y fallos se cuentan en memoria en cada proceso (stats(), ver
+pdf_cache_stats_api): una reimpresión no escribe en la base de datos.
+
+Si PDF_RENDER_ADDRESS está configurado, los PDFs se generan en el servicio
+run_pdf_renderer (ver apps.core.pdf_renderer) en lugar del worker web. Solo si
+no se puede conectar con el servicio se renderiza en el proceso como antes; si
+el trabajo ya se envió y falla o no responde a tiempo, se propaga
+PdfRenderError (las vistas responden 503) para no sumar un segundo
+renderizado completo al tiempo ya esperado.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import get_template, render_to_string
+from weasyprint import HTML
+
+from apps.core.pdf_renderer import RenderTiming, render_remote
+
+logger = logging.getLogger(__name__)
+
+# Contadores de este proceso, para monitoreo (ver stats)
+_metrics = {"hits": 0, "misses": 0, "store_errors": 0}
+
+# Hash del código fuente de cada template, calculado una vez por proceso
+_template_versions = {}
+
+
+@dataclass
+class RenderedPdf:
+    content: bytes
+    cache_hit: bool
+    # Tiempos de cola y de renderizado; None si el PDF vino de la caché
+    timing: RenderTiming | None = None
+
+
+def render_pdf(template_name, context, key_parts):
+    """
+    Retorna el PDF del template, desde la caché si los datos no cambiaron.
+
+    Args:
+        template_name: Template HTML a renderizar
+        context: Contexto del template
+        key_parts: Datos (serializables a JSON) que determinan el contenido del PDF
+
+    Returns:
+        RenderedPdf
+
+    Raises:
+        PdfRenderError: Si el servicio de renderizado tiene la cola llena
+            (PdfRendererBusy), falló o no respondió a tiempo
+    """
+    path = cache_dir() / f"{cache_key(template_name, key_parts)}.pdf"
+
+    try:
+        pdf = path.read_bytes()
+    except FileNotFoundError:
+        pdf = None
+
+    if pdf is not None:
+        # Marcar como usado recientemente para la política LRU
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Otro worker lo eliminó entre la lectura y este punto
+            pass
+        _metrics["hits"] += 1
+        return RenderedPdf(pdf, cache_hit=True)
+
+    _metrics["misses"] += 1
+    html_string = render_to_string(template_name, context)
+    pdf, timing = render_html_to_pdf(html_string)
+
+    _store(path, pdf)
+    evict(settings.PDF_CACHE_MAX_BYTES)
+    return RenderedPdf(pdf, cache_hit=False, timing=timing)
+
+
+def render_html_to_pdf(html_string):
+    """
+    Genera el PDF con WeasyPrint con codificación UTF-8 explícita.
+
+    Returns:
+        tuple (pdf, RenderTiming)
+
+    Raises:
+        PdfRenderError: Si el servicio de renderizado rechazó, no pudo renderizar o no respondió
+    """
+    if settings.PDF_RENDER_ADDRESS:
+        try:
+            pdf, timing = render_remote(html_string)
+            logger.info(f"PDF renderizado: cola {timing.wait_ms:.0f} ms, render {timing.render_ms:.0f} ms")
+            return pdf, timing
+        except OSError:
+            # No se llegó a enviar el trabajo: renderizar aquí no duplica trabajo
+            logger.warning("Servicio de PDFs no disponible, renderizando en el proceso web", exc_info=True)
+
+    started_at = time.monotonic()
+    pdf = HTML(string=html_string, encoding="utf-8").write_pdf(presentational_hints=True, optimize_size=("fonts",))
+    return pdf, RenderTiming(wait_ms=0.0, render_ms=(time.monotonic() - started_at) * 1000)
+
+
+def pdf_response(rendered, filename):
+    """Respuesta inline con el PDF y encabezados de caché y tiempos de renderizado"""
+    response = HttpResponse(rendered.content, content_type="application/pdf; charset=utf-8")
+    response["Content-Disposition"] = f'inline; filename="{filename}"'
+    response["X-PDF-Cache"] = "hit" if rendered.cache_hit else "miss"
+    if rendered.timing:
+        response["X-PDF-Queue-Wait-Ms"] = f"{rendered.timing.wait_ms:.0f}"
+        response["X-PDF-Render-Ms"] = f"{rendered.timing.render_ms:.0f}"
+    return response
+
+
+def cache_key(template_name, key_parts):
+    payload = json.dumps([template_name, template_version(template_name), key_parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def template_version(template_name):
+    """Hash del código fuente del template (cambia al desplegar una nueva versión)"""
+    version = _template_versions.get(template_name)
+    if version is None:
+        source = get_template(template_name).template.source
+        version = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        _template_versions[template_name] = version
+    return version
+
+
+def cache_dir():
+    path = Path(settings.MEDIA_ROOT) / "pdf_cache"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def evict(max_bytes):
+    """
+    Elimina los PDFs usados hace más tiempo hasta que el directorio quede bajo max_bytes.
+
+    Returns:
+        int: Cantidad de archivos eliminados
+    """
+    entries = []
+    total_bytes = 0
+    with os.scandir(cache_dir()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+    removed = 0
+    if total_bytes <= max_bytes:
+        return removed
+
+    for _, size, file_path in sorted(entries):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            # Otro worker ya lo eliminó
+            pass
+        total_bytes -= size
+        removed += 1
+        if total_bytes <= max_bytes:
+            break
+    return removed
+
+
+def stats():
+    """Aciertos/fallos de la caché en este proceso y uso del directorio de caché"""
+    files = 0
+    size_bytes = 0
+    with os.scandir(cache_dir()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                files += 1
+                size_bytes += entry.stat().st_size
+
+    requests = _metrics["hits"] + _metrics["misses"]
+    return {
+        "hits": _metrics["hits"],
+        "misses": _metrics["misses"],
+        "hit_rate": round(_metrics["hits"] / requests, 4) if requests else 0.0,
+        "store_errors": _metrics["store_errors"],
+        "files": files,
+        "size_bytes": size_bytes,
+        "max_bytes": settings.PDF_CACHE_MAX_BYTES,
+    }
+
+
+def _store(path, pdf):
+    """
+    Guarda el PDF en la caché. Si no se puede (ej: disco lleno) el PDF se sirve
+    igual, solo queda sin cachear.
+    """
+    # Escritura atómica: otro worker nunca lee un PDF a medio escribir
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(pdf)
+        os.replace(tmp_path, path)
+        tmp_path = None
+    except OSError:
+        _metrics["store_errors"] += 1
+        logger.exception("No se pudo guardar el PDF en caché")
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,228 @@
+"""
+Servicio de renderizado de PDFs fuera de los workers web
+
+El comando run_pdf_renderer mantiene un pool de procesos con WeasyPrint y las
+fuentes ya cargadas, y recibe trabajos por un socket local
+(multiprocessing.connection). Los workers de gunicorn solo envían el HTML y
+esperan el PDF, por lo que una ráfaga de impresiones no los bloquea.
+
+El pool limita la concurrencia a PDF_RENDER_WORKERS procesos; hasta
+PDF_RENDER_MAX_QUEUE trabajos adicionales esperan en cola y los siguientes se
+rechazan. Por cada trabajo se mide por separado el tiempo en cola y el tiempo
+de renderizado.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Reciclar cada proceso después de esta cantidad de PDFs para acotar la memoria
+MAX_JOBS_PER_PROCESS = 500
+
+# Cada cuántos trabajos se registra el resumen de métricas
+METRICS_LOG_EVERY = 50
+
+
+class PdfRenderError(Exception):
+    """El servicio de renderizado no pudo generar el PDF"""
+
+
+class PdfRendererBusy(PdfRenderError):
+    """La cola del servicio de renderizado está llena"""
+
+
+@dataclass
+class RenderTiming:
+    wait_ms: float
+    render_ms: float
+
+
+def parse_address(address):
+    """
+    Convierte PDF_RENDER_ADDRESS en (address, family) para multiprocessing.connection.
+
+    Formatos: "unix:/ruta/al/socket" o "host:puerto"
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:") :], "AF_UNIX"
+    host, port = address.rsplit(":", 1)
+    return (host, int(port)), "AF_INET"
+
+
+def _authkey():
+    return settings.SECRET_KEY.encode("utf-8")
+
+
+# ==================== CLIENTE (workers web) ====================
+
+
+def render_remote(html_string):
+    """
+    Envía el HTML al servicio de renderizado y espera el PDF.
+
+    Returns:
+        tuple (pdf, RenderTiming)
+
+    Raises:
+        OSError: Si no se pudo conectar con el servicio (el trabajo no llegó a enviarse)
+        PdfRenderError: Si el servicio rechazó el trabajo, no pudo renderizarlo, no
+            respondió a tiempo o cerró la conexión antes de responder
+    """
+    address, family = parse_address(settings.PDF_RENDER_ADDRESS)
+    with Client(address, family=family, authkey=_authkey()) as conn:
+        try:
+            conn.send({"html": html_string})
+            if not conn.poll(settings.PDF_RENDER_TIMEOUT):
+                raise PdfRenderError("El servicio de impresión no respondió a tiempo")
+            response = conn.recv()
+        except (EOFError, OSError) as e:
+            # El servicio se cayó o reinició con el trabajo en curso
+            raise PdfRenderError("El servicio de impresión se interrumpió, intente nuevamente") from e
+
+    if response.get("busy"):
+        raise PdfRendererBusy("El servicio de impresión está ocupado, intente nuevamente")
+    if "error" in response:
+        raise PdfRenderError(response["error"])
+
+    return response["pdf"], RenderTiming(wait_ms=response["wait_ms"], render_ms=response["render_ms"])
+
+
+# ==================== SERVIDOR (run_pdf_renderer) ====================
+
+_font_config = None
+
+
+def _init_worker():
+    """Carga WeasyPrint y la configuración de fuentes una sola vez por proceso"""
+    global _font_config
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    _font_config = FontConfiguration()
+    HTML(string="<p>warmup</p>").write_pdf(font_config=_font_config)
+
+
+def _ping():
+    return True
+
+
+def _render_job(html_string, enqueued_at):
+    from weasyprint import HTML
+
+    started_at = time.time()
+    pdf = HTML(string=html_string, encoding="utf-8").write_pdf(
+        presentational_hints=True, optimize_size=("fonts",), font_config=_font_config
+    )
+    return pdf, started_at - enqueued_at, time.time() - started_at
+
+
+class RenderMetrics:
+    """Acumula tiempos de cola y de renderizado del servidor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.rejected = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.render_total = 0.0
+        self.render_max = 0.0
+
+    def record(self, wait, render):
+        with self._lock:
+            self.jobs += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.render_total += render
+            self.render_max = max(self.render_max, render)
+            if self.jobs % METRICS_LOG_EVERY == 0:
+                logger.info(self.summary())
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_failed(self):
+        with self._lock:
+            self.failed += 1
+
+    def summary(self):
+        jobs = self.jobs or 1
+        return (
+            f"PDFs: {self.jobs} ok, {self.failed} con error, {self.rejected} rechazados | "
+            f"cola prom {self.wait_total / jobs * 1000:.0f} ms (máx {self.wait_max * 1000:.0f} ms) | "
+            f"render prom {self.render_total / jobs * 1000:.0f} ms (máx {self.render_max * 1000:.0f} ms)"
+        )
+
+
+def serve(address, workers, max_queue):
+    """
+    Atiende trabajos de renderizado hasta que el proceso termine.
+
+    Args:
+        address: Dirección en formato de PDF_RENDER_ADDRESS
+        workers: Procesos de renderizado (límite de concurrencia)
+        max_queue: Trabajos que pueden esperar en cola además de los que se están renderizando
+    """
+    listen_address, family = parse_address(address)
+    if family == "AF_UNIX" and os.path.exists(listen_address):
+        # Socket de una ejecución anterior
+        os.remove(listen_address)
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, max_tasks_per_child=MAX_JOBS_PER_PROCESS)
+    # Levantar y precalentar todos los procesos antes de aceptar trabajos
+    for future in [pool.submit(_ping) for _ in range(workers)]:
+        future.result()
+
+    slots = threading.BoundedSemaphore(workers + max_queue)
+    metrics = RenderMetrics()
+
+    with Listener(listen_address, family=family, authkey=_authkey()) as listener:
+        logger.info(f"Servicio de PDFs escuchando en {address} con {workers} procesos")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    logger.warning("Conexión rechazada: clave de autenticación inválida")
+                    continue
+                threading.Thread(target=_handle, args=(conn, pool, slots, metrics), daemon=True).start()
+        finally:
+            logger.info(metrics.summary())
+            pool.shutdown(cancel_futures=True)
+
+
+def _handle(conn, pool, slots, metrics):
+    with conn:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+
+        if not slots.acquire(blocking=False):
+            metrics.record_rejected()
+            conn.send({"busy": True})
+            return
+
+        try:
+            pdf, wait, render = pool.submit(_render_job, request["html"], time.time()).result()
+            metrics.record(wait, render)
+            conn.send({"pdf": pdf, "wait_ms": wait * 1000, "render_ms": render * 1000})
+        except Exception as e:
+            logger.exception("Error al renderizar el PDF")
+            metrics.record_failed()
+            try:
+                conn.send({"error": str(e)})
+            except OSError:
+                pass
+        finally:
+            slots.release()
@@ -0,0 +1,61 @@
+"""
+Asignación atómica de secuencias para códigos correlativos.
+
+Cada ámbito (ej: "order:20261017", "exam:EX") tiene una fila en Sequence.
+El incremento se hace con un UPDATE sobre esa fila, por lo que dos workers
+nunca obtienen el mismo valor: el segundo espera el bloqueo de fila del primero.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from apps.core.models import Sequence
+
+
+def allocate(scope, count=1, initial=None):
+    """
+    Reserva `count` valores consecutivos en el ámbito y retorna el primero.
+
+    Args:
+        scope: Nombre del ámbito (ej: "order:20261017")
+        count: Cantidad de valores a reservar (bloques para importaciones masivas)
+        initial: Callable opcional que retorna el último valor ya usado; solo se
+            invoca la primera vez que se usa el ámbito, para continuar la
+            numeración de datos existentes.
+
+    Returns:
+        int: Primer valor del bloque reservado
+    """
+    if count < 1:
+        raise ValueError("count debe ser mayor o igual a 1")
+
+    with transaction.atomic():
+        updated = Sequence.objects.filter(scope=scope).update(last_value=F("last_value") + count)
+        if not updated:
+            _create_scope(scope, initial)
+            Sequence.objects.filter(scope=scope).update(last_value=F("last_value") + count)
+
+        last_value = Sequence.objects.filter(scope=scope).values_list("last_value", flat=True).get()
+
+    return last_value - count + 1
+
+
+def next_value(scope, initial=None):
+    """Reserva y retorna el siguiente valor del ámbito"""
+    return allocate(scope, 1, initial=initial)
+
+
+def current_value(scope):
+    """Retorna el último valor asignado en el ámbito (0 si aún no existe)"""
+    value = Sequence.objects.filter(scope=scope).values_list("last_value", flat=True).first()
+    return value or 0
+
+
+def _create_scope(scope, initial):
+    start = initial() if initial else 0
+    try:
+        with transaction.atomic():
+            Sequence.objects.create(scope=scope, last_value=start)
+    except IntegrityError:
+        # Otro worker creó el ámbito en paralelo; el UPDATE posterior espera su bloqueo
+        pass
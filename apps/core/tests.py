@@ -0,0 +1,222 @@
+import base64
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.html import escape
+from django.views.generic import ListView
+
+from apps.core import pdf
+from apps.core.management.commands.check_query_plans import explain, hot_queries
+from apps.core.models import Sequence
+from apps.core.pagination import CURSOR_PARAM, CursorPaginationMixin, decode_cursor
+from apps.core.pdf_renderer import RenderTiming
+from apps.patients.models import Patient
+
+
+class QueryPlanTests(TestCase):
+    """Las consultas frecuentes de los listados deben seguir usando su índice (ver check_query_plans)"""
+
+    def test_hot_queries_use_their_index(self):
+        for description, queryset, index_name in hot_queries():
+            with self.subTest(description):
+                self.assertIn(index_name, explain(queryset))
+
+
+@override_settings(PDF_RENDER_ADDRESS="")
+class PdfCacheTests(TestCase):
+    """Caché de PDFs en disco: un fallo al guardar no impide servir el PDF y los contadores no tocan la base"""
+
+    template_name = "orders/order_print.html"
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        metrics = mock.patch.dict(pdf._metrics, {"hits": 0, "misses": 0, "store_errors": 0})
+        metrics.start()
+        self.addCleanup(metrics.stop)
+        for target in ("render_to_string", "render_html_to_pdf"):
+            patcher = mock.patch.object(pdf, target)
+            self.addCleanup(patcher.stop)
+            setattr(self, target, patcher.start())
+        self.render_to_string.return_value = "<html></html>"
+        self.render_html_to_pdf.return_value = (b"%PDF-1.7", RenderTiming(wait_ms=0.0, render_ms=5.0))
+
+    def cached_files(self):
+        return sorted(path.name for path in pdf.cache_dir().iterdir())
+
+    def test_hits_and_misses_are_counted_in_memory(self):
+        with self.assertNumQueries(0):
+            first = pdf.render_pdf(self.template_name, {}, key_parts=["orden", 1])
+            second = pdf.render_pdf(self.template_name, {}, key_parts=["orden", 1])
+
+        self.assertFalse(first.cache_hit)
+        self.assertTrue(second.cache_hit)
+        self.assertEqual(second.content, b"%PDF-1.7")
+        self.assertEqual(self.render_html_to_pdf.call_count, 1)
+        self.assertEqual(Sequence.objects.count(), 0)
+        stats = pdf.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+        self.assertEqual((stats["files"], stats["size_bytes"]), (1, len(b"%PDF-1.7")))
+
+    def test_full_disk_serves_the_pdf_uncached(self):
+        with (
+            mock.patch.object(pdf.tempfile, "mkstemp", side_effect=OSError(28, "No space left on device")),
+            self.assertLogs("apps.core.pdf", "ERROR"),
+        ):
+            rendered = pdf.render_pdf(self.template_name, {}, key_parts=["orden", 1])
+
+        self.assertEqual(rendered.content, b"%PDF-1.7")
+        self.assertFalse(rendered.cache_hit)
+        self.assertEqual(self.cached_files(), [])
+        self.assertEqual(pdf.stats()["store_errors"], 1)
+
+    def test_failed_write_removes_the_temp_file(self):
+        with (
+            mock.patch.object(pdf.os, "replace", side_effect=OSError(28, "No space left on device")),
+            self.assertLogs("apps.core.pdf", "ERROR"),
+        ):
+            rendered = pdf.render_pdf(self.template_name, {}, key_parts=["orden", 1])
+
+        self.assertEqual(rendered.content, b"%PDF-1.7")
+        self.assertEqual(self.cached_files(), [])
+
+        # Con espacio de nuevo, el siguiente pedido sí queda en caché
+        pdf.render_pdf(self.template_name, {}, key_parts=["orden", 1])
+        self.assertEqual(len(self.cached_files()), 1)
+        self.assertTrue(pdf.render_pdf(self.template_name, {}, key_parts=["orden", 1]).cache_hit)
+
+
+class PatientPageView(CursorPaginationMixin, ListView):
+    model = Patient
+    paginate_by = 2
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sex = self.request.GET.get("sex")
+        if sex:
+            queryset = queryset.filter(sex=sex)
+        return queryset
+
+
+def tampered_cursor(payload):
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+class CursorPaginationTests(TestCase):
+    """Paginación por (created_at, id): empates en created_at, cursores inválidos y paginación clásica"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patients = [
+            Patient.objects.create(
+                document_number=f"1000000{i}",
+                first_name="José",
+                last_name="Núñez",
+                birthdate=date(1990, 1, 1),
+                sex="MALE" if i != 6 else "FEMALE",
+                phone_number="999999999",
+            )
+            for i in range(1, 8)
+        ]
+        # Tres filas con el mismo created_at cruzan el límite entre la segunda y la tercera página
+        base = timezone.now().replace(microsecond=0)
+        for patients, created_at in ((cls.patients[:2], base), (cls.patients[2:5], base + timedelta(minutes=1))):
+            Patient.objects.filter(pk__in=[patient.pk for patient in patients]).update(created_at=created_at)
+        Patient.objects.filter(pk__in=[patient.pk for patient in cls.patients[5:]]).update(
+            created_at=base + timedelta(minutes=2)
+        )
+
+    def page(self, query=""):
+        response = PatientPageView.as_view()(RequestFactory().get(f"/pacientes/{query}"))
+        return response.context_data["page_obj"]
+
+    def ids(self, page):
+        return [patient.pk for patient in page.object_list]
+
+    def expected_pages(self):
+        ids = [patient.pk for patient in reversed(self.patients)]
+        return [ids[i : i + 2] for i in range(0, len(ids), 2)]
+
+    def test_next_and_previous_cursors_over_equal_sort_keys(self):
+        expected = self.expected_pages()
+
+        page = self.page()
+        pages = [self.ids(page)]
+        self.assertFalse(page.has_previous)
+        while page.has_next:
+            page = self.page(page.next_url)
+            pages.append(self.ids(page))
+        self.assertEqual(pages, expected)
+
+        backwards = [self.ids(page)]
+        while page.has_previous:
+            page = self.page(page.previous_url)
+            backwards.append(self.ids(page))
+        self.assertEqual(backwards, expected[::-1])
+        self.assertIsNone(page.previous_url)
+
+    def test_cursor_links_keep_filters(self):
+        page = self.page("?sex=MALE&page=3")
+        self.assertEqual(self.ids(page), [self.patients[6].pk, self.patients[4].pk])
+        self.assertIn("sex=MALE", page.next_url)
+        self.assertNotIn("page=", page.next_url)
+
+        pages = [self.ids(page)]
+        while page.has_next:
+            page = self.page(page.next_url)
+            pages.append(self.ids(page))
+        self.assertEqual(sum(pages, []), [patient.pk for patient in reversed(self.patients) if patient.sex == "MALE"])
+
+    def test_invalid_cursor_returns_first_page(self):
+        first_page = self.expected_pages()[0]
+        cursors = [
+            "no-es-un-cursor",
+            "é",
+            tampered_cursor("no es json"),
+            tampered_cursor("null"),
+            tampered_cursor("[1, 2]"),
+            tampered_cursor('["2026-10-17T00:00:00+00:00", 5, "x"]'),
+            tampered_cursor('["ayer", 5, "n"]'),
+            tampered_cursor('["2026-10-17T00:00:00+00:00", "cinco", "n"]'),
+            tampered_cursor('[["2026-10-17"], 5, "p"]'),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                page = self.page(f"?{urlencode({CURSOR_PARAM: cursor})}")
+                self.assertEqual(self.ids(page), first_page)
+                self.assertFalse(page.has_previous)
+
+    def test_count_is_capped(self):
+        self.assertEqual((self.page().count, self.page().count_is_capped), (7, False))
+        with mock.patch.object(PatientPageView, "cursor_count_limit", 5):
+            page = self.page()
+        self.assertEqual((page.count, page.count_is_capped), (5, True))
+
+    def test_pagination_template_falls_back_to_page_numbers(self):
+        request = RequestFactory().get("/pacientes/", {"sex": "MALE"})
+        cursor_page = self.page("?sex=MALE")
+        html = render_to_string(
+            "includes/pagination.html", {"is_paginated": True, "page_obj": cursor_page}, request=request
+        )
+        self.assertIn(f'href="{escape(cursor_page.next_url)}"', html)
+        self.assertNotIn("Mostrando página", html)
+
+        classic_page = Paginator(Patient.objects.order_by("pk"), 2).page(2)
+        html = render_to_string(
+            "includes/pagination.html", {"is_paginated": True, "page_obj": classic_page}, request=request
+        )
+        self.assertIn('href="?sex=MALE&amp;page=1"', html)
+        self.assertIn('href="?sex=MALE&amp;page=3"', html)
+        self.assertIn("Mostrando página", html)
@@ -0,0 +1,13 @@
+import re
+import unicodedata
+
+
+def normalize_search_text(text):
+    """Minúsculas, sin tildes ni diéresis (ñ -> n) y con espacios simples"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().split())
+
+
+def search_tokens(text):
+    return re.findall(r"\w+", normalize_search_text(text))
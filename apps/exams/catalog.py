@@ -0,0 +1,206 @@
+"""
+Caché del catálogo de exámenes en cada proceso
+
+Los exámenes, categorías y la composición de los paneles cambian pocas veces al
+mes pero se leen en cada búsqueda del selector, cotización y orden. Cada worker
+carga el catálogo completo en memoria (objetos con __slots__) y lo reutiliza
+mientras no cambie la versión del catálogo: un contador en Sequence
+(CATALOG_VERSION_SCOPE) que incrementa cada escritura de Exam, ExamCategory o
+ExamComponent (bump_catalog_version).
+
+La versión se consulta como máximo cada EXAM_CATALOG_CHECK_SECONDS; los cambios
+hechos en el mismo proceso invalidan el caché de inmediato y los de otros
+workers se ven en, a lo sumo, ese intervalo. Las validaciones que no toleran
+datos desactualizados (ciclos de paneles) siguen consultando la base de datos,
+y los ids que no están en el catálogo se buscan en la base antes de rechazarlos
+(ej: un examen recién creado en otro worker).
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models
+
+from apps.core.sequences import current_value, next_value
+from apps.exams.models import Exam, ExamCategory, ExamClosure, ExamComponent
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_SCOPE = "catalog:exams"
+
+_state = {"catalog": None, "checked_at": 0.0}
+_load_lock = threading.Lock()
+
+
+class CatalogExam:
+    """Examen del catálogo en memoria (solo lectura)"""
+
+    __slots__ = ("id", "code", "name", "price", "category_id", "provider_id", "has_components", "components", "leaves")
+
+    def __init__(self, id, code, name, price, category_id, provider_id, has_components):
+        self.id = id
+        self.code = code
+        self.name = name
+        self.price = price
+        self.category_id = category_id
+        self.provider_id = provider_id
+        self.has_components = has_components
+        # Paneles: componentes directos y exámenes finales a cualquier nivel, en orden
+        self.components = ()
+        self.leaves = ()
+
+    def __repr__(self):
+        return f"<CatalogExam {self.id} {self.code} {self.name}>"
+
+
+class CatalogCategory:
+    __slots__ = ("id", "code", "name")
+
+    def __init__(self, id, code, name):
+        self.id = id
+        self.code = code
+        self.name = name
+
+
+class Catalog:
+    """Instantánea del catálogo para una versión"""
+
+    __slots__ = ("version", "exams", "categories", "loaded_at")
+
+    def __init__(self, version, exams, categories):
+        self.version = version
+        self.exams = exams  # {id: CatalogExam}
+        self.categories = categories  # {id: CatalogCategory}
+        self.loaded_at = time.time()
+
+    def get(self, exam_id):
+        """Examen por id, o None si no existe"""
+        return self.exams.get(exam_id)
+
+    def get_many(self, exam_ids):
+        """dict {id: CatalogExam} de los que existen (equivalente a in_bulk)"""
+        exams = self.exams
+        return {exam_id: exams[exam_id] for exam_id in exam_ids if exam_id in exams}
+
+    def category(self, category_id):
+        return self.categories.get(category_id)
+
+    def leaves(self, panel_ids):
+        """dict {panel_id: tuple(exam_id)} con los exámenes finales de cada panel"""
+        exams = self.exams
+        return {panel_id: exams[panel_id].leaves if panel_id in exams else () for panel_id in panel_ids}
+
+    def memory_footprint(self):
+        """Bytes aproximados que ocupa la instantánea (objetos, textos, precios y tuplas)"""
+        size = sys.getsizeof(self.exams) + sys.getsizeof(self.categories)
+        for exam in self.exams.values():
+            size += sys.getsizeof(exam)
+            size += sys.getsizeof(exam.code) + sys.getsizeof(exam.name) + sys.getsizeof(exam.price)
+            size += sys.getsizeof(exam.components) + sys.getsizeof(exam.leaves)
+        for category in self.categories.values():
+            size += sys.getsizeof(category) + sys.getsizeof(category.code) + sys.getsizeof(category.name)
+        return size
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "exams": len(self.exams),
+            "categories": len(self.categories),
+            "panels": sum(1 for exam in self.exams.values() if exam.components),
+            "bytes": self.memory_footprint(),
+        }
+
+
+def bump_catalog_version():
+    """Registra un cambio del catálogo: invalida el caché de este proceso y, vía la versión, el de los demás"""
+    _state["checked_at"] = 0.0
+    _state["catalog"] = None
+    return next_value(CATALOG_VERSION_SCOPE)
+
+
+def catalog_version():
+    return current_value(CATALOG_VERSION_SCOPE)
+
+
+def get_catalog():
+    """Catálogo vigente del proceso, recargado si la versión cambió"""
+    catalog = _state["catalog"]
+    now = time.monotonic()
+    if catalog is not None and now - _state["checked_at"] < settings.EXAM_CATALOG_CHECK_SECONDS:
+        return catalog
+
+    version = catalog_version()
+    _state["checked_at"] = now
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    with _load_lock:
+        catalog = _state["catalog"]
+        if catalog is None or catalog.version != version:
+            catalog = load_catalog(version)
+            _state["catalog"] = catalog
+    return catalog
+
+
+def leaf_paths():
+    """
+    (panel_id, exam_id) de los exámenes finales de cada panel: caminos de la clausura
+    cuyo descendiente no tiene componentes (ver apps.exams.closure), en orden de recorrido.
+    Un examen alcanzable por dos sub-paneles aparece una vez por camino.
+    """
+    return (
+        ExamClosure.objects.exclude(
+            models.Exists(ExamComponent.objects.filter(parent_exam_id=models.OuterRef("descendant_id")))
+        )
+        .order_by("ancestor_id", "path")
+        .values_list("ancestor_id", "descendant_id")
+    )
+
+
+def load_catalog(version):
+    """
+    Carga el catálogo completo en cuatro consultas (exámenes, categorías,
+    componentes directos y exámenes finales de los paneles).
+
+    La versión debe leerse antes de cargar: si el catálogo cambia durante la
+    carga, la próxima verificación encuentra una versión mayor y recarga.
+    """
+    started = time.monotonic()
+    exams = {
+        row[0]: CatalogExam(*row)
+        for row in Exam.objects.order_by("name", "id").values_list(
+            "id", "code", "name", "price", "category_id", "provider_id", "has_components"
+        )
+    }
+    categories = {row[0]: CatalogCategory(*row) for row in ExamCategory.objects.values_list("id", "code", "name")}
+
+    components = defaultdict(list)
+    for parent_id, component_id in ExamComponent.objects.order_by("order", "id").values_list(
+        "parent_exam_id", "component_exam_id"
+    ):
+        components[parent_id].append(component_id)
+
+    leaves = defaultdict(list)
+    for panel_id, exam_id in leaf_paths():
+        leaves[panel_id].append(exam_id)
+
+    for panel_id, component_ids in components.items():
+        if panel_id in exams:
+            exams[panel_id].components = tuple(component_ids)
+            # Un examen alcanzable por dos sub-paneles se incluye una sola vez
+            exams[panel_id].leaves = tuple(dict.fromkeys(leaves[panel_id]))
+
+    catalog = Catalog(version, exams, categories)
+    logger.info(
+        "Catálogo de exámenes v%s cargado: %s exámenes, %s categorías, %.1f KB en %.0f ms",
+        version,
+        len(exams),
+        len(categories),
+        catalog.memory_footprint() / 1024,
+        (time.monotonic() - started) * 1000,
+    )
+    return catalog
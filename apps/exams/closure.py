@@ -0,0 +1,159 @@
+"""
+Clausura transitiva de los paneles (ExamClosure)
+
+ExamComponent guarda solo las aristas panel -> componente. ExamClosure guarda
+además todos los caminos: una fila (ancestro, descendiente, profundidad, camino)
+por cada forma de llegar de un panel a un examen, a cualquier nivel. Con ella:
+
+    - La expansión completa de paneles anidados es una sola consulta
+      (filas del panel cuyo descendiente no tiene componentes, ordenadas por camino).
+    - Detectar un ciclo al agregar P -> C es buscar la fila (C, P): una consulta por índice.
+
+El camino concatena una clave por arista "<orden>.<id de ExamComponent>/" de ancho
+fijo, por lo que ordenar por camino da el recorrido en profundidad respetando el
+orden de los componentes, y las filas que pasan por una arista se encuentran por
+su id. ExamComponent.save()/delete() mantienen la tabla; tras cambios masivos
+usar el comando rebuild_exam_closure.
+
+Las hojas de cada panel se sirven desde el catálogo en memoria
+(apps.exams.catalog), que se recarga cuando cambia la versión del catálogo;
+panel_leaves las lee de la tabla para quien no tolera una composición
+desactualizada (creación de resultados).
+"""
+
+from collections import defaultdict
+
+from django.db import models, transaction
+
+from apps.exams.catalog import bump_catalog_version, leaf_paths
+from apps.exams.models import ExamClosure, ExamComponent
+
+
+class PanelCycleError(Exception):
+    """Los componentes forman un ciclo (un panel se contiene a sí mismo)"""
+
+
+def edge_key(order, component_pk):
+    return f"{order:05d}.{component_pk:010d}/"
+
+
+def _edge_marker(component_pk):
+    # Sufijo único de la clave de una arista, independiente de su orden
+    return f".{component_pk:010d}/"
+
+
+def cycle_components(parent_id, component_ids):
+    """
+    Componentes que crearían un ciclo si se agregan al panel (una consulta).
+
+    Args:
+        parent_id: Id del panel
+        component_ids: Ids de los exámenes a incluir
+
+    Returns:
+        set[int]: Ids de los componentes que ya contienen al panel (o son el panel)
+    """
+    component_ids = set(component_ids)
+    cycles = {parent_id} & component_ids
+    cycles.update(
+        ExamClosure.objects.filter(ancestor_id__in=component_ids, descendant_id=parent_id).values_list(
+            "ancestor_id", flat=True
+        )
+    )
+    return cycles
+
+
+def add_edge(component):
+    """Agrega los caminos que pasan por la arista (todos los ancestros del panel x todos los descendientes)"""
+    parent_id, child_id = component.parent_exam_id, component.component_exam_id
+    if cycle_components(parent_id, [child_id]):
+        raise PanelCycleError(f"El examen {child_id} ya contiene al examen {parent_id}")
+
+    key = edge_key(component.order, component.pk)
+    ancestors = [(parent_id, 0, "")] + list(
+        ExamClosure.objects.filter(descendant_id=parent_id).values_list("ancestor_id", "depth", "path")
+    )
+    descendants = [(child_id, 0, "")] + list(
+        ExamClosure.objects.filter(ancestor_id=child_id).values_list("descendant_id", "depth", "path")
+    )
+    ExamClosure.objects.bulk_create(
+        [
+            ExamClosure(
+                ancestor_id=ancestor_id,
+                descendant_id=descendant_id,
+                depth=ancestor_depth + descendant_depth + 1,
+                path=ancestor_path + key + descendant_path,
+            )
+            for ancestor_id, ancestor_depth, ancestor_path in ancestors
+            for descendant_id, descendant_depth, descendant_path in descendants
+        ]
+    )
+
+
+def remove_edge(component_pk, parent_id):
+    """Elimina los caminos que pasan por la arista (los que parten del panel o de sus ancestros)"""
+    ancestor_ids = ExamClosure.objects.filter(descendant_id=parent_id).values("ancestor_id")
+    ExamClosure.objects.filter(
+        models.Q(ancestor_id=parent_id) | models.Q(ancestor_id__in=ancestor_ids),
+        path__contains=_edge_marker(component_pk),
+    ).delete()
+
+
+def build_rows():
+    """
+    Calcula la clausura completa desde ExamComponent.
+
+    Returns:
+        list[ExamClosure]: Sin guardar
+
+    Raises:
+        PanelCycleError: Si los componentes forman un ciclo
+    """
+    edges = defaultdict(list)
+    for pk, parent_id, child_id, order in ExamComponent.objects.order_by("order", "id").values_list(
+        "id", "parent_exam_id", "component_exam_id", "order"
+    ):
+        edges[parent_id].append((child_id, edge_key(order, pk)))
+
+    rows = []
+
+    def walk(ancestor_id, node_id, depth, path, visiting):
+        for child_id, key in edges.get(node_id, ()):
+            if child_id in visiting:
+                raise PanelCycleError(f"Ciclo de componentes en el examen {child_id}")
+            rows.append(ExamClosure(ancestor_id=ancestor_id, descendant_id=child_id, depth=depth + 1, path=path + key))
+            walk(ancestor_id, child_id, depth + 1, path + key, visiting | {child_id})
+
+    for ancestor_id in edges:
+        walk(ancestor_id, ancestor_id, 0, "", {ancestor_id})
+    return rows
+
+
+def rebuild():
+    """Regenera la tabla completa; retorna la cantidad de filas"""
+    rows = build_rows()
+    with transaction.atomic():
+        ExamClosure.objects.all().delete()
+        ExamClosure.objects.bulk_create(rows, batch_size=2000)
+        bump_catalog_version()
+    return len(rows)
+
+
+def panel_leaves(panel_ids):
+    """
+    Exámenes finales (sin componentes) de cada panel, a cualquier nivel de anidamiento.
+
+    Args:
+        panel_ids: Ids de los paneles
+
+    Lee la clausura en una consulta, sin pasar por el catálogo en memoria.
+
+    Returns:
+        dict {panel_id: tuple(exam_id)} en orden de recorrido, sin repetidos
+    """
+    leaves = {panel_id: [] for panel_id in panel_ids}
+    if leaves:
+        for panel_id, exam_id in leaf_paths().filter(ancestor_id__in=leaves):
+            leaves[panel_id].append(exam_id)
+    # Un examen alcanzable por dos sub-paneles se incluye una sola vez
+    return {panel_id: tuple(dict.fromkeys(exam_ids)) for panel_id, exam_ids in leaves.items()}
@@ -1,13 +1,14 @@
 from django import forms
 from django.forms import inlineformset_factory
 
+from apps.exams.closure import cycle_components
 from apps.exams.models import Exam, ExamCategory, ExamComponent
 
 
 class ExamUpdateForm(forms.ModelForm):
     class Meta:
         model = Exam
-        fields = ["name", "category", "price", "has_components"]
+        fields = ["name", "category", "provider", "price", "has_components"]
         widgets = {
             "name": forms.TextInput(
                 attrs={
@@ -20,6 +21,11 @@ class ExamUpdateForm(forms.ModelForm):
                     "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline focus:border-blue-500",
                 }
             ),
+            "provider": forms.Select(
+                attrs={
+                    "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline focus:border-blue-500",
+                }
+            ),
             "price": forms.NumberInput(
                 attrs={
                     "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline focus:border-blue-500",
@@ -37,6 +43,7 @@ class ExamUpdateForm(forms.ModelForm):
         labels = {
             "name": "Nombre del Examen",
             "category": "Categoría",
+            "provider": "Laboratorio de referencia",
             "price": "Precio",
             "has_components": "¿Este examen es un panel/perfil con componentes?",
         }
@@ -46,12 +53,15 @@ class ExamUpdateForm(forms.ModelForm):
         # Hacer que el campo category sea opcional
         self.fields["category"].required = False
         self.fields["category"].empty_label = "Sin categoría"
+        # El laboratorio de referencia solo aplica a exámenes tercerizados
+        self.fields["provider"].required = False
+        self.fields["provider"].empty_label = "Procesado en el laboratorio"
 
 
 class ExamForm(forms.ModelForm):
     class Meta:
         model = Exam
-        fields = ["name", "category", "price", "has_components"]
+        fields = ["name", "category", "provider", "price", "has_components"]
         widgets = {
             "name": forms.TextInput(
                 attrs={
@@ -64,6 +74,11 @@ class ExamForm(forms.ModelForm):
                     "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline focus:border-blue-500",
                 }
             ),
+            "provider": forms.Select(
+                attrs={
+                    "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline focus:border-blue-500",
+                }
+            ),
             "price": forms.NumberInput(
                 attrs={
                     "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline focus:border-blue-500",
@@ -81,6 +96,7 @@ class ExamForm(forms.ModelForm):
         labels = {
             "name": "Nombre del Examen",
             "category": "Categoría",
+            "provider": "Laboratorio de referencia",
             "price": "Precio",
             "has_components": "¿Este examen es un panel/perfil con componentes?",
         }
@@ -90,6 +106,9 @@ class ExamForm(forms.ModelForm):
         # Hacer que el campo category sea opcional
         self.fields["category"].required = False
         self.fields["category"].empty_label = "Sin categoría"
+        # El laboratorio de referencia solo aplica a exámenes tercerizados
+        self.fields["provider"].required = False
+        self.fields["provider"].empty_label = "Procesado en el laboratorio"
 
 
 class ExamComponentForm(forms.ModelForm):
@@ -134,7 +153,7 @@ class BaseExamComponentFormSet(forms.BaseInlineFormSet):
             form.fields["DELETE"].widget = forms.HiddenInput()
 
     def clean(self):
-        """Validar que no haya referencias circulares en los componentes"""
+        """Validar que no haya referencias circulares en los componentes, a cualquier nivel"""
         super().clean()
 
         if any(self.errors):
@@ -156,16 +175,14 @@ class BaseExamComponentFormSet(forms.BaseInlineFormSet):
         if parent_exam.pk in component_ids:
             raise forms.ValidationError("Un examen no puede incluirse a sí mismo como componente.")
 
-        # Verificar referencias circulares: si algún componente tiene al padre como componente
-        # (esto previene A->B, B->A)
-        for component_id in component_ids:
-            component = Exam.objects.get(pk=component_id)
-            # Obtener todos los componentes del componente
-            sub_component_ids = list(component.component_items.values_list("component_exam_id", flat=True))
-            if parent_exam.pk in sub_component_ids:
-                raise forms.ValidationError(
-                    f"Referencia circular detectada: {component.name} ya contiene a {parent_exam.name} como componente."
-                )
+        # Verificar referencias circulares con la clausura de paneles (una consulta): un componente
+        # que ya contiene al padre, directa o indirectamente, formaría un ciclo (A->B->A, A->B->C->A)
+        cycle_ids = cycle_components(parent_exam.pk, component_ids)
+        if cycle_ids:
+            names = ", ".join(Exam.objects.filter(pk__in=cycle_ids).order_by("name").values_list("name", flat=True))
+            raise forms.ValidationError(
+                f"Referencia circular detectada: {names} ya contiene a {parent_exam.name} como componente."
+            )
 
 
 ExamComponentFormSet = inlineformset_factory(
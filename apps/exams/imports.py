@@ -0,0 +1,245 @@
+"""
+Importación de exámenes desde Excel (ver apps.imports.engine)
+
+La hoja principal trae los exámenes; la hoja opcional "Paneles" del mismo libro
+arma los paneles con ellos o con exámenes que ya existen.
+"""
+
+import sys
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from graphlib import CycleError, TopologicalSorter
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from apps.exams import closure
+from apps.exams.catalog import bump_catalog_version
+from apps.exams.models import Exam, ExamCategory, ExamComponent
+from apps.exams.services import allocate_exam_codes
+from apps.imports.engine import Importer, RowError
+
+PANELS_SHEET = "Paneles"
+
+
+def parse_price(value):
+    """Decimal >= 0 desde la celda; lanza RowError si no es un precio válido"""
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise RowError(f"Precio inválido '{value}' debe ser un número") from None
+    if not price.is_finite() or price < 0:
+        raise RowError(f"Precio inválido '{value}' debe ser mayor o igual a 0")
+    return price
+
+
+def parse_order(value):
+    """Entero >= 0 desde la celda, o None si está vacía; lanza RowError si no es válido"""
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        order = Decimal(str(value).strip())
+    except InvalidOperation:
+        order = None
+    if order is None or not order.is_finite() or order < 0 or order != order.to_integral_value():
+        raise RowError(f"Orden inválido '{value}' debe ser un número entero mayor o igual a 0")
+    return int(order)
+
+
+class PanelImporter(Importer):
+    """
+    Componentes de los paneles (hoja "Paneles"): una fila por panel -> componente.
+
+    El panel y el componente se indican por código (ej: EX00012) o por nombre, así
+    se pueden armar paneles con los exámenes creados en la hoja principal, cuyos
+    códigos se generan al importar. Sin orden, el componente va en la posición en
+    que aparece en el archivo dentro de su panel.
+
+    Todas las filas se procesan en un solo bloque:
+        1. Una consulta resuelve los códigos y nombres, y otra trae las aristas existentes.
+        2. Las aristas nuevas se ordenan topológicamente junto con las existentes
+           (graphlib). Si forman un ciclo se rechaza la última fila del archivo que
+           participa en él y se vuelve a ordenar. Si el ciclo está solo entre las
+           aristas existentes (datos anteriores a la clausura) se rechaza la hoja completa.
+        3. bulk_create de los ExamComponent, los paneles se marcan con
+           has_components y la clausura (ExamClosure) se regenera una sola vez.
+    """
+
+    columns = ("Panel", "Componente", "Orden")
+    required_columns = ("Panel", "Componente")
+    # El orden topológico necesita todas las aristas del archivo a la vez
+    chunk_size = sys.maxsize
+
+    def parse_row(self, values):
+        panel, component, order = values
+        return {"panel": str(panel).strip(), "component": str(component).strip(), "order": parse_order(order)}
+
+    def resolve(self, refs):
+        """
+        Args:
+            refs: Códigos o nombres de examen
+
+        Returns:
+            dict {ref: exam_id} con las referencias encontradas (los nombres repetidos en el catálogo no se resuelven)
+        """
+        by_code, by_name = {}, defaultdict(set)
+        exams = Exam.objects.annotate(lower_name=Lower("name")).filter(
+            Q(code__in=refs) | Q(lower_name__in={ref.lower() for ref in refs})
+        )
+        for exam_id, code, lower_name in exams.values_list("id", "code", "lower_name"):
+            by_code[code] = exam_id
+            by_name[lower_name].add(exam_id)
+
+        resolved = {}
+        for ref in refs:
+            if ref in by_code:
+                resolved[ref] = by_code[ref]
+            elif len(by_name.get(ref.lower(), ())) == 1:
+                resolved[ref] = next(iter(by_name[ref.lower()]))
+        return resolved
+
+    def reject_all(self, candidates, result, cycle):
+        """Rechaza todas las filas de la hoja porque los componentes ya guardados forman un ciclo"""
+        codes = dict(Exam.objects.filter(id__in=cycle).values_list("id", "code"))
+        path = " -> ".join(codes.get(exam_id, str(exam_id)) for exam_id in reversed(cycle))
+        for row, _order in candidates.values():
+            result.reject(row, f"Los paneles existentes forman un ciclo ({path}); corríjalo antes de importar paneles")
+
+    def save_chunk(self, rows, result):
+        exam_ids = self.resolve({row.data[key] for row in rows for key in ("panel", "component")})
+        existing = {
+            (parent_id, component_id): (pk, order)
+            for pk, parent_id, component_id, order in ExamComponent.objects.values_list(
+                "id", "parent_exam_id", "component_exam_id", "order"
+            )
+        }
+
+        candidates = {}  # (panel_id, component_id) -> (fila, orden)
+        positions = defaultdict(int)
+        for row in rows:
+            panel, component = row.data["panel"], row.data["component"]
+            missing = [ref for ref in (panel, component) if ref not in exam_ids]
+            if missing:
+                result.reject(row, f"Examen no encontrado con código o nombre '{missing[0]}'")
+                continue
+            key = (exam_ids[panel], exam_ids[component])
+            if key[0] == key[1]:
+                result.reject(row, f"El panel '{panel}' no puede incluirse a sí mismo")
+                continue
+            if key in candidates:
+                result.skip(row, f"Componente repetido en el panel (ya está en la fila {candidates[key][0].number})")
+                continue
+            positions[key[0]] += 1
+            order = row.data["order"] if row.data["order"] is not None else positions[key[0]]
+            candidates[key] = (row, order)
+
+        # Grafo panel -> componentes: en el orden topológico los componentes van antes que sus paneles
+        graph = defaultdict(set)
+        for parent_id, component_id in [*existing, *candidates]:
+            graph[parent_id].add(component_id)
+        while True:
+            try:
+                tuple(TopologicalSorter(graph).static_order())
+                break
+            except CycleError as e:
+                # Cada nodo del ciclo es componente del siguiente
+                cycle = e.args[1]
+                cycle_keys = {(cycle[i + 1], cycle[i]) for i in range(len(cycle) - 1)} - existing.keys()
+                if not cycle_keys:
+                    # Ciclo previo en el catálogo (ver la migración 0005_examclosure): la clausura no se puede regenerar
+                    self.reject_all(candidates, result, cycle)
+                    return
+                key = max(cycle_keys, key=lambda key: candidates[key][0].number)
+                row = candidates.pop(key)[0]
+                graph[key[0]].discard(key[1])
+                result.reject(
+                    row,
+                    f"Ciclo de componentes - '{row.data['component']}' ya contiene al panel '{row.data['panel']}'",
+                )
+
+        created, updated = [], []
+        for (parent_id, component_id), (_row, order) in candidates.items():
+            if (parent_id, component_id) not in existing:
+                created.append(ExamComponent(parent_exam_id=parent_id, component_exam_id=component_id, order=order))
+                continue
+            pk, current_order = existing[(parent_id, component_id)]
+            if current_order == order:
+                result.add("unchanged")
+                continue
+            updated.append(ExamComponent(pk=pk, order=order))
+
+        if not created and not updated:
+            return
+
+        ExamComponent.objects.bulk_create(created)
+        ExamComponent.objects.bulk_update(updated, ["order"])
+        Exam.objects.filter(id__in={item.parent_exam_id for item in created}, has_components=False).update(
+            has_components=True
+        )
+        # bulk_create no pasa por ExamComponent.save(): la clausura se regenera una vez (y sube la versión del catálogo)
+        closure.rebuild()
+        result.add("created", len(created))
+        result.add("updated", len(updated))
+
+
+class ExamImporter(Importer):
+    """
+    Crea exámenes simples con código generado; los nombres que ya existen se omiten.
+    Después arma los paneles de la hoja "Paneles", si el libro la tiene (ver PanelImporter).
+    """
+
+    columns = ("Nombre del Examen", "Precio", "Código de Categoría")
+    required_columns = columns
+    extra_sheets = ((PANELS_SHEET, PanelImporter),)
+
+    def parse_row(self, values):
+        name, price, category_code = values
+        return {
+            "name": str(name).strip(),
+            "price": parse_price(price),
+            "category_code": str(category_code).strip(),
+        }
+
+    def save_chunk(self, rows, result):
+        categories = dict(
+            ExamCategory.objects.filter(code__in={row.data["category_code"] for row in rows}).values_list("code", "id")
+        )
+        # Nombres sin distinguir mayúsculas, como la validación del formulario
+        existing = set(
+            Exam.objects.annotate(lower_name=Lower("name"))
+            .filter(lower_name__in={row.data["name"].lower() for row in rows})
+            .values_list("lower_name", flat=True)
+        )
+
+        new_rows = []
+        for row in rows:
+            name = row.data["name"]
+            if name.lower() in existing:
+                result.skip(row, f"Examen duplicado - Ya existe un examen con el nombre '{name}'")
+                continue
+            if row.data["category_code"] not in categories:
+                result.reject(row, f"Categoría no encontrada con código '{row.data['category_code']}'")
+                continue
+            existing.add(name.lower())
+            new_rows.append(row)
+
+        if not new_rows:
+            return
+
+        # Un bloque de códigos por bloque de filas, en lugar de un código por examen
+        codes = allocate_exam_codes(len(new_rows))
+        Exam.objects.bulk_create(
+            [
+                Exam(
+                    code=code,
+                    name=row.data["name"],
+                    price=row.data["price"],
+                    category_id=categories[row.data["category_code"]],
+                    has_components=False,
+                )
+                for code, row in zip(codes, new_rows, strict=True)
+            ]
+        )
+        # bulk_create no pasa por Exam.save()
+        bump_catalog_version()
+        result.add("created", len(new_rows))
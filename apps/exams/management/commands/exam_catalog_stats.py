@@ -0,0 +1,60 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.exams.catalog import get_catalog
+from apps.exams.search import get_search_index
+
+
+class Command(BaseCommand):
+    help = "Carga el catálogo de exámenes en memoria y muestra su versión, tamaño y memoria ocupada"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--benchmark",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Mide N búsquedas del selector con prefijos de nombres del catálogo",
+        )
+
+    def handle(self, *args, **options):
+        stats = get_catalog().stats()
+        self.stdout.write(f"Versión:     {stats['version']}")
+        self.stdout.write(f"Exámenes:    {stats['exams']}")
+        self.stdout.write(f"Paneles:     {stats['panels']}")
+        self.stdout.write(f"Categorías:  {stats['categories']}")
+        self.stdout.write(self.style.SUCCESS(f"Memoria:     {stats['bytes'] / 1024:.1f} KB"))
+
+        started = time.perf_counter()
+        index, catalog = get_search_index()
+        index_stats = index.stats()
+        self.stdout.write(
+            f"Índice:      {index_stats['tokens']} palabras, {index_stats['deletions']} variantes, "
+            f"{index_stats['popular_exams']} exámenes con pedidos ({(time.perf_counter() - started) * 1000:.0f} ms)"
+        )
+
+        if options["benchmark"] and catalog.exams:
+            names = [exam.name for exam in catalog.exams.values()]
+            queries = []
+            for _ in range(options["benchmark"]):
+                words = random.choice(names).split()
+                queries.append(" ".join(word[: random.randint(2, max(len(word), 2))] for word in words[:2]))
+
+            # Sin el caché de resultados: mide el recorrido del índice
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                with index.lock:
+                    index.results.clear()
+                    index.search(query)
+                timings.append((time.perf_counter() - started) * 1_000_000)
+            timings.sort()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Búsqueda:    mediana {statistics.median(timings):.0f} µs, "
+                    f"p99 {timings[int(len(timings) * 0.99)]:.0f} µs, máximo {timings[-1]:.0f} µs"
+                )
+            )
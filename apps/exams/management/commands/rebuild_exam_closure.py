@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams import closure
+from apps.exams.models import ExamClosure
+
+
+class Command(BaseCommand):
+    help = "Regenera la clausura de paneles (ExamClosure) desde ExamComponent, o verifica que esté sincronizada"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Solo reporta las diferencias, sin modificar la tabla",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if not options["verify"]:
+                count = closure.rebuild()
+                self.stdout.write(self.style.SUCCESS(f"{count} caminos generados"))
+                return
+            expected = {(row.ancestor_id, row.descendant_id, row.depth, row.path) for row in closure.build_rows()}
+        except closure.PanelCycleError as e:
+            raise CommandError(str(e)) from e
+
+        current = set(ExamClosure.objects.values_list("ancestor_id", "descendant_id", "depth", "path"))
+        missing = expected - current
+        extra = current - expected
+        for ancestor_id, descendant_id, depth, path in sorted(missing):
+            self.stdout.write(f"Falta: {ancestor_id} → {descendant_id} (profundidad {depth}, camino {path})")
+        for ancestor_id, descendant_id, depth, path in sorted(extra):
+            self.stdout.write(f"Sobra: {ancestor_id} → {descendant_id} (profundidad {depth}, camino {path})")
+
+        if missing or extra:
+            self.stdout.write(self.style.ERROR(f"{len(missing)} caminos faltantes, {len(extra)} sobrantes"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"La clausura está sincronizada ({len(current)} caminos)"))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+from apps.core.db import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ("exams", "0002_make_category_optional"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="exam",
+            index=models.Index(fields=["created_at", "id"], name="exam_created_at_id_idx"),
+        ),
+    ]
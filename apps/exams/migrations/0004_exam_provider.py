@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("exams", "0003_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="provider",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="exams",
+                to="exams.provider",
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:49
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    ExamComponent = apps.get_model("exams", "ExamComponent")
+    ExamClosure = apps.get_model("exams", "ExamClosure")
+
+    edges = defaultdict(list)
+    for pk, parent_id, child_id, order in ExamComponent.objects.order_by("order", "id").values_list(
+        "id", "parent_exam_id", "component_exam_id", "order"
+    ):
+        edges[parent_id].append((child_id, f"{order:05d}.{pk:010d}/"))
+
+    rows = []
+
+    def walk(ancestor_id, node_id, depth, path, visiting):
+        for child_id, key in edges.get(node_id, ()):
+            # La validación anterior solo detectaba ciclos directos; los caminos que cierran un ciclo se omiten
+            if child_id in visiting:
+                continue
+            rows.append(ExamClosure(ancestor_id=ancestor_id, descendant_id=child_id, depth=depth + 1, path=path + key))
+            walk(ancestor_id, child_id, depth + 1, path + key, visiting | {child_id})
+
+    for ancestor_id in list(edges):
+        walk(ancestor_id, ancestor_id, 0, "", {ancestor_id})
+    ExamClosure.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("exams", "0004_exam_provider"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExamClosure",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("depth", models.PositiveSmallIntegerField(help_text="1 = componente directo")),
+                ("path", models.TextField(help_text="Claves de las aristas del camino, ordenables en profundidad")),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        db_index=False,
+                        help_text="Panel",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="exams.exam",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        db_index=False,
+                        help_text="Examen incluido en el panel",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="exams.exam",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Exam Closure",
+                "verbose_name_plural": "Exam Closure",
+                "indexes": [
+                    models.Index(fields=["ancestor", "path"], name="examclosure_ancestor_path_idx"),
+                    models.Index(fields=["descendant", "ancestor"], name="examclosure_descendant_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
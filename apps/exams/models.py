@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 from apps.core.models import TimeStampedModel
 
@@ -14,6 +14,19 @@ class ExamCategory(TimeStampedModel):
     def __str__(self):
         return f"[{self.code}] {self.name}"
 
+    def save(self, *args, **kwargs):
+        from apps.exams.catalog import bump_catalog_version
+
+        super().save(*args, **kwargs)
+        bump_catalog_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.exams.catalog import bump_catalog_version
+
+        result = super().delete(*args, **kwargs)
+        bump_catalog_version()
+        return result
+
 
 class Provider(TimeStampedModel):
     """Proveedor externo (laboratorio de referencia)"""
@@ -43,6 +56,14 @@ class Exam(TimeStampedModel):
         null=True,
         blank=True,
     )
+    # Laboratorio de referencia que procesa el examen cuando se terceriza
+    provider = models.ForeignKey(
+        Provider,
+        on_delete=models.PROTECT,
+        related_name="exams",
+        null=True,
+        blank=True,
+    )
 
     # Campo para identificar si es un panel/perfil con componentes
     has_components = models.BooleanField(
@@ -62,6 +83,9 @@ class Exam(TimeStampedModel):
     class Meta:
         verbose_name = "Exam"
         verbose_name_plural = "Exams"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="exam_created_at_id_idx"),
+        ]
 
     def __str__(self):
         panel_indicator = " [PANEL]" if self.has_components else ""
@@ -69,6 +93,19 @@ class Exam(TimeStampedModel):
             return f"[{self.code}] {self.name}{panel_indicator} - S/. {self.price}"
         return f"{self.name}{panel_indicator} - S/. {self.price}"
 
+    def save(self, *args, **kwargs):
+        from apps.exams.catalog import bump_catalog_version
+
+        super().save(*args, **kwargs)
+        bump_catalog_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.exams.catalog import bump_catalog_version
+
+        result = super().delete(*args, **kwargs)
+        bump_catalog_version()
+        return result
+
 
 class ExamComponent(TimeStampedModel):
     """Tabla intermedia para componentes de un examen (panel)"""
@@ -88,3 +125,67 @@ class ExamComponent(TimeStampedModel):
 
     def __str__(self):
         return f"{self.parent_exam.name} → {self.component_exam.name} (orden: {self.order})"
+
+    def save(self, *args, **kwargs):
+        from apps.exams import closure
+        from apps.exams.catalog import bump_catalog_version
+
+        # Mantener la clausura de paneles: se reemplazan los caminos que pasan por esta arista
+        with transaction.atomic():
+            is_new = self._state.adding
+            if not is_new:
+                previous_parent_id = (
+                    ExamComponent.objects.filter(pk=self.pk).values_list("parent_exam_id", flat=True).first()
+                )
+                if previous_parent_id:
+                    closure.remove_edge(self.pk, previous_parent_id)
+            super().save(*args, **kwargs)
+            closure.add_edge(self)
+            bump_catalog_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.exams import closure
+        from apps.exams.catalog import bump_catalog_version
+
+        with transaction.atomic():
+            closure.remove_edge(self.pk, self.parent_exam_id)
+            result = super().delete(*args, **kwargs)
+            bump_catalog_version()
+        return result
+
+
+class ExamClosure(models.Model):
+    """
+    Clausura transitiva de ExamComponent: un camino de un panel a un examen a
+    cualquier nivel de anidamiento. Ver apps.exams.closure.
+    """
+
+    ancestor = models.ForeignKey(
+        Exam,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,  # Cubierto por examclosure_ancestor_path_idx
+        help_text="Panel",
+    )
+    descendant = models.ForeignKey(
+        Exam,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,  # Cubierto por examclosure_descendant_idx
+        help_text="Examen incluido en el panel",
+    )
+    depth = models.PositiveSmallIntegerField(help_text="1 = componente directo")
+    path = models.TextField(help_text="Claves de las aristas del camino, ordenables en profundidad")
+
+    class Meta:
+        verbose_name = "Exam Closure"
+        verbose_name_plural = "Exam Closure"
+        indexes = [
+            # Expansión de un panel en orden de recorrido
+            models.Index(fields=["ancestor", "path"], name="examclosure_ancestor_path_idx"),
+            # Ancestros de un examen (detección de ciclos)
+            models.Index(fields=["descendant", "ancestor"], name="examclosure_descendant_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} (profundidad: {self.depth})"
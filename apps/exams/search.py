@@ -0,0 +1,303 @@
+"""
+Búsqueda del selector de exámenes sobre el catálogo en memoria
+
+Un índice invertido por proceso, construido desde apps.exams.catalog: cada
+examen aporta las palabras de su nombre, código y categoría en minúsculas y sin
+tildes (normalize_search_text), por lo que "hemo", "HEMO" y "hémo" coinciden.
+Cada palabra de la búsqueda debe coincidir con alguna del examen:
+
+    - Exacta (3 puntos) o por prefijo (2): sobre la lista ordenada de palabras
+      del índice, con bisect. Las palabras con dígitos (códigos, "b12") van en
+      una lista aparte y solo se buscan por prefijo si lo escrito tiene algún
+      dígito: "ex" no recorre todos los códigos EX00001.., "ex01" sí.
+    - Con un error de tipeo (1): una letra de más, de menos, cambiada o dos
+      letras intercambiadas, para palabras de al menos FUZZY_MIN_LENGTH
+      letras. Se resuelve con el índice de borrados: cada palabra se guarda
+      también con una letra menos, y dos palabras a esa distancia comparten
+      alguna de esas variantes.
+
+El puntaje de cada palabra se multiplica por el peso del campo (la categoría
+pesa menos que el nombre o el código) y se suma. A igual relevancia se prefiere
+el examen más pedido en los últimos POPULARITY_DAYS días (recalculado cada
+POPULARITY_REFRESH_SECONDS), luego el de nombre más corto y luego por orden alfabético.
+
+Cuando cambia la versión del catálogo el índice se actualiza de forma
+incremental: solo se reindexan los exámenes cuyo nombre, código o categoría
+cambiaron (ej: al editar un examen se retiran sus palabras y se agregan las nuevas).
+Los resultados de las búsquedas más recientes se guardan (RESULT_CACHE_SIZE)
+hasta que cambie el índice o la popularidad: los prefijos cortos, que son los
+que más exámenes recorren, se repiten en cada búsqueda del selector.
+"""
+
+import bisect
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.core.text import search_tokens
+from apps.exams.catalog import get_catalog
+
+# Puntaje por tipo de coincidencia de cada palabra
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+
+# Peso de cada campo del examen, en el orden de ExamSearchIndex.document
+FIELD_WEIGHTS = (1.0, 1.0, 0.5)  # nombre, código, categoría
+
+# Palabras más cortas no toleran errores (ej: "hb" no debe coincidir con "ab")
+FUZZY_MIN_LENGTH = 4
+
+# La popularidad suma hasta POPULARITY_WEIGHT: menos que la diferencia entre tipos de coincidencia
+POPULARITY_WEIGHT = 0.9
+POPULARITY_DAYS = 90
+POPULARITY_REFRESH_SECONDS = 3600
+
+RESULT_CACHE_SIZE = 512
+
+_DIGITS = frozenset("0123456789")
+
+
+def _has_digits(token):
+    return not _DIGITS.isdisjoint(token)
+
+
+def _deletions(token):
+    return {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+class ExamSearchIndex:
+    """Índice invertido de palabras -> exámenes, sincronizado con una versión del catálogo"""
+
+    def __init__(self):
+        self.version = None
+        self.documents = {}  # {exam_id: (nombre, código, categoría)} tal como se indexaron
+        self.positions = {}  # {exam_id: posición en el catálogo}, que está ordenado por nombre
+        self.postings = {}  # {palabra: {exam_id: peso del campo}}
+        self.tokens = ([], [])  # palabras del índice ordenadas (sin / con dígitos), para buscar por prefijo
+        self.deletions = defaultdict(set)  # {palabra con una letra menos: {palabra}}
+        self.popularity = {}  # {exam_id: 0..1}
+        self.popularity_loaded_at = None
+        self.results = {}  # {(texto, exclude_id, limit): [exam_id]}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def document(exam, catalog):
+        category = catalog.category(exam.category_id)
+        return (exam.name, exam.code, category.name if category else "")
+
+    @staticmethod
+    def document_tokens(document):
+        """dict {palabra: peso} con el mayor peso de los campos en que aparece"""
+        weights = {}
+        for text, weight in zip(document, FIELD_WEIGHTS, strict=True):
+            for token in search_tokens(text):
+                if weight > weights.get(token, 0):
+                    weights[token] = weight
+        return weights
+
+    def sync(self, catalog):
+        """
+        Actualiza el índice a la versión del catálogo reindexando solo los exámenes que cambiaron.
+
+        Returns:
+            int: Cantidad de exámenes agregados, modificados o eliminados
+        """
+        documents = {exam.id: self.document(exam, catalog) for exam in catalog.exams.values()}
+        initial = not self.documents
+        changed = 0
+
+        for exam_id in self.documents.keys() - documents.keys():
+            self._remove(exam_id)
+            changed += 1
+        for exam_id, document in documents.items():
+            previous = self.documents.get(exam_id)
+            if previous == document:
+                continue
+            if previous is not None:
+                self._remove(exam_id)
+            self._add(exam_id, document, sort=not initial)
+            changed += 1
+
+        if initial:
+            self.tokens = ([], [])
+            for token in sorted(self.postings):
+                self.tokens[_has_digits(token)].append(token)
+        self.positions = {exam_id: position for position, exam_id in enumerate(documents)}
+        self.version = catalog.version
+        self.results.clear()
+        return changed
+
+    def _add(self, exam_id, document, sort=True):
+        for token, weight in self.document_tokens(document).items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                if sort:
+                    bisect.insort(self.tokens[_has_digits(token)], token)
+                if len(token) >= FUZZY_MIN_LENGTH:
+                    for variant in _deletions(token):
+                        self.deletions[variant].add(token)
+            posting[exam_id] = weight
+        self.documents[exam_id] = document
+
+    def _remove(self, exam_id):
+        document = self.documents.pop(exam_id)
+        for token in self.document_tokens(document):
+            posting = self.postings[token]
+            posting.pop(exam_id, None)
+            if posting:
+                continue
+            del self.postings[token]
+            tokens = self.tokens[_has_digits(token)]
+            del tokens[bisect.bisect_left(tokens, token)]
+            if len(token) >= FUZZY_MIN_LENGTH:
+                for variant in _deletions(token):
+                    self.deletions[variant].discard(token)
+                    if not self.deletions[variant]:
+                        del self.deletions[variant]
+
+    def refresh_popularity(self):
+        """Recalcula la popularidad: pedidos por examen (sin órdenes anuladas), en escala logarítmica 0..1"""
+        from apps.orders.models import Order, OrderDetail
+
+        since = timezone.now() - timedelta(days=POPULARITY_DAYS)
+        counts = dict(
+            OrderDetail.objects.filter(order__created_at__gte=since)
+            .exclude(order__status=Order.Status.VOIDED)
+            .values("exam_id")
+            .annotate(count=Count("id"))
+            .values_list("exam_id", "count")
+        )
+        scale = math.log1p(max(counts.values(), default=0)) or 1.0
+        self.popularity = {exam_id: math.log1p(count) / scale for exam_id, count in counts.items()}
+        self.popularity_loaded_at = time.monotonic()
+        self.results.clear()
+
+    def _match_token(self, token):
+        """dict {exam_id: puntaje} de los exámenes con alguna palabra que coincide con token"""
+        postings = self.postings
+        matches = {}
+        get = matches.get
+
+        def collect(candidate, score):
+            for exam_id, weight in postings[candidate].items():
+                weighted = score * weight
+                if weighted > get(exam_id, 0):
+                    matches[exam_id] = weighted
+
+        if token in postings:
+            collect(token, EXACT_SCORE)
+
+        # Las palabras que empiezan con token quedan contiguas en la lista ordenada
+        tokens = self.tokens[_has_digits(token)]
+        start = bisect.bisect_right(tokens, token)
+        end = bisect.bisect_left(tokens, token + "\U0010ffff", start)
+        for candidate in tokens[start:end]:
+            collect(candidate, PREFIX_SCORE)
+
+        if len(token) >= FUZZY_MIN_LENGTH:
+            # Letra de más en la palabra del índice, letra de menos, letra cambiada o intercambiada
+            candidates = set(self.deletions.get(token, ()))
+            for variant in _deletions(token):
+                if variant in postings:
+                    candidates.add(variant)
+                candidates.update(self.deletions.get(variant, ()))
+            candidates.discard(token)
+            for candidate in candidates:
+                collect(candidate, FUZZY_SCORE)
+        return matches
+
+    def search(self, text, exclude_id=None, limit=10):
+        """
+        Ids de los exámenes que coinciden con todas las palabras del texto.
+
+        Returns:
+            list[int]: Ordenados por relevancia, popularidad, largo del nombre y nombre
+                (vacía si el texto no tiene palabras, ej: solo puntuación)
+        """
+        if not search_tokens(text):
+            return []
+
+        key = (text, exclude_id, limit)
+        if key not in self.results:
+            if len(self.results) >= RESULT_CACHE_SIZE:
+                del self.results[next(iter(self.results))]
+            self.results[key] = self._search(text, exclude_id, limit)
+        return self.results[key]
+
+    def _search(self, text, exclude_id, limit):
+        scores = None
+        for token in dict.fromkeys(search_tokens(text)):
+            matches = self._match_token(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {exam_id: scores[exam_id] + score for exam_id, score in matches.items() if exam_id in scores}
+            if not scores:
+                return []
+
+        scores.pop(exclude_id, None)
+        popularity, documents, positions = self.popularity.get, self.documents, self.positions
+        ranked = heapq.nlargest(
+            limit,
+            (
+                (
+                    score + POPULARITY_WEIGHT * popularity(exam_id, 0),
+                    -len(documents[exam_id][0]),
+                    -positions[exam_id],
+                    exam_id,
+                )
+                for exam_id, score in scores.items()
+            ),
+        )
+        return [exam_id for *_, exam_id in ranked]
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "exams": len(self.documents),
+            "tokens": len(self.postings),
+            "cached_results": len(self.results),
+            "deletions": len(self.deletions),
+            "popular_exams": len(self.popularity),
+        }
+
+
+_index = ExamSearchIndex()
+
+
+def get_search_index():
+    """Índice del proceso, sincronizado con el catálogo vigente y con la popularidad al día"""
+    catalog = get_catalog()
+    with _index.lock:
+        if _index.version != catalog.version:
+            _index.sync(catalog)
+        loaded_at = _index.popularity_loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > POPULARITY_REFRESH_SECONDS:
+            _index.refresh_popularity()
+    return _index, catalog
+
+
+def search_exams(text, exclude_id=None, limit=10):
+    """
+    Exámenes del catálogo que coinciden con el texto del selector.
+
+    Args:
+        text: Texto ingresado (nombre, código o categoría; admite prefijos y errores de tipeo)
+        exclude_id: Id de un examen a omitir (ej: el panel que se está editando)
+        limit: Cantidad máxima de resultados
+
+    Returns:
+        list[CatalogExam]: Ordenados por relevancia
+    """
+    index, catalog = get_search_index()
+    with index.lock:
+        exam_ids = index.search(text, exclude_id=exclude_id, limit=limit)
+    return [catalog.exams[exam_id] for exam_id in exam_ids if exam_id in catalog.exams]
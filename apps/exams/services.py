@@ -0,0 +1,52 @@
+"""
+Services para el catálogo de exámenes
+"""
+
+from apps.core.sequences import allocate
+from apps.exams.models import Exam, ExamCategory
+
+EXAM_CODE_PREFIX = "EX"
+CATEGORY_CODE_PREFIX = "CA"
+
+
+def next_exam_code():
+    """Genera el siguiente código de examen con formato EX00001"""
+    return allocate_exam_codes(1)[0]
+
+
+def allocate_exam_codes(count):
+    """
+    Reserva un bloque de códigos de examen consecutivos.
+
+    Args:
+        count: Cantidad de códigos a reservar
+
+    Returns:
+        list[str]: Códigos con formato EX00001
+    """
+    first = allocate(
+        f"exam:{EXAM_CODE_PREFIX}",
+        count,
+        initial=lambda: _last_code_number(Exam, EXAM_CODE_PREFIX),
+    )
+    return [f"{EXAM_CODE_PREFIX}{number:05d}" for number in range(first, first + count)]
+
+
+def next_category_code():
+    """Genera el siguiente código de categoría con formato CA001"""
+    number = allocate(
+        f"category:{CATEGORY_CODE_PREFIX}",
+        initial=lambda: _last_code_number(ExamCategory, CATEGORY_CODE_PREFIX),
+    )
+    return f"{CATEGORY_CODE_PREFIX}{number:03d}"
+
+
+def _last_code_number(model, prefix):
+    """Último número usado con el prefijo, para continuar la numeración existente"""
+    last_code = model.objects.filter(code__startswith=prefix).order_by("-code").values_list("code", flat=True).first()
+    if not last_code:
+        return 0
+    try:
+        return int(last_code[len(prefix) :])
+    except ValueError:
+        return 0
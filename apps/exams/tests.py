@@ -0,0 +1,362 @@
+import threading
+import time
+from datetime import date
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from openpyxl import Workbook
+
+from apps.billing.models import Company
+from apps.core.models import Sequence
+from apps.exams import catalog, search
+from apps.exams.closure import panel_leaves
+from apps.exams.forms import ExamForm, ExamUpdateForm
+from apps.exams.imports import PANELS_SHEET, ExamImporter, PanelImporter
+from apps.exams.models import Exam, ExamCategory, ExamComponent, Provider
+from apps.exams.services import EXAM_CODE_PREFIX, allocate_exam_codes, next_exam_code
+from apps.imports.engine import ErrorReport, run_import
+from apps.orders.services import create_order, resolve_exam_details
+from apps.patients.models import Patient
+
+
+def catalog_workbook(exams, panels=None):
+    """Libro con la hoja de exámenes y, si se indica, la hoja de paneles"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Exámenes"
+    sheet.append(list(ExamImporter.columns))
+    for row in exams:
+        sheet.append(list(row))
+    if panels is not None:
+        sheet = workbook.create_sheet(PANELS_SHEET)
+        sheet.append(list(PanelImporter.columns))
+        for row in panels:
+            sheet.append(list(row))
+    fileobj = BytesIO()
+    workbook.save(fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+def import_catalog(exams, panels=None):
+    importer = ExamImporter()
+    report = ErrorReport(importer.columns)
+    try:
+        return run_import(importer, catalog_workbook(exams, panels), report)
+    finally:
+        report.save()
+        report.close()
+
+
+class ExamFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(name="Laboratorio Central")
+        cls.user = User.objects.create_user("admin")
+        Company.objects.create(
+            business_name="Laboratorio",
+            document_number="20123456789",
+            phone_number="999999999",
+            email="lab@example.com",
+            legal_address="Lima",
+        )
+
+    def test_provider_is_optional_and_saved(self):
+        form = ExamForm(data={"name": "Glucosa", "price": "10.00"})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.cleaned_data["provider"])
+
+        exam = Exam.objects.create(code="EX00001", name="Glucosa", price=10)
+        form = ExamUpdateForm(data={"name": "Glucosa", "price": "10.00", "provider": self.provider.id}, instance=exam)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        exam.refresh_from_db()
+        self.assertEqual(exam.provider, self.provider)
+
+    def test_create_and_update_pages_show_the_provider(self):
+        exam = Exam.objects.create(code="EX00001", name="Glucosa", price=10, provider=self.provider)
+        self.client.force_login(self.user)
+        for url in (reverse("exams_create"), reverse("exams_update", args=[exam.pk])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'name="provider"')
+                self.assertContains(response, "Laboratorio Central")
+
+
+class ExamCodeAllocationTests(TransactionTestCase):
+    """
+    Códigos de examen asignados con apps.core.sequences.allocate: continúan los
+    existentes, no se repiten y los bloques quedan contiguos.
+    """
+
+    scope = f"exam:{EXAM_CODE_PREFIX}"
+
+    def setUp(self):
+        Exam.objects.create(name="Glucosa", code="EX00007", price=10)
+        Exam.objects.create(name="Sin código", code="", price=10)
+
+    def test_first_use_continues_existing_codes(self):
+        self.assertFalse(Sequence.objects.filter(scope=self.scope).exists())
+
+        self.assertEqual(next_exam_code(), "EX00008")
+        self.assertEqual(allocate_exam_codes(3), ["EX00009", "EX00010", "EX00011"])
+        self.assertEqual(next_exam_code(), "EX00012")
+        self.assertEqual(Sequence.objects.get(scope=self.scope).last_value, 12)
+
+    def test_existing_codes_are_read_only_on_first_use(self):
+        next_exam_code()
+        Exam.objects.create(name="Urea", code="EX00050", price=10)
+
+        with mock.patch("apps.exams.services._last_code_number") as last_code_number:
+            self.assertEqual(next_exam_code(), "EX00009")
+        last_code_number.assert_not_called()
+
+    def test_scope_created_by_another_worker(self):
+        """El otro worker crea el ámbito entre el UPDATE sin filas y el INSERT de este"""
+
+        def other_worker_first(model, prefix):
+            # Lo mismo que deja allocate_exam_codes(2) en el otro worker
+            Sequence.objects.create(scope=self.scope, last_value=9)
+            return 7
+
+        with mock.patch("apps.exams.services._last_code_number", side_effect=other_worker_first):
+            codes = allocate_exam_codes(3)
+
+        self.assertEqual(codes, ["EX00010", "EX00011", "EX00012"])
+        self.assertEqual(Sequence.objects.get(scope=self.scope).last_value, 12)
+
+    def test_concurrent_allocations_do_not_collide(self):
+        workers, blocks_per_worker = 4, 5
+        blocks, errors = [], []
+        start = threading.Barrier(workers)
+
+        def work(count):
+            try:
+                start.wait()
+                for _ in range(blocks_per_worker):
+                    blocks.append(self.allocate_with_retry(count))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(count,)) for count in range(1, workers + 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        numbers = sorted(int(code[len(EXAM_CODE_PREFIX) :]) for block in blocks for code in block)
+        # 5 bloques de 1, 2, 3 y 4 códigos, sin huecos ni repetidos después de EX00007
+        self.assertEqual(numbers, list(range(8, 8 + blocks_per_worker * 10)))
+        for block in blocks:
+            block_numbers = [int(code[len(EXAM_CODE_PREFIX) :]) for code in block]
+            self.assertEqual(block_numbers, list(range(block_numbers[0], block_numbers[0] + len(block))))
+
+    @staticmethod
+    def allocate_with_retry(count):
+        # La base de pruebas SQLite en memoria (caché compartida) no espera los bloqueos
+        # como busy_timeout: el otro hilo recibe "table is locked" y reintenta
+        for _ in range(200):
+            try:
+                return allocate_exam_codes(count)
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                time.sleep(0.005)
+        raise AssertionError("No se pudo reservar el bloque de códigos")
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ExamCategory.objects.create(code="CA001", name="Bioquímica")
+        cls.glucose = Exam.objects.create(code="EX00005", name="Glucosa", price=10)
+
+    def exam(self, name):
+        return Exam.objects.get(name=name)
+
+    def issues(self, summary):
+        return [(issue.get("sheet"), issue["row"], issue["message"]) for issue in summary.error_sample]
+
+    def test_exam_codes_continue_existing_ones_without_gaps_across_chunks(self):
+        with mock.patch.object(ExamImporter, "chunk_size", 2):
+            summary = import_catalog([(f"Examen {i}", 10, "CA001") for i in range(1, 6)])
+
+        self.assertEqual(summary.counts["created"], 5)
+        codes = Exam.objects.exclude(pk=self.glucose.pk).order_by("code").values_list("code", flat=True)
+        self.assertEqual(list(codes), ["EX00006", "EX00007", "EX00008", "EX00009", "EX00010"])
+
+    def test_panel_with_panels_defined_later_in_the_sheet(self):
+        summary = import_catalog(
+            [
+                ("Urea", 10, "CA001"),
+                ("Creatinina", 12, "CA001"),
+                ("Perfil renal", 30, "CA001"),
+                ("Chequeo", 50, "CA001"),
+            ],
+            [
+                # "Chequeo" usa a "Perfil renal", cuyos componentes vienen después
+                ("Chequeo", "Perfil renal", None),
+                ("Chequeo", "EX00005", None),
+                ("Perfil renal", "Urea", 1),
+                ("Perfil renal", "Creatinina", 2),
+            ],
+        )
+        self.assertEqual(summary.counts["created"], 4 + 4)
+        self.assertEqual(summary.error_sample, [])
+
+        checkup, renal = self.exam("Chequeo"), self.exam("Perfil renal")
+        self.assertTrue(checkup.has_components)
+        self.assertTrue(renal.has_components)
+        leaves = panel_leaves({checkup.id, renal.id})
+        self.assertEqual(leaves[renal.id], (self.exam("Urea").id, self.exam("Creatinina").id))
+        self.assertEqual(leaves[checkup.id], (self.exam("Urea").id, self.exam("Creatinina").id, self.glucose.id))
+
+    def test_cycle_inside_the_file_rejects_its_last_row(self):
+        summary = import_catalog(
+            [("Perfil A", 10, "CA001"), ("Perfil B", 10, "CA001"), ("Perfil C", 10, "CA001")],
+            [
+                ("Perfil A", "Perfil B", None),
+                ("Perfil B", "Perfil C", None),
+                ("Perfil C", "Perfil A", None),
+                ("Perfil C", "Glucosa", None),
+            ],
+        )
+        self.assertEqual(summary.counts["created"], 3 + 3)
+        self.assertEqual(
+            self.issues(summary),
+            [(PANELS_SHEET, 4, "Ciclo de componentes - 'Perfil A' ya contiene al panel 'Perfil C'")],
+        )
+        self.assertFalse(
+            ExamComponent.objects.filter(
+                parent_exam=self.exam("Perfil C"), component_exam=self.exam("Perfil A")
+            ).exists()
+        )
+
+    def test_cycle_with_stored_components_is_rejected(self):
+        first = Exam.objects.create(code="EX00010", name="Perfil A", price=10, has_components=True)
+        second = Exam.objects.create(code="EX00011", name="Perfil B", price=10, has_components=True)
+        ExamComponent.objects.create(parent_exam=first, component_exam=second)
+
+        summary = import_catalog([], [("EX00011", "EX00010", None), ("EX00011", "Glucosa", None)])
+        self.assertEqual(summary.counts["created"], 1)
+        self.assertEqual(
+            self.issues(summary),
+            [(PANELS_SHEET, 2, "Ciclo de componentes - 'EX00010' ya contiene al panel 'EX00011'")],
+        )
+
+    def test_cycle_only_among_stored_components_rejects_the_whole_sheet(self):
+        first = Exam.objects.create(code="EX00010", name="Perfil A", price=10, has_components=True)
+        second = Exam.objects.create(code="EX00011", name="Perfil B", price=10, has_components=True)
+        # Datos anteriores a la validación de ciclos: bulk_create no pasa por la clausura
+        ExamComponent.objects.bulk_create(
+            [
+                ExamComponent(parent_exam=first, component_exam=second),
+                ExamComponent(parent_exam=second, component_exam=first),
+            ]
+        )
+
+        summary = import_catalog([], [("EX00010", "Glucosa", None), ("Perfil B", "Glucosa", None)])
+        self.assertEqual(summary.counts["created"], 0)
+        self.assertEqual(summary.counts["errors"], 2)
+        for _sheet, _row, message in self.issues(summary):
+            self.assertRegex(
+                message, r"^Los paneles existentes forman un ciclo \(EX0001[01] -> EX0001[01] -> EX0001[01]\)"
+            )
+        self.assertFalse(ExamComponent.objects.filter(component_exam=self.glucose).exists())
+
+
+class ExamSearchTests(TestCase):
+    """
+    Ranking del índice del selector (apps.exams.search). El catálogo y el índice
+    viven en el módulo y se descartan en cada prueba: la versión del catálogo
+    vuelve atrás con el rollback y un índice anterior con el mismo número seguiría vigente.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        names = [
+            "Urea",
+            "Ureaplasma",
+            "Área corporal",
+            "Hemograma completo",
+            "Hemoglobina glicosilada",
+            "Perfil hepático",
+            "Perfil lipídico",
+            "Ácido úrico",
+        ]
+        cls.exams = {
+            name: Exam.objects.create(code=f"EX{i:05d}", name=name, price=10) for i, name in enumerate(names, 1)
+        }
+
+    def setUp(self):
+        catalog._state.update(catalog=None, checked_at=0.0)
+        index = mock.patch.object(search, "_index", search.ExamSearchIndex())
+        index.start()
+        self.addCleanup(index.stop)
+
+    def search(self, text, **kwargs):
+        return [exam.name for exam in search.search_exams(text, **kwargs)]
+
+    def test_exact_beats_prefix_beats_typo(self):
+        self.assertEqual(self.search("urea"), ["Urea", "Ureaplasma", "Área corporal"])
+
+    def test_accents_and_case_are_ignored(self):
+        self.assertEqual(self.search("ÁREA"), ["Área corporal", "Urea"])
+        self.assertEqual(self.search("acido URICO"), ["Ácido úrico"])
+        self.assertEqual(self.search("hemoglobína"), ["Hemoglobina glicosilada"])
+
+    def test_one_edit_typos(self):
+        for text in ("hemogrma", "hemograama", "hemogrema", "hemogarma"):
+            with self.subTest(text=text):
+                self.assertEqual(self.search(text), ["Hemograma completo"])
+        # Dos errores no se toleran, ni uno en palabras de menos de FUZZY_MIN_LENGTH letras
+        self.assertEqual(self.search("hemgrma"), [])
+        self.assertEqual(self.search("ura"), [])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search("hemo comp"), ["Hemograma completo"])
+        self.assertEqual(self.search("perfil"), ["Perfil hepático", "Perfil lipídico"])
+        self.assertEqual(self.search("perfil", exclude_id=self.exams["Perfil hepático"].id), ["Perfil lipídico"])
+        # El código exacto primero; los demás códigos difieren en un dígito
+        self.assertEqual(self.search(self.exams["Urea"].code)[0], "Urea")
+
+    def test_popularity_breaks_ties(self):
+        patient = Patient.objects.create(
+            document_number="12345678",
+            first_name="José",
+            last_name="Núñez",
+            birthdate=date(1990, 1, 1),
+            sex="MALE",
+            phone_number="999999999",
+        )
+        create_order(patient, resolve_exam_details([{"exam_id": self.exams["Perfil lipídico"].id}]))
+
+        self.assertEqual(self.search("perfil"), ["Perfil lipídico", "Perfil hepático"])
+        # La popularidad no supera a una mejor coincidencia
+        self.assertEqual(self.search("perfil hepatico"), ["Perfil hepático"])
+
+    def test_text_without_words_returns_nothing(self):
+        for text in ("", "   ", "...", "-/"):
+            with self.subTest(text=text):
+                self.assertEqual(self.search(text), [])
+        self.assertEqual(search._index.results, {})
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(self.search("ure"), ["Urea", "Ureaplasma"])
+
+        urea = self.exams["Urea"]
+        urea.name = "Urea sérica"
+        urea.save()
+        Exam.objects.create(code="EX00100", name="Uretra cultivo", price=10)
+        self.exams["Ureaplasma"].delete()
+
+        self.assertEqual(self.search("ure"), ["Urea sérica", "Uretra cultivo"])
+        self.assertEqual(self.search("serica"), ["Urea sérica"])
+        self.assertEqual(search._index.version, catalog.catalog_version())
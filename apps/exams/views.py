@@ -10,6 +10,7 @@ from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import CreateView, ListView, UpdateView
 
+from apps.core.pagination import CursorPaginationMixin
 from apps.exams.forms import (
     ExamCategoryForm,
     ExamCategoryUpdateForm,
@@ -17,12 +18,17 @@ from apps.exams.forms import (
     ExamForm,
     ExamUpdateForm,
 )
+from apps.exams.imports import PANELS_SHEET
 from apps.exams.models import Exam, ExamCategory
+from apps.exams.search import search_exams
+from apps.exams.services import next_category_code, next_exam_code
+from apps.imports.models import ImportJob
+from apps.imports.services import enqueue_import
 
 logger = logging.getLogger(__name__)
 
 
-class ExamsListView(LoginRequiredMixin, ListView):
+class ExamsListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Exam
     template_name = "exams/exam_list.html"
     context_object_name = "exams"
@@ -106,17 +112,7 @@ class CreateExamView(LoginRequiredMixin, CreateView):
 
         with transaction.atomic():
             # Generar código automáticamente
-            last_exam = Exam.objects.order_by("-code").first()
-            if last_exam and last_exam.code and last_exam.code.startswith("EX"):
-                try:
-                    last_number = int(last_exam.code[2:])
-                    new_number = last_number + 1
-                except ValueError:
-                    new_number = 1
-            else:
-                new_number = 1
-
-            form.instance.code = f"EX{new_number:05d}"
+            form.instance.code = next_exam_code()
 
             self.object = form.save()
 
@@ -229,29 +225,29 @@ class UpdateExamView(LoginRequiredMixin, UpdateView):
 
 @login_required
 def search_exams_api(request):
-    """API endpoint para buscar exámenes por nombre"""
+    """API endpoint para buscar exámenes por nombre, código o categoría"""
     name = request.GET.get("name", "")
     parent_exam_id = request.GET.get("parent_exam_id", None)
 
     if not name:
         return JsonResponse({"exams": []})
 
-    exams = Exam.objects.filter(name__icontains=name)
-
     # Excluir el examen padre (validar que sea un entero válido)
+    exclude_id = None
     if parent_exam_id:
         try:
-            parent_exam_id = int(parent_exam_id)
-            exams = exams.exclude(id=parent_exam_id)
+            exclude_id = int(parent_exam_id)
         except (ValueError, TypeError):
             # Si no es un entero válido, ignorar el filtro
             pass
 
-    exams = exams[:10]  # Limitar a 10 resultados
+    # Índice en memoria sobre el catálogo, sin consultar la base de datos (apps.exams.search)
+    exams = search_exams(name, exclude_id=exclude_id, limit=10)
 
     exams_data = [
         {
             "id": exam.id,
+            "code": exam.code,
             "name": exam.name,
         }
         for exam in exams
@@ -306,17 +302,7 @@ class CreateExamCategoryView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         # Generar código automáticamente
-        last_category = ExamCategory.objects.order_by("-code").first()
-        if last_category and last_category.code.startswith("CA"):
-            try:
-                last_number = int(last_category.code[2:])
-                new_number = last_number + 1
-            except ValueError:
-                new_number = 1
-        else:
-            new_number = 1
-
-        form.instance.code = f"CA{new_number:03d}"
+        form.instance.code = next_category_code()
 
         messages.success(self.request, "Categoría creada exitosamente")
         return super().form_valid(form)
@@ -369,14 +355,26 @@ class ExamsDownloadTemplateView(LoginRequiredMixin, View):
             cell.fill = header_fill
             cell.font = header_font
 
-        # Fila de ejemplo
+        # Filas de ejemplo
         ws.append(["Hemograma Completo", 25.50, "CA001"])
+        ws.append(["Perfil Básico", 40.00, "CA001"])
 
         # Ajustar anchos de columna
         ws.column_dimensions["A"].width = 40  # Nombre del Examen
         ws.column_dimensions["B"].width = 15  # Precio
         ws.column_dimensions["C"].width = 20  # Código de Categoría
 
+        # Hoja opcional de paneles: panel y componente por código o nombre (ver apps.exams.imports)
+        ws_panels = wb.create_sheet(PANELS_SHEET)
+        ws_panels.append(["Panel", "Componente", "Orden"])
+        for cell in ws_panels[1]:
+            cell.fill = header_fill
+            cell.font = header_font
+        ws_panels.append(["Perfil Básico", "Hemograma Completo", 1])
+        ws_panels.column_dimensions["A"].width = 40  # Panel
+        ws_panels.column_dimensions["B"].width = 40  # Componente
+        ws_panels.column_dimensions["C"].width = 10  # Orden
+
         # Create response
         response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
         response["Content-Disposition"] = 'attachment; filename="plantilla_examenes.xlsx"'
@@ -405,123 +403,6 @@ class ExamsUploadView(LoginRequiredMixin, View):
             messages.error(request, "No se seleccionó ningún archivo")
             return redirect("exams_list")
 
-        excel_file = request.FILES["file"]
-
-        try:
-            import openpyxl
-
-            wb = openpyxl.load_workbook(excel_file)
-            ws = wb.active
-
-            created_count = 0
-            skipped_count = 0
-            error_count = 0
-
-            # Iterar desde fila 2 (skip header)
-            for row_number, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                # Columnas: Nombre del Examen, Precio, Código de Categoría
-                exam_name = row[0]
-                price = row[1]
-                category_code = row[2]
-
-                # Skip si faltan datos críticos
-                if not all([exam_name, price, category_code]):
-                    missing_fields = []
-                    if not exam_name:
-                        missing_fields.append("Nombre del Examen")
-                    if not price:
-                        missing_fields.append("Precio")
-                    if not category_code:
-                        missing_fields.append("Código de Categoría")
-
-                    logger.warning(
-                        f"Fila {row_number}: Datos incompletos - Faltan campos: {', '.join(missing_fields)} "
-                        f"[{exam_name or 'N/A'}, {price or 'N/A'}, {category_code or 'N/A'}]"
-                    )
-                    error_count += 1
-                    continue
-
-                try:
-                    # Aplicar strip() para limpiar espacios en blanco
-                    exam_name = str(exam_name).strip()
-                    category_code = str(category_code).strip()
-
-                    # Verificar si el examen ya existe (case insensitive)
-                    if Exam.objects.filter(name__iexact=exam_name).exists():
-                        logger.warning(
-                            f"Fila {row_number}: Examen duplicado - Ya existe un examen con el nombre '{exam_name}'"
-                        )
-                        skipped_count += 1
-                        continue
-
-                    # Buscar categoría por código
-                    try:
-                        category = ExamCategory.objects.get(code=category_code)
-                    except ExamCategory.DoesNotExist:
-                        logger.warning(
-                            f"Fila {row_number}: Categoría no encontrada con código '{category_code}' "
-                            f"[{exam_name}, {price}]"
-                        )
-                        error_count += 1
-                        continue
-
-                    # Validar precio
-                    try:
-                        price = float(price)
-                        if price < 0:
-                            logger.warning(
-                                f"Fila {row_number}: Precio inválido '{price}' debe ser mayor o igual a 0 "
-                                f"[{exam_name}, {category_code}]"
-                            )
-                            error_count += 1
-                            continue
-                    except (ValueError, TypeError):
-                        logger.warning(
-                            f"Fila {row_number}: Precio inválido '{price}' debe ser un número "
-                            f"[{exam_name}, {category_code}]"
-                        )
-                        error_count += 1
-                        continue
-
-                    # Generar código automáticamente
-                    last_exam = Exam.objects.order_by("-code").first()
-                    if last_exam and last_exam.code and last_exam.code.startswith("EX"):
-                        try:
-                            last_number = int(last_exam.code[2:])
-                            new_number = last_number + 1
-                        except ValueError:
-                            new_number = 1
-                    else:
-                        new_number = 1
-
-                    exam_code = f"EX{new_number:05d}"
-
-                    # Crear examen
-                    Exam.objects.create(
-                        code=exam_code,
-                        name=exam_name,
-                        price=price,
-                        category=category,
-                        has_components=False,
-                    )
-
-                    created_count += 1
-
-                except Exception as e:
-                    logger.warning(
-                        f"Fila {row_number}: Error al procesar - {str(e)} " f"[{exam_name}, {price}, {category_code}]"
-                    )
-                    logger.exception(f"Detalles del error en fila {row_number}")
-                    error_count += 1
-                    continue
-
-            messages.success(
-                request,
-                f"Importación completada: {created_count} creados, {skipped_count} omitidos, {error_count} errores",
-            )
-
-        except Exception as e:
-            logger.exception("Error al procesar el archivo de exámenes")
-            messages.error(request, f"Error al procesar el archivo: {str(e)}")
-
-        return redirect("exams_list")
+        job = enqueue_import(ImportJob.Kind.EXAMS, request.FILES["file"], request.user)
+        messages.success(request, "Archivo recibido: la importación se procesa en segundo plano")
+        return redirect("import_job_detail", pk=job.pk)
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.exports.services import claim_next_job, purge_expired_jobs, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Procesa las exportaciones en cola (ExportJob) y elimina los archivos vencidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesa los jobs pendientes y termina, en lugar de quedarse esperando nuevos",
+        )
+
+    def handle(self, *args, **options):
+        poll_seconds = settings.EXPORT_WORKER_POLL_SECONDS
+        self.stdout.write(f"Worker de exportaciones iniciado (intervalo {poll_seconds}s)")
+
+        while True:
+            expired = purge_expired_jobs()
+            if expired:
+                self.stdout.write(f"{expired} exportaciones expiradas eliminadas")
+
+            job = claim_next_job()
+            while job:
+                self.stdout.write(f"Procesando {job}")
+                run_export_job(job)
+                self.stdout.write(f"Terminado {job}")
+                job = claim_next_job()
+
+            if options["once"]:
+                return
+
+            time.sleep(poll_seconds)
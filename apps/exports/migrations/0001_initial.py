@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creacion")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualizacion")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("orders", "Órdenes"), ("price_list", "Tarifario")], max_length=20, verbose_name="Tipo"
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict, verbose_name="Parámetros")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "En Cola"),
+                            ("running", "En Proceso"),
+                            ("done", "Listo"),
+                            ("failed", "Error"),
+                            ("expired", "Expirado"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                ("progress", models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")),
+                ("total_rows", models.PositiveIntegerField(blank=True, null=True, verbose_name="Total de Filas")),
+                ("file", models.FileField(blank=True, upload_to="exports/", verbose_name="Archivo")),
+                ("filename", models.CharField(blank=True, max_length=200, verbose_name="Nombre de Archivo")),
+                ("error", models.TextField(blank=True, default="", verbose_name="Error")),
+                ("started_at", models.DateTimeField(blank=True, null=True, verbose_name="Inicio")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="Fin")),
+                ("expires_at", models.DateTimeField(blank=True, null=True, verbose_name="Expira")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Export Job",
+                "verbose_name_plural": "Export Jobs",
+            },
+        ),
+    ]
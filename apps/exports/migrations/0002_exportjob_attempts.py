@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("exports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0, verbose_name="Intentos"),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.core.models import TimeStampedModel
+
+
+class ExportJob(TimeStampedModel):
+    """Exportación ejecutada en segundo plano por el comando run_export_worker"""
+
+    class Kind(models.TextChoices):
+        ORDERS = "orders", "Órdenes"
+        PRICE_LIST = "price_list", "Tarifario"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "En Cola"
+        RUNNING = "running", "En Proceso"
+        DONE = "done", "Listo"
+        FAILED = "failed", "Error"
+        EXPIRED = "expired", "Expirado"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="Tipo")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name="Estado")
+    progress = models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name="Total de Filas")
+    file = models.FileField(upload_to="exports/", blank=True, verbose_name="Archivo")
+    filename = models.CharField(max_length=200, blank=True, verbose_name="Nombre de Archivo")
+    error = models.TextField(blank=True, default="", verbose_name="Error")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+        verbose_name="Solicitado por",
+    )
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Expira")
+
+    class Meta:
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} - {self.get_status_display()}"
+
+    @property
+    def percent(self):
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.progress * 100 / self.total_rows))
+
+    @staticmethod
+    def stale_cutoff():
+        """Los jobs en RUNNING sin actualizar (updated_at) desde este momento están abandonados"""
+        return timezone.now() - timedelta(minutes=settings.EXPORT_JOB_STALE_MINUTES)
+
+    @property
+    def is_downloadable(self):
+        return (
+            self.status == self.Status.DONE
+            and bool(self.file)
+            and (self.expires_at is None or self.expires_at > timezone.now())
+        )
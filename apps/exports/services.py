@@ -0,0 +1,217 @@
+"""
+Services para exportaciones en segundo plano
+
+Las exportaciones se encolan como filas de ExportJob y las procesa el comando
+run_export_worker; no se necesita Redis ni Celery. Si el worker se detiene con
+una exportación en curso (reinicio, falta de memoria), pasados
+EXPORT_JOB_STALE_MINUTES sin avance claim_next_job() la vuelve a generar desde
+el principio, hasta MAX_JOB_ATTEMPTS veces. Mientras el worker sigue vivo, un
+latido (JobHeartbeat) mantiene el job al día aunque no haya filas nuevas.
+"""
+
+import logging
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.exports.models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de exportaciones recientes que se muestran al usuario
+RECENT_JOBS_LIMIT = 5
+
+# Veces que se toma un job antes de darlo por fallido si el worker se sigue deteniendo con él
+MAX_JOB_ATTEMPTS = 3
+
+
+class JobProgress:
+    """Reporta el avance de un ExportJob sin recargar la fila completa"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def set_total(self, total_rows):
+        self.job.total_rows = total_rows
+        ExportJob.objects.filter(pk=self.job.pk).update(total_rows=total_rows, updated_at=timezone.now())
+
+    def __call__(self, count):
+        self.job.progress = count
+        # Latido: un job en RUNNING sin actualizar se considera abandonado (ver claim_next_job)
+        ExportJob.objects.filter(pk=self.job.pk).update(progress=count, updated_at=timezone.now())
+
+
+class JobHeartbeat:
+    """
+    Actualiza updated_at del job cada EXPORT_JOB_HEARTBEAT_SECONDS desde un hilo aparte.
+
+    JobProgress solo escribe cada EXPORT_CHUNK_SIZE filas: una consulta con pocas
+    coincidencias en una tabla grande, wb.save() o la copia a MEDIA_ROOT pueden
+    tardar más que EXPORT_JOB_STALE_MINUTES sin reportar avance, y otro worker
+    retomaría el job mientras este lo sigue generando.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.interval = settings.EXPORT_JOB_HEARTBEAT_SECONDS
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"export-heartbeat-{job.pk}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    ExportJob.objects.filter(pk=self.job.pk, status=ExportJob.Status.RUNNING).update(
+                        updated_at=timezone.now()
+                    )
+                except DatabaseError:
+                    logger.warning(f"No se pudo registrar el latido de la exportación {self.job.pk}", exc_info=True)
+        finally:
+            # La conexión es propia del hilo
+            connection.close()
+
+
+def _export_orders(params, fileobj, progress):
+    from apps.orders.exports import write_orders_workbook
+    from apps.orders.models import Order
+    from apps.orders.services import filter_orders
+
+    queryset = filter_orders(Order.objects.all(), params)
+    progress.set_total(queryset.count())
+    write_orders_workbook(queryset, fileobj, progress=progress)
+
+    now = timezone.localtime(timezone.now())
+    return f"ordenes_{now.strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+def _export_price_list(params, fileobj, progress):
+    from apps.pricing.exports import write_price_list_workbook
+    from apps.pricing.models import PriceList
+
+    price_list = PriceList.objects.get(pk=params["price_list_id"])
+    progress.set_total(price_list.items.count())
+    write_price_list_workbook(price_list, fileobj, progress=progress)
+
+    return f"tarifario_{price_list.name}.xlsx"
+
+
+# Cada exportador recibe (params, fileobj, progress) y retorna el nombre del archivo
+EXPORTERS = {
+    ExportJob.Kind.ORDERS: _export_orders,
+    ExportJob.Kind.PRICE_LIST: _export_price_list,
+}
+
+
+def enqueue_export(kind, params, user):
+    """
+    Encola una exportación para el worker.
+
+    Args:
+        kind: Valor de ExportJob.Kind
+        params: Filtros del exportador (dict serializable a JSON)
+        user: Usuario que solicita la exportación
+
+    Returns:
+        ExportJob: El job creado en estado PENDING
+    """
+    if kind not in EXPORTERS:
+        raise ValueError(f"Tipo de exportación no soportado: {kind}")
+    return ExportJob.objects.create(kind=kind, params=params, created_by=user)
+
+
+def recent_export_jobs(user, kind=None):
+    """Últimas exportaciones no expiradas del usuario"""
+    jobs = ExportJob.objects.filter(created_by=user).exclude(status=ExportJob.Status.EXPIRED)
+    if kind:
+        jobs = jobs.filter(kind=kind)
+    return jobs.order_by("-created_at")[:RECENT_JOBS_LIMIT]
+
+
+def claim_next_job():
+    """
+    Toma el siguiente job pendiente, o uno en RUNNING abandonado por un worker que
+    se detuvo (sin avance en EXPORT_JOB_STALE_MINUTES).
+
+    El cambio a RUNNING se hace con un UPDATE condicionado al estado, por lo que
+    dos workers nunca procesan el mismo job.
+
+    Returns:
+        ExportJob o None si no hay pendientes
+    """
+    now = timezone.now()
+    stale = Q(status=ExportJob.Status.RUNNING, updated_at__lt=ExportJob.stale_cutoff())
+
+    # Un job que detuvo al worker varias veces (ej: falta de memoria) no se vuelve a tomar
+    ExportJob.objects.filter(stale, attempts__gte=MAX_JOB_ATTEMPTS).update(
+        status=ExportJob.Status.FAILED,
+        error=f"El worker se detuvo {MAX_JOB_ATTEMPTS} veces procesando la exportación",
+        finished_at=now,
+        expires_at=now + timedelta(hours=settings.EXPORT_JOB_TTL_HOURS),
+        updated_at=now,
+    )
+
+    claimable = Q(status=ExportJob.Status.PENDING) | stale
+    for job_id in ExportJob.objects.filter(claimable).order_by("created_at", "id").values_list("id", flat=True)[:10]:
+        claimed = ExportJob.objects.filter(claimable, pk=job_id).update(
+            status=ExportJob.Status.RUNNING, started_at=now, updated_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return ExportJob.objects.get(pk=job_id)
+    return None
+
+
+def run_export_job(job):
+    """Ejecuta el exportador del job y guarda el archivo en MEDIA_ROOT/exports/"""
+    try:
+        exporter = EXPORTERS[job.kind]
+        with JobHeartbeat(job), tempfile.TemporaryFile() as tmp:
+            filename = exporter(job.params, tmp, JobProgress(job))
+            tmp.seek(0)
+            job.file.save(f"{job.pk}_{filename}", File(tmp), save=False)
+
+        job.filename = filename
+        job.status = ExportJob.Status.DONE
+        job.finished_at = timezone.now()
+        job.expires_at = job.finished_at + timedelta(hours=settings.EXPORT_JOB_TTL_HOURS)
+        job.save()
+    except Exception as e:
+        logger.exception(f"Error al ejecutar la exportación {job.pk}")
+        job.status = ExportJob.Status.FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.expires_at = job.finished_at + timedelta(hours=settings.EXPORT_JOB_TTL_HOURS)
+        job.save()
+
+
+def purge_expired_jobs():
+    """
+    Elimina los archivos de exportaciones vencidas.
+
+    Returns:
+        int: Cantidad de jobs expirados
+    """
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.Status.DONE, ExportJob.Status.FAILED], expires_at__lte=timezone.now()
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.status = ExportJob.Status.EXPIRED
+        job.save(update_fields=["file", "status", "updated_at"])
+        count += 1
+    return count
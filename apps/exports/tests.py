@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.exports import services
+from apps.exports.models import ExportJob
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    """Un job que tarda sin reportar filas (ej: wb.save()) no lo retoma otro worker mientras el suyo sigue vivo"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user("admin")
+        services.enqueue_export(ExportJob.Kind.ORDERS, {}, user)
+        self.job = services.claim_next_job()
+
+    def run_slow_export(self, seconds):
+        """Ejecuta el job con un exportador que no reporta avance; retorna lo que otro worker toma mientras tanto"""
+        claimed = []
+
+        def slow_exporter(params, fileobj, progress):
+            time.sleep(seconds)
+            stale_cutoff = timezone.now() - timedelta(seconds=seconds / 2)
+            with mock.patch.object(ExportJob, "stale_cutoff", return_value=stale_cutoff):
+                claimed.append(services.claim_next_job())
+            fileobj.write(b"xlsx")
+            return "ordenes.xlsx"
+
+        with mock.patch.dict(services.EXPORTERS, {ExportJob.Kind.ORDERS: slow_exporter}):
+            services.run_export_job(self.job)
+        return claimed[0]
+
+    @override_settings(EXPORT_JOB_HEARTBEAT_SECONDS=0.05)
+    def test_heartbeat_keeps_running_job(self):
+        self.assertIsNone(self.run_slow_export(0.5))
+
+        job = ExportJob.objects.get(pk=self.job.pk)
+        self.assertEqual(job.status, ExportJob.Status.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    @override_settings(EXPORT_JOB_HEARTBEAT_SECONDS=3600)
+    def test_job_without_heartbeat_is_reclaimed(self):
+        reclaimed = self.run_slow_export(0.5)
+
+        self.assertEqual(reclaimed.pk, self.job.pk)
+        self.assertEqual(reclaimed.attempts, 2)
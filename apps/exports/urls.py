@@ -0,0 +1,9 @@
+from django.urls import path
+
+from apps.exports import views
+
+urlpatterns = [
+    path("<int:pk>/download/", views.download_export, name="export_download"),
+    path("api/jobs/", views.export_jobs_api, name="api_export_jobs"),
+    path("api/jobs/create/", views.create_export_api, name="api_export_jobs_create"),
+]
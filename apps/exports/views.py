@@ -0,0 +1,86 @@
+import json
+import logging
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from apps.exports.models import ExportJob
+from apps.exports.services import enqueue_export, recent_export_jobs
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_export_job(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "kind_display": job.get_kind_display(),
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "progress": job.progress,
+        "total_rows": job.total_rows,
+        "percent": job.percent,
+        "filename": job.filename,
+        "error": job.error,
+        "created_at": timezone.localtime(job.created_at).strftime("%d/%m/%Y %H:%M"),
+        "download_url": reverse("export_download", kwargs={"pk": job.pk}) if job.is_downloadable else None,
+    }
+
+
+@login_required
+@require_POST
+def create_export_api(request):
+    """
+    API endpoint para encolar una exportación.
+
+    Body JSON:
+        - kind: 'orders' o 'price_list'
+        - params: filtros del exportador (ej: date_from, date_to, price_list_id)
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+
+    kind = data.get("kind")
+    params = data.get("params") or {}
+
+    if kind not in ExportJob.Kind.values:
+        return JsonResponse({"error": "Tipo de exportación inválido"}, status=400)
+
+    if not isinstance(params, dict):
+        return JsonResponse({"error": "Parámetros inválidos"}, status=400)
+
+    if kind == ExportJob.Kind.PRICE_LIST and not params.get("price_list_id"):
+        return JsonResponse({"error": "price_list_id es requerido"}, status=400)
+
+    try:
+        job = enqueue_export(kind, params, request.user)
+        return JsonResponse({"success": True, "job": serialize_export_job(job)}, status=201)
+    except Exception as e:
+        logger.exception("Error al encolar la exportación")
+        return JsonResponse({"error": f"Error al encolar la exportación: {str(e)}"}, status=500)
+
+
+@login_required
+@require_GET
+def export_jobs_api(request):
+    """API endpoint con las exportaciones recientes del usuario (para refrescar su avance)"""
+    jobs = recent_export_jobs(request.user, kind=request.GET.get("kind"))
+    return JsonResponse({"jobs": [serialize_export_job(job) for job in jobs]})
+
+
+@login_required
+@require_GET
+def download_export(request, pk):
+    """Descargar el archivo de una exportación terminada"""
+    job = get_object_or_404(ExportJob, pk=pk, created_by=request.user)
+
+    if not job.is_downloadable:
+        raise Http404("La exportación no está disponible")
+
+    return FileResponse(job.file.open("rb"), as_attachment=True, filename=job.filename)
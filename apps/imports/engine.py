@@ -0,0 +1,359 @@
+"""
+Motor de importación de planillas Excel (pacientes, exámenes, tarifarios)
+
+La hoja se lee en modo read-only: openpyxl entrega las filas a medida que las
+descomprime en lugar de cargar el libro completo en memoria. Las filas se
+procesan en bloques de Importer.chunk_size:
+
+    1. Importer.parse_row() valida y convierte cada fila; un RowError la
+       descarta (SkipRow la omite sin contarla como error).
+    2. Importer.save_chunk() resuelve las búsquedas del bloque con consultas
+       por conjunto (IN) y escribe con bulk_create / bulk_update, todo dentro de
+       una transacción por bloque. Si la escritura falla se revierte el bloque
+       completo y sus filas se informan con el error de la base de datos.
+    3. progress() recibe el avance dentro de la misma transacción, por lo que
+       la última fila registrada siempre corresponde a datos guardados (o a
+       filas ya informadas en el reporte, si su bloque se revirtió).
+
+Un importador puede declarar hojas adicionales del mismo libro (extra_sheets,
+ej: los paneles del catálogo de exámenes), que se procesan con su propio
+importador después de la hoja principal. Sus filas no mueven last_row.
+
+Una importación interrumpida se reanuda pasando el último ImportSummary
+registrado (resume=): las filas hasta su last_row se leen pero no se vuelven a
+procesar, y los conteos continúan desde ese punto.
+
+Las filas descartadas u omitidas se escriben en un reporte Excel (ErrorReport)
+con el número de fila, el motivo y los valores originales, en lugar de
+registrarse en el log una por una.
+
+Con dry_run=True cada bloque se procesa igual pero su transacción se revierte:
+los conteos y los cambios registrados (ChunkResult.change) son exactamente los
+de la importación real, sin escribir nada. Se usa como vista previa antes de
+confirmar (ImportJob.Status.PREVIEW).
+"""
+
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+logger = logging.getLogger(__name__)
+
+# Filas por transacción
+IMPORT_CHUNK_SIZE = 1000
+
+# Filas con problemas que se guardan en el job para mostrarlas sin descargar el reporte
+ERROR_SAMPLE_SIZE = 20
+
+# Cambios (ej: precio anterior -> nuevo) que se guardan para la vista previa
+CHANGE_SAMPLE_SIZE = 200
+
+COUNT_KEYS = ("created", "updated", "unchanged", "skipped", "errors")
+
+SKIPPED = "Omitida"
+REJECTED = "Error"
+
+
+class RowError(Exception):
+    """La fila no es válida: se descarta y se informa en el reporte"""
+
+
+class SkipRow(RowError):
+    """La fila no se importa pero no es un error (ej: el registro ya existe)"""
+
+
+class ImportRow:
+    """Fila de la hoja: número (como en Excel), valores originales y datos convertidos por parse_row()"""
+
+    __slots__ = ("number", "values", "data")
+
+    def __init__(self, number, values):
+        self.number = number
+        self.values = values
+        self.data = None
+
+
+class ChunkResult:
+    """Resultado de un bloque; se suma al total recién cuando su transacción se confirma"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNT_KEYS, 0)
+        self.issues = []  # [(ImportRow, SKIPPED o REJECTED, mensaje)]
+        self.changes = []  # [dict] con el detalle de lo que se crea o modifica
+
+    def add(self, key, count=1):
+        self.counts[key] += count
+
+    def skip(self, row, message):
+        self.counts["skipped"] += 1
+        self.issues.append((row, SKIPPED, message))
+
+    def reject(self, row, message):
+        self.counts["errors"] += 1
+        self.issues.append((row, REJECTED, message))
+
+    def change(self, row, **details):
+        """Registra el detalle de un cambio para la vista previa (ej: code, name, old, new)"""
+        self.changes.append({"row": row.number, **details})
+
+    def ordered_issues(self):
+        return sorted(self.issues, key=lambda issue: issue[0].number)
+
+
+class ImportSummary:
+    """Totales de la importación hasta el último bloque guardado"""
+
+    def __init__(self, rows=0, last_row=0, counts=None, error_sample=None, changes=None):
+        self.rows = rows
+        self.last_row = last_row
+        self.counts = counts or dict.fromkeys(COUNT_KEYS, 0)
+        self.error_sample = error_sample or []
+        self.changes = changes or []
+
+    def advanced(self, result, rows, last_row, sheet=None):
+        """Nuevo resumen con el bloque sumado (el actual no cambia hasta confirmar la transacción)"""
+        counts = {key: self.counts[key] + result.counts[key] for key in COUNT_KEYS}
+        error_sample = list(self.error_sample)
+        for row, status, message in result.ordered_issues()[: ERROR_SAMPLE_SIZE - len(error_sample)]:
+            issue = {"row": row.number, "status": status, "message": message}
+            if sheet:
+                issue["sheet"] = sheet
+            error_sample.append(issue)
+        changes = self.changes + result.changes[: CHANGE_SAMPLE_SIZE - len(self.changes)]
+        return ImportSummary(self.rows + rows, last_row, counts, error_sample, changes)
+
+
+class ErrorReport:
+    """Reporte Excel de las filas con error u omitidas, escrito en streaming (write-only)"""
+
+    def __init__(self, columns):
+        self.count = 0
+        self.fileobj = tempfile.TemporaryFile()
+        self.workbook = Workbook(write_only=True)
+        self.start_sheet("Errores", columns)
+
+    def start_sheet(self, title, columns):
+        """Las filas siguientes se escriben en una hoja nueva (ej: la de una hoja adicional del libro)"""
+        self.sheet = self.workbook.create_sheet(title[:31])
+        self.sheet.column_dimensions["A"].width = 8
+        self.sheet.column_dimensions["B"].width = 12
+        self.sheet.column_dimensions["C"].width = 60
+
+        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF")
+        header_row = []
+        for header in ["Fila", "Resultado", "Detalle", *columns]:
+            cell = WriteOnlyCell(self.sheet, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+            header_row.append(cell)
+        self.sheet.append(header_row)
+
+    def add(self, row, status, message):
+        self.sheet.append([row.number, status, message, *row.values])
+        self.count += 1
+
+    def carry_over(self, fileobj, last_row):
+        """Copia de un reporte anterior las filas hasta last_row (al reanudar una importación)"""
+        workbook = load_workbook(fileobj, read_only=True)
+        try:
+            for values in workbook.active.iter_rows(min_row=2, values_only=True):
+                if values[0] is not None and values[0] <= last_row:
+                    self.sheet.append(values)
+                    self.count += 1
+        finally:
+            workbook.close()
+
+    def save(self):
+        """Cierra el libro y retorna el archivo (posicionado al inicio), o None si no hubo filas"""
+        self.workbook.save(self.fileobj)
+        self.fileobj.seek(0)
+        return self.fileobj if self.count else None
+
+    def close(self):
+        self.fileobj.close()
+
+
+class Importer(ABC):
+    """
+    Base de los importadores de cada app (ver apps.imports.services.IMPORTERS).
+
+    Las subclases definen (parse_row y save_chunk son obligatorios: una subclase
+    que no los implemente no se puede instanciar):
+        columns: Encabezados de la plantilla, en orden
+        required_columns: Columnas que no pueden venir vacías
+        parse_row(values): Valida y convierte la fila; lanza RowError o SkipRow
+        save_chunk(rows, result): Guarda las filas válidas del bloque en bloque
+        chunk_saved(): Opcional; se llama cuando el bloque se confirmó, para que el
+            importador conserve estado entre bloques solo si sus filas se guardaron
+        extra_sheets: Hojas opcionales ((nombre, subclase de Importer), ...) que se
+            importan después de la principal, si el libro las tiene
+    """
+
+    columns = ()
+    required_columns = ()
+    chunk_size = IMPORT_CHUNK_SIZE
+    extra_sheets = ()
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    @abstractmethod
+    def parse_row(self, values):
+        """
+        Args:
+            values: Tupla con los valores de la fila, uno por columna
+
+        Returns:
+            dict: Datos convertidos, disponibles en save_chunk() como row.data
+        """
+
+    @abstractmethod
+    def save_chunk(self, rows, result):
+        """
+        Guarda un bloque dentro de una transacción.
+
+        Args:
+            rows: list[ImportRow] que pasaron parse_row()
+            result: ChunkResult donde contar creados/actualizados e informar filas omitidas
+        """
+
+    def chunk_saved(self):  # noqa: B027 - opcional, por defecto no hace nada
+        """El último save_chunk() se confirmó (en una vista previa, se procesó sin errores)"""
+
+    def missing_columns(self, values):
+        return [
+            column
+            for column, value in zip(self.columns, values, strict=True)
+            if column in self.required_columns and (value is None or str(value).strip() == "")
+        ]
+
+    def parse(self, row):
+        missing = self.missing_columns(row.values)
+        if missing:
+            raise RowError(f"Datos incompletos - Faltan campos: {', '.join(missing)}")
+        row.data = self.parse_row(row.values)
+
+
+def read_rows(sheet, width):
+    """Filas de datos (desde la 2, sin las vacías) con exactamente width valores"""
+    for number, values in enumerate(sheet.iter_rows(min_row=2, max_col=width, values_only=True), start=2):
+        if any(value is not None and str(value).strip() != "" for value in values):
+            yield ImportRow(number, tuple(values) + (None,) * (width - len(values)))
+
+
+def main_sheet(workbook, importer):
+    """Hoja principal: la activa, o la primera que no sea una hoja adicional del importador"""
+    extra_names = {name for name, _ in importer.extra_sheets}
+    if workbook.active.title not in extra_names:
+        return workbook.active
+    for sheet in workbook.worksheets:
+        if sheet.title not in extra_names:
+            return sheet
+    raise ValueError(f"El archivo solo tiene las hojas {', '.join(sorted(extra_names))}")
+
+
+def run_import(importer, fileobj, report, progress=None, dry_run=False, resume=None):
+    """
+    Importa la hoja principal del archivo por bloques, y luego sus hojas adicionales.
+
+    Args:
+        importer: Instancia de una subclase de Importer
+        fileobj: Archivo .xlsx (ruta o archivo abierto)
+        report: ErrorReport donde se escriben las filas omitidas o con error
+        progress: Objeto opcional con set_total(total_rows) y __call__(summary), llamado por bloque
+        dry_run: Revertir cada bloque después de procesarlo (vista previa)
+        resume: ImportSummary de una ejecución anterior; se continúa desde su last_row
+
+    Returns:
+        ImportSummary
+    """
+    summary = resume or ImportSummary()
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        sheet = main_sheet(workbook, importer)
+        extra = [
+            (workbook[name], importer_class(importer.params))
+            for name, importer_class in importer.extra_sheets
+            if name in workbook.sheetnames
+        ]
+        sheets = [sheet, *(extra_sheet for extra_sheet, _ in extra)]
+        if progress and all(each.max_row for each in sheets):
+            progress.set_total(sum(max(each.max_row - 1, 0) for each in sheets))
+
+        rows = read_rows(sheet, len(importer.columns))
+        if summary.last_row:
+            rows = (row for row in rows if row.number > summary.last_row)
+        summary = import_chunks(importer, rows, report, summary, progress, dry_run)
+
+        for extra_sheet, extra_importer in extra:
+            report.start_sheet(f"Errores {extra_sheet.title}", extra_importer.columns)
+            rows = read_rows(extra_sheet, len(extra_importer.columns))
+            summary = import_chunks(extra_importer, rows, report, summary, progress, dry_run, sheet=extra_sheet.title)
+    finally:
+        workbook.close()
+    return summary
+
+
+def import_chunks(importer, rows, report, summary, progress=None, dry_run=False, sheet=None):
+    """
+    Procesa las filas de una hoja por bloques de importer.chunk_size (ver run_import).
+
+    Args:
+        sheet: Nombre de una hoja adicional; sus filas se identifican por hoja y no mueven last_row
+
+    Returns:
+        ImportSummary con los bloques sumados
+    """
+    while chunk := list(islice(rows, importer.chunk_size)):
+        last_row = summary.last_row if sheet else chunk[-1].number
+        result = ChunkResult()
+        valid = []
+        for row in chunk:
+            try:
+                importer.parse(row)
+            except SkipRow as e:
+                result.skip(row, str(e))
+            except RowError as e:
+                result.reject(row, str(e))
+            else:
+                valid.append(row)
+
+        issues = list(result.issues)
+        try:
+            with transaction.atomic():
+                if valid:
+                    importer.save_chunk(valid, result)
+                advanced = summary.advanced(result, len(chunk), last_row, sheet)
+                if dry_run:
+                    transaction.set_rollback(True)
+                elif progress:
+                    progress(advanced)
+            if dry_run and progress:
+                progress(advanced)
+            if valid:
+                importer.chunk_saved()
+        except DatabaseError as e:
+            logger.exception(f"Error al guardar las filas {chunk[0].number}-{chunk[-1].number}")
+            # El bloque se revirtió: solo quedan los errores de validación y las filas válidas fallan.
+            # Sus filas quedan informadas en el reporte, así que al reanudar no se repiten
+            result = ChunkResult()
+            result.issues = issues
+            result.counts["skipped"] = sum(1 for _, status, _ in issues if status == SKIPPED)
+            result.counts["errors"] = len(issues) - result.counts["skipped"]
+            for row in valid:
+                result.reject(row, f"No se pudo guardar el bloque de filas: {e}")
+            advanced = summary.advanced(result, len(chunk), last_row, sheet)
+            if progress:
+                progress(advanced)
+
+        summary = advanced
+        for row, status, message in result.ordered_issues():
+            report.add(row, status, message)
+    return summary
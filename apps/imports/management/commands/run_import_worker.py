@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.imports.services import claim_next_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Procesa las importaciones de planillas en cola (ImportJob)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesa los jobs pendientes y termina, en lugar de quedarse esperando nuevos",
+        )
+
+    def handle(self, *args, **options):
+        poll_seconds = settings.IMPORT_WORKER_POLL_SECONDS
+        self.stdout.write(f"Worker de importaciones iniciado (intervalo {poll_seconds}s)")
+
+        while True:
+            job = claim_next_job()
+            while job:
+                self.stdout.write(f"Procesando {job}")
+                run_import_job(job)
+                self.stdout.write(f"Terminado {job}: {job.summary()}")
+                job = claim_next_job()
+
+            if options["once"]:
+                return
+
+            time.sleep(poll_seconds)
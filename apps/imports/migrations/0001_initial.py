@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creacion")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualizacion")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("patients", "Pacientes"), ("exams", "Exámenes"), ("price_list", "Tarifario")],
+                        max_length=20,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict, verbose_name="Parámetros")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "En Cola"),
+                            ("running", "En Proceso"),
+                            ("done", "Listo"),
+                            ("failed", "Error"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                ("file", models.FileField(blank=True, upload_to="imports/", verbose_name="Archivo")),
+                ("filename", models.CharField(blank=True, max_length=200, verbose_name="Nombre de Archivo")),
+                ("progress", models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")),
+                ("total_rows", models.PositiveIntegerField(blank=True, null=True, verbose_name="Total de Filas")),
+                ("last_row", models.PositiveIntegerField(default=0, verbose_name="Última Fila Guardada")),
+                ("counts", models.JSONField(blank=True, default=dict, verbose_name="Resultados")),
+                ("error_sample", models.JSONField(blank=True, default=list, verbose_name="Primeros Errores")),
+                ("error_report", models.FileField(blank=True, upload_to="imports/", verbose_name="Reporte de Errores")),
+                ("error", models.TextField(blank=True, default="", verbose_name="Error")),
+                ("started_at", models.DateTimeField(blank=True, null=True, verbose_name="Inicio")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="Fin")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="import_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import Job",
+                "verbose_name_plural": "Import Jobs",
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("imports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="changes",
+            field=models.JSONField(blank=True, default=list, verbose_name="Cambios"),
+        ),
+        migrations.AlterField(
+            model_name="importjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("preview", "Por Confirmar"),
+                    ("pending", "En Cola"),
+                    ("running", "En Proceso"),
+                    ("done", "Listo"),
+                    ("failed", "Error"),
+                    ("cancelled", "Cancelado"),
+                ],
+                default="pending",
+                max_length=20,
+                verbose_name="Estado",
+            ),
+        ),
+    ]
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.core.models import TimeStampedModel
+
+
+class ImportJob(TimeStampedModel):
+    """Importación de una planilla Excel ejecutada en segundo plano por el comando run_import_worker"""
+
+    class Kind(models.TextChoices):
+        PATIENTS = "patients", "Pacientes"
+        EXAMS = "exams", "Exámenes"
+        PRICE_LIST = "price_list", "Tarifario"
+
+    class Status(models.TextChoices):
+        PREVIEW = "preview", "Por Confirmar"
+        PENDING = "pending", "En Cola"
+        RUNNING = "running", "En Proceso"
+        DONE = "done", "Listo"
+        FAILED = "failed", "Error"
+        CANCELLED = "cancelled", "Cancelado"
+
+    # Resultados por fila (ver apps.imports.engine.COUNT_KEYS)
+    COUNT_LABELS = {
+        "created": "Creados",
+        "updated": "Actualizados",
+        "unchanged": "Sin cambios",
+        "skipped": "Omitidos",
+        "errors": "Errores",
+    }
+
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="Tipo")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name="Estado")
+    file = models.FileField(upload_to="imports/", blank=True, verbose_name="Archivo")
+    filename = models.CharField(max_length=200, blank=True, verbose_name="Nombre de Archivo")
+    progress = models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name="Total de Filas")
+    last_row = models.PositiveIntegerField(default=0, verbose_name="Última Fila Guardada")
+    counts = models.JSONField(default=dict, blank=True, verbose_name="Resultados")
+    error_sample = models.JSONField(default=list, blank=True, verbose_name="Primeros Errores")
+    changes = models.JSONField(default=list, blank=True, verbose_name="Cambios")
+    error_report = models.FileField(upload_to="imports/", blank=True, verbose_name="Reporte de Errores")
+    error = models.TextField(blank=True, default="", verbose_name="Error")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="import_jobs",
+        verbose_name="Solicitado por",
+    )
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} - {self.get_status_display()}"
+
+    @property
+    def percent(self):
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.progress * 100 / self.total_rows))
+
+    @property
+    def is_active(self):
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
+
+    @staticmethod
+    def stale_cutoff():
+        """Los jobs en RUNNING sin actualizar (updated_at) desde este momento están abandonados"""
+        return timezone.now() - timedelta(minutes=settings.IMPORT_JOB_STALE_MINUTES)
+
+    @property
+    def is_stale(self):
+        """En proceso pero sin avance en IMPORT_JOB_STALE_MINUTES: el worker se detuvo (ej: reinicio, falta de memoria)"""
+        return self.status == self.Status.RUNNING and self.updated_at < self.stale_cutoff()
+
+    @property
+    def can_resume(self):
+        return bool(self.file) and (self.status == self.Status.FAILED or self.is_stale)
+
+    @property
+    def count_items(self):
+        """Lista de (etiqueta, cantidad) de los resultados que ocurrieron"""
+        return [(label, self.counts[key]) for key, label in self.COUNT_LABELS.items() if self.counts.get(key)]
+
+    def summary(self):
+        """Texto del resultado (ej: "120 creados, 3 omitidos, 2 errores")"""
+        return ", ".join(f"{count} {label.lower()}" for label, count in self.count_items) or "Sin filas"
@@ -0,0 +1,232 @@
+"""
+Services para importaciones en segundo plano
+
+Cada planilla subida se guarda en MEDIA_ROOT/imports/ y se encola como un
+ImportJob; el comando run_import_worker la procesa con el motor de
+apps.imports.engine. Al terminar se elimina el archivo subido y queda el
+reporte de filas omitidas o con error.
+
+Si una importación falla (ej: se cae la base de datos a mitad de un archivo de
+200 mil filas) el archivo se conserva y resume_import() la vuelve a encolar:
+continúa desde la última fila guardada (ImportJob.last_row) con los conteos y
+el reporte de errores acumulados. Lo mismo ocurre si el worker se detiene sin
+llegar a marcar el error (reinicio, falta de memoria): el job queda en RUNNING
+sin avanzar y, pasados IMPORT_JOB_STALE_MINUTES, claim_next_job() lo retoma
+desde su última fila guardada (hasta MAX_JOB_ATTEMPTS veces; después queda en
+error y se puede reanudar a mano).
+
+Las importaciones con vista previa (ej: tarifarios) se procesan primero en el
+request sin guardar nada (dry run) y quedan en PREVIEW con los conteos y el
+detalle de los cambios; recién al confirmarlas pasan a la cola del worker.
+"""
+
+import logging
+
+from django.core.files import File
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.imports.engine import ErrorReport, ImportSummary, run_import
+from apps.imports.models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# Veces que se toma un job antes de darlo por fallido si el worker se sigue deteniendo con él
+MAX_JOB_ATTEMPTS = 3
+
+# Importador (subclase de apps.imports.engine.Importer) de cada tipo; los params del job llegan al constructor
+IMPORTERS = {
+    ImportJob.Kind.PATIENTS: "apps.patients.imports.PatientImporter",
+    ImportJob.Kind.EXAMS: "apps.exams.imports.ExamImporter",
+    ImportJob.Kind.PRICE_LIST: "apps.pricing.imports.PriceListImporter",
+}
+
+
+class JobProgress:
+    """Reporta el avance de un ImportJob sin recargar la fila completa"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def set_total(self, total_rows):
+        self.job.total_rows = total_rows
+        ImportJob.objects.filter(pk=self.job.pk).update(total_rows=total_rows, updated_at=timezone.now())
+
+    def __call__(self, summary):
+        self.job.progress = summary.rows
+        self.job.last_row = summary.last_row
+        self.job.counts = summary.counts
+        self.job.error_sample = summary.error_sample
+        self.job.changes = summary.changes
+        ImportJob.objects.filter(pk=self.job.pk).update(
+            progress=summary.rows,
+            last_row=summary.last_row,
+            counts=summary.counts,
+            error_sample=summary.error_sample,
+            changes=summary.changes,
+            # Latido: un job en RUNNING sin actualizar se considera abandonado (ver claim_next_job)
+            updated_at=timezone.now(),
+        )
+
+
+def enqueue_import(kind, uploaded_file, user, params=None, preview=False):
+    """
+    Guarda la planilla y encola su importación para el worker.
+
+    Args:
+        kind: Valor de ImportJob.Kind
+        uploaded_file: Archivo subido (.xlsx)
+        user: Usuario que solicita la importación
+        params: Parámetros del importador (dict serializable a JSON, ej: price_list_id)
+        preview: Dejar el job en PREVIEW hasta que se confirme (ver preview_import_job)
+
+    Returns:
+        ImportJob: El job creado en estado PENDING (o PREVIEW)
+    """
+    if kind not in IMPORTERS:
+        raise ValueError(f"Tipo de importación no soportado: {kind}")
+    return ImportJob.objects.create(
+        kind=kind,
+        params=params or {},
+        status=ImportJob.Status.PREVIEW if preview else ImportJob.Status.PENDING,
+        file=uploaded_file,
+        filename=uploaded_file.name,
+        created_by=user,
+    )
+
+
+def claim_next_job():
+    """
+    Toma el siguiente job pendiente, o uno en RUNNING abandonado por un worker que
+    se detuvo (sin avance en IMPORT_JOB_STALE_MINUTES), que continúa desde su
+    última fila guardada.
+
+    El cambio a RUNNING se hace con un UPDATE condicionado al estado, por lo que
+    dos workers nunca procesan el mismo job.
+
+    Returns:
+        ImportJob o None si no hay pendientes
+    """
+    now = timezone.now()
+    stale = Q(status=ImportJob.Status.RUNNING, updated_at__lt=ImportJob.stale_cutoff())
+
+    # Un job que detuvo al worker varias veces (ej: falta de memoria) no se vuelve a tomar solo
+    ImportJob.objects.filter(stale, attempts__gte=MAX_JOB_ATTEMPTS).update(
+        status=ImportJob.Status.FAILED,
+        error=f"El worker se detuvo {MAX_JOB_ATTEMPTS} veces procesando la importación",
+        finished_at=now,
+        updated_at=now,
+    )
+
+    claimable = Q(status=ImportJob.Status.PENDING) | stale
+    for job_id in ImportJob.objects.filter(claimable).order_by("created_at", "id").values_list("id", flat=True)[:10]:
+        claimed = ImportJob.objects.filter(claimable, pk=job_id).update(
+            status=ImportJob.Status.RUNNING, started_at=now, updated_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=job_id)
+    return None
+
+
+def run_import_job(job):
+    """
+    Ejecuta el importador del job y guarda el reporte de errores en MEDIA_ROOT/imports/.
+    Un job reanudado (last_row > 0) continúa desde la fila siguiente.
+    """
+    _execute(job, dry_run=False)
+
+
+def preview_import_job(job):
+    """
+    Procesa un job en PREVIEW sin guardar nada: deja los conteos, los cambios y el
+    reporte de errores tal como quedarían, a la espera de confirm_import().
+    """
+    _execute(job, dry_run=True)
+
+
+def confirm_import(job):
+    """
+    Pasa un job de PREVIEW a la cola del worker.
+
+    Returns:
+        bool: False si el job ya no estaba en vista previa (ej: se confirmó dos veces)
+    """
+    confirmed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.Status.PREVIEW).update(
+        status=ImportJob.Status.PENDING, progress=0, last_row=0, counts={}, error_sample=[], changes=[]
+    )
+    if confirmed and job.error_report:
+        # La importación real genera su propio reporte
+        job.error_report.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(error_report="")
+    return bool(confirmed)
+
+
+def resume_import(job):
+    """
+    Vuelve a encolar un job que falló o que quedó abandonado en RUNNING (ver
+    ImportJob.is_stale), conservando el avance guardado.
+
+    Returns:
+        bool: False si el job no estaba en error ni abandonado, o ya no tiene el archivo subido
+    """
+    if not job.file:
+        return False
+    resumable = Q(status=ImportJob.Status.FAILED) | Q(
+        status=ImportJob.Status.RUNNING, updated_at__lt=ImportJob.stale_cutoff()
+    )
+    resumed = ImportJob.objects.filter(resumable, pk=job.pk).update(
+        status=ImportJob.Status.PENDING, error="", finished_at=None, attempts=0
+    )
+    return bool(resumed)
+
+
+def cancel_import(job):
+    """Descarta un job en PREVIEW y sus archivos; retorna False si ya no estaba en vista previa"""
+    cancelled = ImportJob.objects.filter(pk=job.pk, status=ImportJob.Status.PREVIEW).update(
+        status=ImportJob.Status.CANCELLED, finished_at=timezone.now()
+    )
+    if cancelled:
+        for field in (job.file, job.error_report):
+            if field:
+                field.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(file="", error_report="")
+    return bool(cancelled)
+
+
+def _execute(job, dry_run):
+    importer = import_string(IMPORTERS[job.kind])(job.params)
+    report = ErrorReport(importer.columns)
+    resume = None
+    if job.last_row:
+        logger.info(f"Reanudando la importación {job.pk} desde la fila {job.last_row + 1}")
+        resume = ImportSummary(job.progress, job.last_row, job.counts, job.error_sample, job.changes)
+    try:
+        if job.error_report:
+            # El nuevo reporte reemplaza al de la ejecución anterior, con sus filas ya procesadas
+            if resume:
+                with job.error_report.open("rb") as previous:
+                    report.carry_over(previous, resume.last_row)
+            job.error_report.delete(save=False)
+        with job.file.open("rb") as fileobj:
+            run_import(importer, fileobj, report, progress=JobProgress(job), dry_run=dry_run, resume=resume)
+        if not dry_run:
+            job.status = ImportJob.Status.DONE
+    except Exception as e:
+        logger.exception(f"Error al ejecutar la importación {job.pk}")
+        job.status = ImportJob.Status.FAILED
+        job.error = str(e)
+
+    try:
+        report_file = report.save()
+        if report_file:
+            job.error_report.save(f"{job.pk}_errores.xlsx", File(report_file), save=False)
+    finally:
+        report.close()
+
+    # La planilla puede tener datos personales: se conserva solo si la importación falló
+    if job.status == ImportJob.Status.DONE and job.file:
+        job.file.delete(save=False)
+    if job.status != ImportJob.Status.PREVIEW:
+        job.finished_at = timezone.now()
+    job.save()
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from apps.imports import views
+
+urlpatterns = [
+    path("<int:pk>/", views.ImportJobDetailView.as_view(), name="import_job_detail"),
+    path("<int:pk>/confirm/", views.confirm_import_job, name="import_job_confirm"),
+    path("<int:pk>/cancel/", views.cancel_import_job, name="import_job_cancel"),
+    path("<int:pk>/resume/", views.resume_import_job, name="import_job_resume"),
+    path("<int:pk>/errors/", views.download_import_errors, name="import_job_errors"),
+    path("api/jobs/<int:pk>/", views.import_job_api, name="api_import_job"),
+]
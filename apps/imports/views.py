@@ -0,0 +1,118 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+from django.views.generic import DetailView
+
+from apps.imports.models import ImportJob
+from apps.imports.services import cancel_import, confirm_import, resume_import
+
+
+def serialize_import_job(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "kind_display": job.get_kind_display(),
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "progress": job.progress,
+        "total_rows": job.total_rows,
+        "percent": job.percent,
+        "counts": job.counts,
+        "summary": job.summary(),
+        "error": job.error,
+        "created_at": timezone.localtime(job.created_at).strftime("%d/%m/%Y %H:%M"),
+        "error_report_url": reverse("import_job_errors", kwargs={"pk": job.pk}) if job.error_report else None,
+    }
+
+
+def import_back_url(job):
+    """Listado al que pertenece la importación"""
+    if job.kind == ImportJob.Kind.PATIENTS:
+        return reverse("patients_list")
+    if job.kind == ImportJob.Kind.EXAMS:
+        return reverse("exams_list")
+    return reverse("price_list_detail", kwargs={"pk": job.params.get("price_list_id")})
+
+
+class ImportJobDetailView(LoginRequiredMixin, DetailView):
+    """Avance y resultado de una importación"""
+
+    model = ImportJob
+    template_name = "imports/import_job.html"
+    context_object_name = "job"
+    login_url = reverse_lazy("login")
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(created_by=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        back_url = import_back_url(self.object)
+        context["back_url"] = back_url
+        context["breadcrumbs"] = [
+            {"name": self.object.get_kind_display(), "url": back_url},
+            {"name": f"Importación #{self.object.pk}", "url": None},
+        ]
+        return context
+
+
+@login_required
+@require_GET
+def import_job_api(request, pk):
+    """API endpoint con el avance de una importación (para refrescar la página del job)"""
+    job = get_object_or_404(ImportJob, pk=pk, created_by=request.user)
+    return JsonResponse({"job": serialize_import_job(job)})
+
+
+@login_required
+@require_POST
+def confirm_import_job(request, pk):
+    """Confirmar una importación en vista previa: pasa a la cola del worker"""
+    job = get_object_or_404(ImportJob, pk=pk, created_by=request.user)
+    if confirm_import(job):
+        messages.success(request, "Importación confirmada: se procesa en segundo plano")
+    else:
+        messages.error(request, "La importación ya no está pendiente de confirmación")
+    return redirect("import_job_detail", pk=job.pk)
+
+
+@login_required
+@require_POST
+def resume_import_job(request, pk):
+    """Reanudar una importación que falló o quedó abandonada desde la última fila guardada"""
+    job = get_object_or_404(ImportJob, pk=pk, created_by=request.user)
+    if resume_import(job):
+        messages.success(request, f"Importación reanudada desde la fila {job.last_row + 1}")
+    else:
+        messages.error(request, "La importación no se puede reanudar")
+    return redirect("import_job_detail", pk=job.pk)
+
+
+@login_required
+@require_POST
+def cancel_import_job(request, pk):
+    """Descartar una importación en vista previa sin aplicar cambios"""
+    job = get_object_or_404(ImportJob, pk=pk, created_by=request.user)
+    if cancel_import(job):
+        messages.success(request, "Importación cancelada: no se aplicó ningún cambio")
+    else:
+        messages.error(request, "La importación ya no está pendiente de confirmación")
+    return redirect(import_back_url(job))
+
+
+@login_required
+@require_GET
+def download_import_errors(request, pk):
+    """Descargar el reporte de filas omitidas o con error de una importación"""
+    job = get_object_or_404(ImportJob, pk=pk, created_by=request.user)
+
+    if not job.error_report:
+        raise Http404("La importación no tiene reporte de errores")
+
+    filename = f"errores_importacion_{job.pk}.xlsx"
+    return FileResponse(job.error_report.open("rb"), as_attachment=True, filename=filename)
@@ -0,0 +1,139 @@
+"""
+Exportación de órdenes a Excel con memoria constante
+
+Las filas se leen en bloques con values_list().iterator() y se escriben en un
+libro write-only de openpyxl, que va volcando cada fila a un archivo temporal
+en disco en lugar de mantener las celdas en memoria.
+"""
+
+import tempfile
+
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+from apps.orders.models import Order
+from apps.patients.models import Patient
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Filas leídas por cada viaje a la base de datos
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_EXPORT_COLUMNS = [
+    # (encabezado, ancho)
+    ("Código de Orden", 18),
+    ("Estado", 12),
+    ("Método de Pago", 22),
+    ("Fecha", 18),
+    ("Monto Total", 14),
+    ("Tipo de Documento", 20),
+    ("Número de Documento", 20),
+    ("Apellidos", 25),
+    ("Nombres", 25),
+]
+
+
+def iter_order_rows(queryset):
+    """
+    Genera las filas del Excel de órdenes sin instanciar modelos.
+
+    El total se lee de la columna desnormalizada Order.total, por lo que no hay
+    consultas por fila.
+    """
+    tz = timezone.get_current_timezone()
+    status_labels = dict(Order.Status.choices)
+    payment_labels = dict(Order.PaymentMethod.choices)
+    document_type_labels = dict(Patient.DocumentType.choices)
+
+    rows = (
+        queryset.order_by("-created_at")
+        .values_list(
+            "code",
+            "status",
+            "payment_method",
+            "created_at",
+            "total",
+            "patient__document_type",
+            "patient__document_number",
+            "patient__last_name",
+            "patient__first_name",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    for code, status, payment_method, created_at, total, document_type, document_number, last_name, first_name in rows:
+        yield [
+            code,
+            status_labels.get(status, status),
+            payment_labels.get(payment_method, payment_method) if payment_method else "-",
+            created_at.astimezone(tz).strftime("%d/%m/%Y %H:%M"),
+            float(total),
+            document_type_labels.get(document_type, document_type),
+            document_number,
+            last_name,
+            first_name,
+        ]
+
+
+def write_orders_workbook(queryset, fileobj, progress=None):
+    """
+    Escribe el Excel de órdenes en fileobj.
+
+    Args:
+        queryset: QuerySet de Order ya filtrado
+        fileobj: Archivo (o ruta) de destino
+        progress: Callable opcional que recibe la cantidad de filas escritas
+
+    Returns:
+        int: Cantidad de filas escritas
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Órdenes")
+
+    # En modo write-only los anchos deben definirse antes de escribir filas
+    for index, (_, width) in enumerate(ORDER_EXPORT_COLUMNS):
+        ws.column_dimensions[chr(ord("A") + index)].width = width
+
+    ws.append(_header_row(ws, [header for header, _ in ORDER_EXPORT_COLUMNS]))
+
+    count = 0
+    for row in iter_order_rows(queryset):
+        ws.append(row)
+        count += 1
+        if progress and count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+
+    wb.save(fileobj)
+    if progress:
+        progress(count)
+    return count
+
+
+def build_orders_export_file(queryset):
+    """
+    Genera el Excel de órdenes en un archivo temporal en disco.
+
+    Returns:
+        Archivo temporal posicionado al inicio; se elimina al cerrarse
+    """
+    tmp = tempfile.TemporaryFile()
+    write_orders_workbook(queryset, tmp)
+    tmp.seek(0)
+    return tmp
+
+
+def _header_row(ws, headers):
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        cells.append(cell)
+    return cells
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from apps.orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Recalcula Order.total e Order.items_count desde los detalles, o verifica que estén sincronizados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Solo reporta las órdenes desincronizadas, sin modificarlas",
+        )
+
+    def handle(self, *args, **options):
+        expressions = Order.totals_expressions()
+
+        if options["verify"]:
+            mismatched = (
+                Order.objects.annotate(expected_total=expressions["total"], expected_items=expressions["items_count"])
+                .filter(~Q(total=F("expected_total")) | ~Q(items_count=F("expected_items")))
+                .values_list("code", "total", "expected_total", "items_count", "expected_items")
+            )
+            count = 0
+            for code, total, expected_total, items_count, expected_items in mismatched.iterator():
+                count += 1
+                self.stdout.write(
+                    f"{code}: total {total:.2f} (esperado {expected_total:.2f}), exámenes {items_count} (esperado {expected_items})"
+                )
+
+            if count:
+                self.stdout.write(self.style.ERROR(f"{count} órdenes desincronizadas"))
+            else:
+                self.stdout.write(self.style.SUCCESS("Todas las órdenes están sincronizadas"))
+            return
+
+        updated = Order.objects.update(**expressions)
+        self.stdout.write(self.style.SUCCESS(f"{updated} órdenes recalculadas"))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:25
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderDetail = apps.get_model("orders", "OrderDetail")
+
+    details = OrderDetail.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    Order.objects.update(
+        total=Coalesce(
+            Subquery(details.annotate(sum=Sum("price")).values("sum")),
+            Value(Decimal("0.00")),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        items_count=Coalesce(Subquery(details.annotate(count=Count("id")).values("count")), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0002_alter_order_observations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="items_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Cantidad de Exámenes"),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), editable=False, max_digits=12, verbose_name="Monto Total"
+            ),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
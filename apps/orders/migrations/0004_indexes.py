@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+from apps.core.db import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ("orders", "0003_order_total_items_count"),
+        ("patients", "0003_indexes"),
+        ("pricing", "0001_initial"),
+        ("referrals", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["created_at", "id"], name="order_created_at_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ),
+    ]
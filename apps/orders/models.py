@@ -1,7 +1,12 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from apps.core.models import TimeStampedModel
+from apps.core.sequences import next_value
 from apps.exams.models import Exam
 from apps.patients.models import Patient
 
@@ -41,10 +46,21 @@ class Order(TimeStampedModel):
     )
     observations = models.TextField(blank=True, default="", verbose_name="Observaciones")
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    # Desnormalizados: se mantienen al crear, editar o eliminar OrderDetails (ver update_totals)
+    total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00"), editable=False, verbose_name="Monto Total"
+    )
+    items_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Cantidad de Exámenes")
 
     class Meta:
         verbose_name = "Order"
         verbose_name_plural = "Orders"
+        indexes = [
+            # Listado (paginación por cursor) y exportación
+            models.Index(fields=["created_at", "id"], name="order_created_at_id_idx"),
+            # Filtro por estado y rango de fechas
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order {self.code} - {self.patient.first_name} {self.patient.last_name}"
@@ -60,23 +76,42 @@ class Order(TimeStampedModel):
         now = timezone.localtime(timezone.now())
         date_prefix = now.strftime("%Y%m%d")
 
-        # Find the last order code for today
-        last_order = Order.objects.filter(code__startswith=date_prefix).order_by("-code").first()
-
-        if last_order:
-            # Extract the sequence number and increment
-            last_sequence = int(last_order.code.split("-")[1])
-            new_sequence = last_sequence + 1
-        else:
-            # First order of the day
-            new_sequence = 1
+        # Reservar el siguiente correlativo del día (atómico entre workers)
+        new_sequence = next_value(f"order:{date_prefix}", initial=lambda: self._last_order_sequence(date_prefix))
 
         # Format: YYYYMMdd-000001
         return f"{date_prefix}-{new_sequence:06d}"
 
-    @property
-    def total(self):
-        return sum(detail.price for detail in self.details.all())
+    @staticmethod
+    def _last_order_sequence(date_prefix):
+        """Último correlativo usado en el día, para continuar órdenes creadas antes de la secuencia"""
+        last_code = (
+            Order.objects.filter(code__startswith=date_prefix).order_by("-code").values_list("code", flat=True).first()
+        )
+        if last_code:
+            return int(last_code.split("-")[1])
+        return 0
+
+    def update_totals(self):
+        """Recalcula total e items_count desde los detalles con un solo UPDATE"""
+        Order.objects.filter(pk=self.pk).update(**Order.totals_expressions())
+        self.refresh_from_db(fields=["total", "items_count"])
+
+    @staticmethod
+    def totals_expressions():
+        """
+        Expresiones para calcular total e items_count en la base de datos.
+        Usadas por update_totals y el comando recalculate_order_totals.
+        """
+        details = OrderDetail.objects.filter(order=OuterRef("pk")).order_by().values("order")
+        return {
+            "total": Coalesce(
+                Subquery(details.annotate(sum=Sum("price")).values("sum")),
+                Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            "items_count": Coalesce(Subquery(details.annotate(count=Count("id")).values("count")), Value(0)),
+        }
 
 
 class OrderDetail(models.Model):
@@ -90,3 +125,12 @@ class OrderDetail(models.Model):
 
     def __str__(self):
         return f"{self.exam.name} - S/. {self.price}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.order.update_totals()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.order.update_totals()
+        return result
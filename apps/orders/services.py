@@ -0,0 +1,214 @@
+"""
+Services para la creación y consulta de órdenes
+
+Presupuesto de consultas de create_order (no crece con la cantidad de exámenes):
+    1. Exámenes de la orden desde el catálogo en memoria y sus precios con
+       PricingService.price_cart (resolve_exam_details): un SELECT de los precios
+       del tarifario del cupón o del referido, y otro solo si algún examen no está
+       en el catálogo
+    2. UPDATE + SELECT del correlativo del día (apps.core.sequences; un INSERT
+       adicional solo en la primera orden del día)
+    3. INSERT de la orden, con total e items_count ya calculados
+    4. INSERT de todos los detalles (bulk_create)
+    5. Órdenes de referido: materialización del resultado (create_result_for_order,
+       cuatro consultas fijas y una más si la orden incluye paneles)
+
+Las vistas agregan la búsqueda del paciente, del referido o del cupón (una
+consulta cada una).
+"""
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.exams.models import Exam
+from apps.orders.models import Order, OrderDetail
+from apps.patients.search import get_backend
+
+
+class OrderValidationError(Exception):
+    """Error de validación al construir una orden, con el status HTTP a devolver"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def resolve_exam_details(exam_details, referral=None, coupon=None):
+    """
+    Valida los detalles enviados por el cliente y los cotiza en bloque con
+    PricingService.price_cart (cupón, tarifario del referido o precio base).
+
+    Un detalle sin precio toma el cotizado, así el cliente no necesita enviar ni
+    el servidor revalidar los precios de la cotización. Un precio enviado es un
+    ajuste manual de la fila y solo se valida su formato.
+
+    Args:
+        exam_details: Lista de dicts con exam_id y opcionalmente price
+        referral: Referido de la orden, con su price_list cargado (opcional)
+        coupon: Cupón vigente, con su price_list cargado (opcional)
+
+    Returns:
+        list[dict]: Detalles validados con "exam" (CatalogExam o Exam) y "price" (Decimal)
+
+    Raises:
+        OrderValidationError: Si algún detalle es inválido o un examen no existe
+    """
+    from apps.pricing.services import PricingService
+
+    parsed_details = []
+    for detail in exam_details:
+        exam_id = detail.get("exam_id")
+        price = detail.get("price")
+
+        if not exam_id:
+            raise OrderValidationError("Cada examen debe tener id")
+
+        try:
+            exam_id = int(exam_id)
+        except (TypeError, ValueError):
+            raise OrderValidationError(f"Examen con ID {exam_id} no encontrado", status=404) from None
+
+        parsed_details.append((exam_id, None if price in (None, "") else _parse_price(price)))
+
+    try:
+        lines = PricingService.price_cart([exam_id for exam_id, _ in parsed_details], referral=referral, coupon=coupon)
+    except Exam.DoesNotExist as e:
+        raise OrderValidationError(str(e), status=404) from None
+
+    return [
+        {"exam": line["exam"], "price": line["price"] if price is None else price}
+        for (_, price), line in zip(parsed_details, lines, strict=True)
+    ]
+
+
+def create_order(patient, validated_details, observations="", referral=None, coupon=None):
+    """
+    Crea la orden y sus detalles con inserciones en bloque.
+
+    Para órdenes de referido también crea el resultado, dentro de la misma transacción.
+
+    Args:
+        patient: Instancia de Patient
+        validated_details: Detalles retornados por resolve_exam_details
+        observations: Observaciones de la orden
+        referral: Instancia de Referral (opcional)
+        coupon: Instancia de Coupon (opcional)
+
+    Returns:
+        Order: La orden creada
+    """
+    with transaction.atomic():
+        order = Order.objects.create(
+            patient=patient,
+            referral=referral,
+            coupon=coupon,
+            observations=observations,
+            total=sum((detail["price"] for detail in validated_details), Decimal("0.00")),
+            items_count=len(validated_details),
+        )
+
+        # bulk_create no llama a OrderDetail.save(), los totales ya se calcularon arriba
+        OrderDetail.objects.bulk_create(
+            [OrderDetail(order=order, exam_id=detail["exam"].id, price=detail["price"]) for detail in validated_details]
+        )
+
+        if referral:
+            from apps.results.services import create_result_for_order
+
+            create_result_for_order(order)
+
+    return order
+
+
+def _parse_price(price):
+    """Valida que el precio sea un decimal no negativo con máximo 2 decimales"""
+    try:
+        price_decimal = Decimal(str(price))
+    except (InvalidOperation, ValueError):
+        raise OrderValidationError("Precio inválido") from None
+
+    if not price_decimal.is_finite():
+        raise OrderValidationError("Precio inválido")
+    if price_decimal < 0:
+        raise OrderValidationError("El precio no puede ser negativo")
+    # Validar que tiene máximo 2 decimales
+    if price_decimal.as_tuple().exponent < -2:
+        raise OrderValidationError("El precio debe tener máximo 2 decimales")
+
+    return price_decimal
+
+
+def filter_orders(queryset, params):
+    """
+    Aplica los filtros del listado de órdenes (documento, nombre, rango de fechas).
+    Compartido por OrdersListView y las exportaciones para que ambos devuelvan lo mismo.
+
+    Args:
+        queryset: QuerySet de Order
+        params: QueryDict o dict con los filtros
+
+    Returns:
+        QuerySet filtrado
+    """
+    # Filtrar por número de documento y nombre del paciente (índice de búsqueda de pacientes)
+    queryset = get_backend().filter(
+        queryset,
+        name=params.get("patient_name") or "",
+        document=params.get("document_number") or "",
+        prefix="patient__",
+    )
+
+    # Filtrar por rango de fechas
+    date_from = params.get("date_from")
+    if date_from:
+        try:
+            date_from_obj = datetime.strptime(date_from, "%Y-%m-%d")
+            date_from_aware = timezone.make_aware(datetime.combine(date_from_obj.date(), datetime.min.time()))
+            queryset = queryset.filter(created_at__gte=date_from_aware)
+        except ValueError:
+            pass
+
+    date_to = params.get("date_to")
+    if date_to:
+        try:
+            date_to_obj = datetime.strptime(date_to, "%Y-%m-%d")
+            date_to_aware = timezone.make_aware(datetime.combine(date_to_obj.date(), datetime.max.time()))
+            queryset = queryset.filter(created_at__lte=date_to_aware)
+        except ValueError:
+            pass
+
+    return queryset
+
+
+def order_pdf_fingerprint(order, company):
+    """
+    Datos de la orden que aparecen en sus PDFs (ticket y formulario de resultados).
+    Se usan como clave de la caché de PDFs: si alguno cambia, el PDF se vuelve a generar.
+
+    Requiere la orden con patient, referral y details__exam precargados.
+    """
+    patient = order.patient
+    referral = order.referral
+    return {
+        "order": [order.pk, order.code, order.created_at.isoformat(), str(order.total), order.observations],
+        "details": [[detail.exam_id, detail.exam.name, str(detail.price)] for detail in order.details.all()],
+        "patient": [
+            patient.document_type,
+            patient.document_number,
+            patient.first_name,
+            patient.last_name,
+            patient.birthdate.isoformat(),
+            patient.sex,
+            patient.presumptive_diagnosis,
+        ],
+        "referral": [referral.business_name, referral.document_number] if referral else None,
+        "company": (
+            [company.business_name, company.legal_address, company.document_number, company.phone_number]
+            if company
+            else None
+        ),
+    }
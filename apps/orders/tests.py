@@ -0,0 +1,174 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.exams.catalog import get_catalog
+from apps.exams.models import Exam, ExamCategory, ExamComponent
+from apps.orders.models import Order, OrderDetail
+from apps.orders.services import create_order, resolve_exam_details
+from apps.patients.models import Patient
+from apps.pricing.cache import get_price_cache
+from apps.pricing.models import PriceList, PriceListItem
+from apps.referrals.models import Referral
+from apps.results.services import create_result_for_order
+
+
+class CreateOrderQueryBudgetTests(TestCase):
+    """
+    Presupuesto de consultas de create_order y create_result_for_order (ver
+    apps.orders.services): no debe crecer con la cantidad de exámenes ni de
+    componentes de los paneles.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ExamCategory.objects.create(code="CA001", name="Bioquímica")
+        cls.exams = [
+            Exam.objects.create(code=f"EX{i:05d}", name=f"Examen {i}", price=10 + i, category=category)
+            for i in range(1, 21)
+        ]
+        cls.panel = Exam.objects.create(code="EX00100", name="Perfil", price=50, has_components=True, category=category)
+        sub_panel = Exam.objects.create(
+            code="EX00101", name="Sub perfil", price=30, has_components=True, category=category
+        )
+        for order, exam in enumerate(cls.exams[:3]):
+            ExamComponent.objects.create(parent_exam=cls.panel, component_exam=exam, order=order)
+        ExamComponent.objects.create(parent_exam=cls.panel, component_exam=sub_panel, order=3)
+        for order, exam in enumerate(cls.exams[3:6]):
+            ExamComponent.objects.create(parent_exam=sub_panel, component_exam=exam, order=order)
+
+        price_list = PriceList.objects.create(name="Corporativo")
+        PriceListItem.objects.create(price_list=price_list, exam=cls.exams[0], price=5)
+        cls.referral = Referral.objects.create(
+            business_name="Clínica", document_number="20123456789", price_list=price_list
+        )
+        cls.patient = Patient.objects.create(
+            document_number="12345678",
+            first_name="José",
+            last_name="Núñez",
+            birthdate=date(1990, 1, 1),
+            sex="MALE",
+            phone_number="999999999",
+        )
+
+    def setUp(self):
+        # Catálogo y precios en memoria ya cargados, y el correlativo del día ya creado
+        get_catalog()
+        get_price_cache()
+        create_order(self.patient, resolve_exam_details([{"exam_id": self.exams[0].id}]))
+
+    def details(self, exams):
+        return [{"exam_id": exam.id} for exam in exams]
+
+    def test_resolve_exam_details_uses_the_in_memory_caches(self):
+        with self.assertNumQueries(0):
+            resolve_exam_details(self.details([*self.exams, self.panel]), referral=self.referral)
+
+    def test_create_order_does_not_grow_with_exams(self):
+        for exams in (self.exams[:2], self.exams):
+            with self.subTest(exams=len(exams)):
+                validated = resolve_exam_details(self.details(exams))
+                # UPDATE + SELECT del correlativo, INSERT de la orden e INSERT de los detalles,
+                # más SAVEPOINT/RELEASE de la transacción de create_order y la del correlativo
+                with self.assertNumQueries(8):
+                    order = create_order(self.patient, validated)
+                self.assertEqual(order.items_count, len(exams))
+
+    def test_referral_order_materializes_the_result(self):
+        cases = (
+            # Las 8 de create_order más SELECT de los detalles e INSERT del resultado, sus detalles y sus eventos
+            ([self.exams[7]], 12),
+            (self.exams, 12),
+            # Con paneles, un SELECT más de la clausura
+            ([self.panel], 13),
+            ([*self.exams, self.panel], 13),
+        )
+        for exams, queries in cases:
+            with self.subTest(exams=len(exams), queries=queries):
+                validated = resolve_exam_details(self.details(exams), referral=self.referral)
+                with self.assertNumQueries(queries):
+                    order = create_order(self.patient, validated, referral=self.referral)
+                # El panel se expande a sus 6 exámenes finales
+                self.assertEqual(order.result.total_count, len(exams) + (5 if self.panel in exams else 0))
+
+    def test_create_result_for_order_expands_nested_panels(self):
+        order = create_order(self.patient, resolve_exam_details(self.details([self.panel, self.exams[10]])))
+        # SELECT de los detalles, SELECT de la clausura, INSERT del resultado, sus detalles y sus eventos
+        with self.assertNumQueries(5):
+            result = create_result_for_order(order)
+
+        exam_ids = list(result.details.order_by("id").values_list("exam_id", flat=True))
+        self.assertEqual(exam_ids, [exam.id for exam in [*self.exams[:6], self.exams[10]]])
+        self.assertEqual(result.total_count, 7)
+
+
+class OrderTotalsTests(TestCase):
+    """Order.total e items_count desnormalizados (ver Order.update_totals y recalculate_order_totals)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.glucosa = Exam.objects.create(code="EX00001", name="Glucosa", price=10)
+        cls.urea = Exam.objects.create(code="EX00002", name="Urea", price=15)
+        cls.insulina = Exam.objects.create(code="EX00003", name="Insulina", price=40)
+        cls.patient = Patient.objects.create(
+            document_number="12345678",
+            first_name="José",
+            last_name="Núñez",
+            birthdate=date(1990, 1, 1),
+            sex="MALE",
+            phone_number="999999999",
+        )
+
+    def setUp(self):
+        self.order = create_order(
+            self.patient, resolve_exam_details([{"exam_id": self.glucosa.id}, {"exam_id": self.urea.id}])
+        )
+
+    def assertTotals(self, total, items_count):
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.total, order.items_count), (Decimal(total), items_count))
+
+    def verify(self):
+        out = StringIO()
+        call_command("recalculate_order_totals", "--verify", stdout=out)
+        return out.getvalue()
+
+    def test_create_order_sets_totals(self):
+        self.assertEqual((self.order.total, self.order.items_count), (Decimal("25.00"), 2))
+        self.assertTotals("25.00", 2)
+
+    def test_totals_follow_detail_changes(self):
+        detail = OrderDetail.objects.create(order=self.order, exam=self.insulina, price=Decimal("40.00"))
+        self.assertTotals("65.00", 3)
+        # La instancia de la orden en memoria también queda al día
+        self.assertEqual(detail.order.total, Decimal("65.00"))
+
+        detail.price = Decimal("35.50")
+        detail.save()
+        self.assertTotals("60.50", 3)
+
+        detail.delete()
+        self.assertTotals("25.00", 2)
+
+        for detail in self.order.details.all():
+            detail.delete()
+        self.assertTotals("0.00", 0)
+        self.assertIn("Todas las órdenes están sincronizadas", self.verify())
+
+    def test_verify_reports_drift(self):
+        # Un delete() de queryset no pasa por OrderDetail.delete()
+        OrderDetail.objects.filter(order=self.order, exam=self.urea).delete()
+        in_sync = create_order(self.patient, resolve_exam_details([{"exam_id": self.insulina.id}]))
+
+        output = self.verify()
+        self.assertIn(f"{self.order.code}: total 25.00 (esperado 10.00), exámenes 2 (esperado 1)", output)
+        self.assertNotIn(in_sync.code, output)
+        self.assertIn("1 órdenes desincronizadas", output)
+        self.assertTotals("25.00", 2)
+
+        call_command("recalculate_order_totals", stdout=StringIO())
+        self.assertTotals("10.00", 1)
+        self.assertIn("Todas las órdenes están sincronizadas", self.verify())
@@ -1,78 +1,51 @@
 import json
 import logging
-from datetime import datetime
-from decimal import Decimal, InvalidOperation
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import models, transaction
-from django.http import HttpResponse, JsonResponse
-from django.template.loader import render_to_string
+from django.db import models
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.views import View
 from django.views.decorators.http import require_GET, require_POST
 from django.views.generic import DetailView, ListView, TemplateView
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill
-from weasyprint import HTML
 
 from apps.billing.models import Company
-from apps.exams.models import Exam
-from apps.orders.models import Order, OrderDetail
+from apps.core import pdf
+from apps.core.pagination import CursorPaginationMixin
+from apps.core.pdf import pdf_response, render_pdf
+from apps.core.pdf_renderer import PdfRenderError
+from apps.exports.models import ExportJob
+from apps.exports.services import recent_export_jobs
+from apps.orders.exports import XLSX_CONTENT_TYPE, build_orders_export_file
+from apps.orders.models import Order
+from apps.orders.services import (
+    OrderValidationError,
+    create_order,
+    filter_orders,
+    order_pdf_fingerprint,
+    resolve_exam_details,
+)
 from apps.patients.models import Patient
 from apps.referrals.models import Referral
 
 logger = logging.getLogger(__name__)
 
 
-class OrdersListView(LoginRequiredMixin, ListView):
+class OrdersListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Order
     template_name = "orders/orders_list.html"
     context_object_name = "orders"
     paginate_by = 20
+    # Sin filtros se usa el estimado de PostgreSQL en lugar de contar la tabla completa
+    cursor_count = "estimated"
     login_url = reverse_lazy("login")
 
     def get_queryset(self):
-        from datetime import datetime
-
-        from django.utils import timezone
-
         queryset = Order.objects.select_related("patient", "referral")
-
-        # Filtrar por número de documento
-        document_number = self.request.GET.get("document_number")
-        if document_number:
-            queryset = queryset.filter(patient__document_number__icontains=document_number)
-
-        # Filtrar por nombre del paciente (first_name OR last_name)
-        patient_name = self.request.GET.get("patient_name")
-        if patient_name:
-            queryset = queryset.filter(
-                models.Q(patient__first_name__icontains=patient_name)
-                | models.Q(patient__last_name__icontains=patient_name)
-            )
-
-        # Filtrar por rango de fechas
-        date_from = self.request.GET.get("date_from")
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, "%Y-%m-%d")
-                date_from_aware = timezone.make_aware(datetime.combine(date_from_obj.date(), datetime.min.time()))
-                queryset = queryset.filter(created_at__gte=date_from_aware)
-            except ValueError:
-                pass
-
-        date_to = self.request.GET.get("date_to")
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, "%Y-%m-%d")
-                date_to_aware = timezone.make_aware(datetime.combine(date_to_obj.date(), datetime.max.time()))
-                queryset = queryset.filter(created_at__lte=date_to_aware)
-            except ValueError:
-                pass
-
+        queryset = filter_orders(queryset, self.request.GET)
         return queryset.order_by("-created_at")
 
     def get_context_data(self, **kwargs):
@@ -81,6 +54,7 @@ class OrdersListView(LoginRequiredMixin, ListView):
         context["patient_name"] = self.request.GET.get("patient_name", "")
         context["date_from"] = self.request.GET.get("date_from", "")
         context["date_to"] = self.request.GET.get("date_to", "")
+        context["export_jobs"] = recent_export_jobs(self.request.user, kind=ExportJob.Kind.ORDERS)
         return context
 
 
@@ -111,22 +85,23 @@ class OrderPrintView(LoginRequiredMixin, View):
 
     def get(self, request, pk):
         # Obtener la orden con sus relaciones
-        order = Order.objects.select_related("patient").prefetch_related("details__exam").get(pk=pk)
+        order = Order.objects.select_related("patient", "referral").prefetch_related("details__exam").get(pk=pk)
 
         # Obtener la información de la compañía
         company = Company.objects.first()
 
-        # Renderizar el template HTML del ticket
-        html_string = render_to_string("orders/order_print.html", {"order": order, "company": company})
-
-        # Generar PDF con WeasyPrint con codificación UTF-8 explícita
-        pdf = HTML(string=html_string, encoding="utf-8").write_pdf(presentational_hints=True, optimize_size=("fonts",))
-
-        # Devolver el PDF como respuesta
-        response = HttpResponse(pdf, content_type="application/pdf; charset=utf-8")
-        response["Content-Disposition"] = f'inline; filename="order_{order.id}.pdf"'
+        # Generar el PDF (o reutilizarlo si la orden, el paciente y la compañía no cambiaron)
+        try:
+            rendered = render_pdf(
+                "orders/order_print.html",
+                {"order": order, "company": company},
+                key_parts=order_pdf_fingerprint(order, company),
+            )
+        except PdfRenderError as e:
+            logger.warning(f"No se pudo generar el PDF de la orden {order.id}: {e}")
+            return HttpResponse(str(e), status=503)
 
-        return response
+        return pdf_response(rendered, f"order_{order.id}.pdf")
 
 
 class OrderResultsFormView(LoginRequiredMixin, View):
@@ -136,22 +111,34 @@ class OrderResultsFormView(LoginRequiredMixin, View):
 
     def get(self, request, pk):
         # Obtener la orden con sus relaciones
-        order = Order.objects.select_related("patient").prefetch_related("details__exam").get(pk=pk)
+        order = Order.objects.select_related("patient", "referral").prefetch_related("details__exam").get(pk=pk)
 
         # Obtener la información de la compañía
         company = Company.objects.first()
 
-        # Renderizar el template HTML del formulario
-        html_string = render_to_string("orders/order_results_form.html", {"order": order, "company": company})
+        # La edad del paciente y la fecha de impresión (al minuto, como se muestra) forman parte de la clave
+        printed_at = timezone.localtime().replace(second=0, microsecond=0)
+        try:
+            rendered = render_pdf(
+                "orders/order_results_form.html",
+                {"order": order, "company": company, "printed_at": printed_at},
+                key_parts=[order_pdf_fingerprint(order, company), printed_at.isoformat()],
+            )
+        except PdfRenderError as e:
+            logger.warning(f"No se pudo generar el PDF de la orden {order.id}: {e}")
+            return HttpResponse(str(e), status=503)
 
-        # Generar PDF con WeasyPrint
-        pdf = HTML(string=html_string, encoding="utf-8").write_pdf(presentational_hints=True, optimize_size=("fonts",))
+        return pdf_response(rendered, f"resultados_orden_{order.id}.pdf")
 
-        # Devolver el PDF como respuesta
-        response = HttpResponse(pdf, content_type="application/pdf; charset=utf-8")
-        response["Content-Disposition"] = f'inline; filename="resultados_orden_{order.id}.pdf"'
 
-        return response
+@login_required
+@require_GET
+def pdf_cache_stats_api(request):
+    """
+    API endpoint con las métricas de la caché de PDFs del worker que atiende el request
+    (aciertos, fallos, errores al guardar) y el uso del directorio de caché.
+    """
+    return JsonResponse(pdf.stats())
 
 
 @login_required
@@ -181,56 +168,24 @@ def create_order_api(request):
     except Patient.DoesNotExist:
         return JsonResponse({"error": "Paciente no encontrado"}, status=404)
 
-    # Validar cupón si se proporcionó
+    # Validar cupón si se proporcionó (una sola consulta)
     coupon = None
     if coupon_code:
         from apps.pricing.services import PricingService
 
-        validation_result = PricingService.validate_coupon(coupon_code)
-
-        if not validation_result["valid"]:
-            return JsonResponse({"error": validation_result["error"]}, status=400)
-
-        # Si el cupón es válido, obtenerlo de la base de datos
-        from apps.pricing.models import Coupon
-
-        coupon = Coupon.objects.get(code=coupon_code.upper(), is_active=True)
+        coupon, error = PricingService.get_valid_coupon(coupon_code)
+        if error:
+            return JsonResponse({"error": error}, status=400)
 
-    # Validar exam_details
-    validated_details = []
-    for detail in exam_details:
-        exam_id = detail.get("exam_id")
-        price = detail.get("price")
-
-        if not exam_id or price is None:
-            return JsonResponse({"error": "Cada examen debe tener id y precio"}, status=400)
-
-        # Validar que el examen existe
-        try:
-            exam = Exam.objects.get(id=exam_id)
-        except Exam.DoesNotExist:
-            return JsonResponse({"error": f"Examen con ID {exam_id} no encontrado"}, status=404)
-
-        # Validar que el precio es un decimal válido
-        try:
-            price_decimal = Decimal(str(price))
-            if price_decimal < 0:
-                return JsonResponse({"error": "El precio no puede ser negativo"}, status=400)
-            # Validar que tiene máximo 2 decimales
-            if price_decimal.as_tuple().exponent < -2:
-                return JsonResponse({"error": "El precio debe tener máximo 2 decimales"}, status=400)
-        except (InvalidOperation, ValueError):
-            return JsonResponse({"error": "Precio inválido"}, status=400)
-
-        validated_details.append({"exam": exam, "price": price_decimal})
+    # Validar exam_details y cotizarlos con el tarifario del cupón (una consulta para todos)
+    try:
+        validated_details = resolve_exam_details(exam_details, coupon=coupon)
+    except OrderValidationError as e:
+        return JsonResponse({"error": e.message}, status=e.status)
 
     # Crear la orden y sus detalles en una transacción
     try:
-        with transaction.atomic():
-            order = Order.objects.create(patient=patient, coupon=coupon, observations=observations)
-
-            for detail in validated_details:
-                OrderDetail.objects.create(order=order, exam=detail["exam"], price=detail["price"])
+        order = create_order(patient, validated_details, observations=observations, coupon=coupon)
 
         # Agregar mensaje de éxito a la sesión
         messages.success(request, f"Orden {order.code} creada exitosamente")
@@ -302,7 +257,7 @@ def create_referral_order_api(request):
 
     # Validar que el referido existe y está activo
     try:
-        referral = Referral.objects.get(id=referral_id, is_active=True)
+        referral = Referral.objects.select_related("price_list").get(id=referral_id, is_active=True)
     except Referral.DoesNotExist:
         return JsonResponse({"error": "Referido no encontrado o inactivo"}, status=404)
 
@@ -312,45 +267,15 @@ def create_referral_order_api(request):
     except Patient.DoesNotExist:
         return JsonResponse({"error": "Paciente no encontrado"}, status=404)
 
-    # Validar exam_details
-    validated_details = []
-    for detail in exam_details:
-        exam_id = detail.get("exam_id")
-        price = detail.get("price")
-
-        if not exam_id or price is None:
-            return JsonResponse({"error": "Cada examen debe tener id y precio"}, status=400)
-
-        # Validar que el examen existe
-        try:
-            exam = Exam.objects.get(id=exam_id)
-        except Exam.DoesNotExist:
-            return JsonResponse({"error": f"Examen con ID {exam_id} no encontrado"}, status=404)
-
-        # Validar que el precio es un decimal válido
-        try:
-            price_decimal = Decimal(str(price))
-            if price_decimal < 0:
-                return JsonResponse({"error": "El precio no puede ser negativo"}, status=400)
-            if price_decimal.as_tuple().exponent < -2:
-                return JsonResponse({"error": "El precio debe tener máximo 2 decimales"}, status=400)
-        except (InvalidOperation, ValueError):
-            return JsonResponse({"error": "Precio inválido"}, status=400)
-
-        validated_details.append({"exam": exam, "price": price_decimal})
-
-    # Crear la orden y sus detalles en una transacción
+    # Validar exam_details y cotizarlos con el tarifario del referido (una consulta para todos)
     try:
-        with transaction.atomic():
-            order = Order.objects.create(patient=patient, referral=referral, observations=observations)
+        validated_details = resolve_exam_details(exam_details, referral=referral)
+    except OrderValidationError as e:
+        return JsonResponse({"error": e.message}, status=e.status)
 
-            for detail in validated_details:
-                OrderDetail.objects.create(order=order, exam=detail["exam"], price=detail["price"])
-
-        # Crear resultado para la orden de referido
-        from apps.results.services import create_result_for_order
-
-        create_result_for_order(order)
+    # Crear la orden, sus detalles y su resultado en una transacción
+    try:
+        order = create_order(patient, validated_details, observations=observations, referral=referral)
 
         messages.success(request, f"Orden de referido {order.code} creada exitosamente")
 
@@ -429,98 +354,13 @@ def complete_order(request, order_id):
 def download_orders_excel(request):
     """Descargar órdenes en formato Excel con filtros aplicados"""
     # Aplicar los mismos filtros que OrdersListView
-    queryset = Order.objects.select_related("patient", "referral")
-
-    # Filtrar por número de documento
-    document_number = request.GET.get("document_number")
-    if document_number:
-        queryset = queryset.filter(patient__document_number__icontains=document_number)
-
-    # Filtrar por rango de fechas
-    date_from = request.GET.get("date_from")
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, "%Y-%m-%d")
-            date_from_aware = timezone.make_aware(datetime.combine(date_from_obj.date(), datetime.min.time()))
-            queryset = queryset.filter(created_at__gte=date_from_aware)
-        except ValueError:
-            pass
-
-    date_to = request.GET.get("date_to")
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, "%Y-%m-%d")
-            date_to_aware = timezone.make_aware(datetime.combine(date_to_obj.date(), datetime.max.time()))
-            queryset = queryset.filter(created_at__lte=date_to_aware)
-        except ValueError:
-            pass
-
-    orders = queryset.order_by("-created_at")
-
-    # Crear libro de Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Órdenes"
-
-    # Estilos
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # Encabezados
-    headers = [
-        "Código de Orden",
-        "Estado",
-        "Método de Pago",
-        "Fecha",
-        "Monto Total",
-        "Tipo de Documento",
-        "Número de Documento",
-        "Apellidos",
-        "Nombres",
-    ]
+    queryset = filter_orders(Order.objects.all(), request.GET)
 
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Datos
-    for row_num, order in enumerate(orders, 2):
-        ws.cell(row=row_num, column=1).value = order.code
-        ws.cell(row=row_num, column=2).value = order.get_status_display()
-        ws.cell(row=row_num, column=3).value = order.get_payment_method_display() if order.payment_method else "-"
-        ws.cell(row=row_num, column=4).value = timezone.localtime(order.created_at).strftime("%d/%m/%Y %H:%M")
-        ws.cell(row=row_num, column=5).value = float(order.total)
-        ws.cell(row=row_num, column=6).value = order.patient.get_document_type_display()
-        ws.cell(row=row_num, column=7).value = order.patient.document_number
-        ws.cell(row=row_num, column=8).value = order.patient.last_name
-        ws.cell(row=row_num, column=9).value = order.patient.first_name
-
-    # Ajustar ancho de columnas
-    ws.column_dimensions["A"].width = 18
-    ws.column_dimensions["B"].width = 12
-    ws.column_dimensions["C"].width = 22
-    ws.column_dimensions["D"].width = 18
-    ws.column_dimensions["E"].width = 14
-    ws.column_dimensions["F"].width = 20
-    ws.column_dimensions["G"].width = 20
-    ws.column_dimensions["H"].width = 25
-    ws.column_dimensions["I"].width = 25
+    # El libro se genera en un archivo temporal (memoria constante) y se envía por bloques
+    export_file = build_orders_export_file(queryset)
 
     # Generar nombre de archivo con fecha actual
     now = timezone.localtime(timezone.now())
     filename = f"ordenes_{now.strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-    # Crear respuesta HTTP
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    # Guardar el libro en la respuesta
-    wb.save(response)
-
-    return response
+    return FileResponse(export_file, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
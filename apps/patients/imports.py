@@ -0,0 +1,115 @@
+"""
+Importación de pacientes desde Excel (ver apps.imports.engine)
+"""
+
+from datetime import date, datetime
+
+from apps.core.text import normalize_search_text
+from apps.imports.engine import Importer, RowError, SkipRow
+from apps.patients.models import Patient
+from apps.patients.search import get_backend
+
+DOCUMENT_TYPES = {
+    "DNI": Patient.DocumentType.DNI,
+    "C.E": Patient.DocumentType.CE,
+    "PAS": Patient.DocumentType.PASAPORTE,
+}
+
+SEXES = {"F": Patient.Sex.FEMALE, "M": Patient.Sex.MALE}
+
+
+class PatientImporter(Importer):
+    """
+    Crea los pacientes nuevos; los que ya existen (mismo número de documento) o
+    que se repiten dentro del archivo se omiten.
+
+    Por bloque: una consulta IN con los números de documento, un bulk_create y la
+    indexación para la búsqueda, en una sola transacción. Pensado para migraciones
+    de cientos de miles de filas: si la importación falla se reanuda desde el
+    último bloque guardado (ver apps.imports.services.resume_import).
+    """
+
+    columns = (
+        "Apellidos",
+        "Nombres",
+        "Tipo Documento",
+        "Número Documento",
+        "Fecha Nacimiento",
+        "Sexo",
+        "Teléfono",
+    )
+    required_columns = columns
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        # Número de documento -> fila del archivo donde apareció primero, de los bloques guardados
+        self.seen_rows = {}
+        # Los del bloque en curso: se suman a seen_rows solo si el bloque se confirma
+        self.chunk_rows = {}
+
+    def parse_row(self, values):
+        last_name, first_name, document_type_excel, document_number, birthdate, sex_excel, phone_number = values
+        document_number = str(document_number).strip()
+
+        document_type = DOCUMENT_TYPES.get(str(document_type_excel).strip())
+        if not document_type:
+            raise RowError(f"Tipo de documento inválido '{document_type_excel}' - Valores permitidos: DNI, C.E, PAS")
+
+        if document_type == Patient.DocumentType.DNI and len(document_number) != 8:
+            raise SkipRow(f"DNI inválido '{document_number}' tiene {len(document_number)} caracteres, debe tener 8")
+
+        sex = SEXES.get(str(sex_excel).strip())
+        if not sex:
+            raise RowError(f"Sexo inválido '{sex_excel}' - Valores permitidos: F, M")
+
+        # Fecha como texto d/M/Y (ej: 17/10/2023) o como fecha de Excel
+        if isinstance(birthdate, datetime):
+            birthdate = birthdate.date()
+        elif not isinstance(birthdate, date):
+            try:
+                birthdate = datetime.strptime(str(birthdate).strip(), "%d/%m/%Y").date()
+            except ValueError:
+                raise RowError(f"Fecha de nacimiento inválida '{birthdate}' - Formato d/M/Y (ej: 17/10/2023)") from None
+
+        return {
+            "document_type": document_type,
+            "document_number": document_number,
+            "first_name": str(first_name).strip(),
+            "last_name": str(last_name).strip(),
+            "birthdate": birthdate,
+            "sex": sex,
+            "phone_number": str(phone_number).strip(),
+        }
+
+    def save_chunk(self, rows, result):
+        # El número de documento es único entre todos los tipos: una consulta por bloque
+        numbers = {row.data["document_number"] for row in rows}
+        existing = dict(
+            Patient.objects.filter(document_number__in=numbers).values_list("document_number", "document_type")
+        )
+
+        self.chunk_rows = {}
+        patients = []
+        for row in rows:
+            number = row.data["document_number"]
+            first_row = self.seen_rows.get(number) or self.chunk_rows.get(number)
+            if first_row:
+                result.skip(row, f"Documento {number} repetido en el archivo (ya está en la fila {first_row})")
+                continue
+            if number in existing:
+                result.skip(row, f"Paciente duplicado - Ya existe con {existing[number]} {number}")
+                continue
+            self.chunk_rows[number] = row.number
+
+            patient = Patient(**row.data)
+            # bulk_create no pasa por Patient.save()
+            patient.search_name = normalize_search_text(f"{patient.first_name} {patient.last_name}")
+            patients.append(patient)
+
+        Patient.objects.bulk_create(patients)
+        get_backend().index_patients(patients)
+        result.add("created", len(patients))
+
+    def chunk_saved(self):
+        self.seen_rows.update(self.chunk_rows)
+        self.chunk_rows = {}
@@ -0,0 +1,74 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.text import normalize_search_text
+from apps.patients.models import Patient
+from apps.patients.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Recalcula Patient.search_name y regenera el índice de búsqueda de pacientes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--benchmark",
+            type=int,
+            default=0,
+            metavar="N",
+            help="En lugar de regenerar, ejecuta N búsquedas de autocompletado y reporta la latencia",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if options["benchmark"]:
+            self._benchmark(backend, options["benchmark"])
+            return
+
+        updated = 0
+        batch = []
+        with transaction.atomic():
+            for patient in Patient.objects.only("id", "first_name", "last_name", "search_name").iterator(
+                chunk_size=2000
+            ):
+                search_name = normalize_search_text(f"{patient.first_name} {patient.last_name}")
+                if patient.search_name != search_name:
+                    patient.search_name = search_name
+                    batch.append(patient)
+                if len(batch) >= 2000:
+                    updated += Patient.objects.bulk_update(batch, ["search_name"])
+                    batch = []
+            if batch:
+                updated += Patient.objects.bulk_update(batch, ["search_name"])
+
+            backend.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Índice de búsqueda regenerado ({type(backend).__name__}, {updated} nombres corregidos)"
+            )
+        )
+
+    def _benchmark(self, backend, count):
+        # Prefijos de apellidos y documentos reales, como los que se escriben en recepción
+        sample = list(Patient.objects.order_by("?").values_list("last_name", "document_number")[:200])
+        if not sample:
+            self.stdout.write("No hay pacientes para medir")
+            return
+
+        timings = []
+        for _ in range(count):
+            last_name, document_number = random.choice(sample)
+            query = random.choice([last_name[: random.randint(2, 5)], document_number[:4]])
+            started_at = time.perf_counter()
+            backend.search(query, limit=10)
+            timings.append((time.perf_counter() - started_at) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"Backend: {type(backend).__name__}")
+        self.stdout.write(f"Búsquedas: {count}")
+        self.stdout.write(f"p50: {statistics.median(timings):.1f} ms | p95: {p95:.1f} ms | máx: {timings[-1]:.1f} ms")
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:36
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().split())
+
+
+def backfill_search_name(apps, schema_editor):
+    Patient = apps.get_model("patients", "Patient")
+
+    batch = []
+    for patient in Patient.objects.only("id", "first_name", "last_name").iterator(chunk_size=2000):
+        patient.search_name = normalize(f"{patient.first_name} {patient.last_name}")
+        batch.append(patient)
+        if len(batch) >= 2000:
+            Patient.objects.bulk_update(batch, ["search_name"])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ["search_name"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("patients", "0003_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patient",
+            name="search_name",
+            field=models.CharField(blank=True, default="", editable=False, max_length=201),
+        ),
+        migrations.RunPython(backfill_search_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+FTS_TABLE = "patients_patient_fts"
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS patient_search_name_trgm_idx "
+                "ON patients_patient USING gin (search_name gin_trgm_ops)"
+            )
+            cursor.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS patient_document_trgm_idx "
+                "ON patients_patient USING gin (document_number gin_trgm_ops)"
+            )
+        elif connection.vendor == "sqlite":
+            # prefix='2 3': índices de prefijo para el autocompletado desde el segundo carácter
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "search_name, document_number, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, search_name, document_number) "
+                "SELECT id, search_name, document_number FROM patients_patient"
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS patient_search_name_trgm_idx")
+            cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS patient_document_trgm_idx")
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ("patients", "0004_patient_search_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -3,6 +3,7 @@ from datetime import date
 from django.db import models
 
 from apps.core.models import TimeStampedModel
+from apps.core.text import normalize_search_text
 
 
 class LeadSource(TimeStampedModel):
@@ -58,14 +59,37 @@ class Patient(TimeStampedModel):
         default="",
         verbose_name="Presunción Médica",
     )
+    # "nombres apellidos" normalizado para búsqueda (ver apps.patients.search)
+    search_name = models.CharField(max_length=201, blank=True, default="", editable=False)
 
     class Meta:
         verbose_name = "Patient"
         verbose_name_plural = "Patients"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="patient_created_at_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.last_name}, {self.first_name} - {self.document_type} {self.document_number}"
 
+    def save(self, *args, **kwargs):
+        from apps.patients.search import get_backend
+
+        self.search_name = normalize_search_text(f"{self.first_name} {self.last_name}")
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"first_name", "last_name"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+        get_backend().index_patient(self)
+
+    def delete(self, *args, **kwargs):
+        from apps.patients.search import get_backend
+
+        patient_id = self.pk
+        result = super().delete(*args, **kwargs)
+        get_backend().remove_patient(patient_id)
+        return result
+
     @property
     def age(self):
         """Calcula la edad del paciente en base a su fecha de nacimiento"""
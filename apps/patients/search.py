@@ -0,0 +1,201 @@
+"""
+Búsqueda de pacientes por nombre y documento
+
+Patient.search_name guarda "nombres apellidos" en minúsculas y sin tildes
+(normalize_search_text), por lo que "Nuñez", "NUÑEZ" y "nunez" coinciden. Sobre
+esa columna cada motor usa su propio índice:
+
+    - PostgreSQL: índices GIN de pg_trgm sobre search_name y document_number
+      (LIKE '%x%' indexado) y ranking por similitud de trigramas, que además
+      tolera errores de tipeo.
+    - SQLite: tabla FTS5 patients_patient_fts con búsqueda por prefijo de
+      palabra; los resultados salen del más reciente al más antiguo. El filtro
+      por documento de los listados usa contains, igual que los demás motores.
+    - Otros motores: contains sobre la columna normalizada (sin índice).
+
+El backend se elige según el motor de la base de datos o con
+PATIENT_SEARCH_BACKEND (ruta a una subclase de PatientSearchBackend).
+Patient.save() y Patient.delete() mantienen el índice sincronizado; tras
+operaciones masivas (update/bulk_create) usar el comando rebuild_patient_search.
+"""
+
+from django.conf import settings
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from apps.core.text import search_tokens
+from apps.patients.models import Patient
+
+FTS_TABLE = "patients_patient_fts"
+
+_backend = None
+
+
+class PatientSearchBackend:
+    """Backend genérico: contains sobre la columna normalizada, sin índice dedicado"""
+
+    def search(self, query, limit=10):
+        """
+        Pacientes que coinciden con el texto de autocompletado (nombre o documento).
+
+        Args:
+            query: Texto ingresado por el usuario
+            limit: Cantidad máxima de resultados
+
+        Returns:
+            list[Patient]: Ordenados por relevancia
+        """
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        condition = self._name_condition(tokens, "") | models.Q(document_number__startswith=query.strip())
+        return list(Patient.objects.filter(condition).order_by("last_name", "first_name")[:limit])
+
+    def filter(self, queryset, name="", document="", prefix=""):
+        """
+        Filtra un queryset por nombre y/o número de documento del paciente.
+
+        Args:
+            queryset: QuerySet de Patient o de un modelo relacionado
+            name: Texto a buscar en nombres y apellidos
+            document: Texto a buscar en el número de documento
+            prefix: Ruta al paciente desde el modelo del queryset (ej: "patient__", "order__patient__")
+        """
+        tokens = search_tokens(name)
+        if tokens:
+            queryset = queryset.filter(self._name_condition(tokens, prefix))
+        document = document.strip()
+        if document:
+            queryset = queryset.filter(**{f"{prefix}document_number__contains": document})
+        return queryset
+
+    def index_patient(self, patient):
+        """Actualiza el índice de búsqueda después de guardar el paciente"""
+
+    def index_patients(self, patients):
+        """Actualiza el índice después de guardar pacientes en bloque (bulk_create)"""
+        for patient in patients:
+            self.index_patient(patient)
+
+    def remove_patient(self, patient_id):
+        """Quita al paciente del índice de búsqueda después de eliminarlo"""
+
+    def rebuild(self):
+        """Regenera el índice completo desde la tabla de pacientes"""
+
+    def _name_condition(self, tokens, prefix):
+        condition = models.Q()
+        for token in tokens:
+            condition &= models.Q(**{f"{prefix}search_name__contains": token})
+        return condition
+
+
+class PostgresTrigramBackend(PatientSearchBackend):
+    """
+    pg_trgm: los LIKE '%x%' sobre search_name y document_number usan los índices
+    GIN (migración patients.0005) y el autocompletado se ordena por similitud.
+    Las coincidencias aproximadas usan pg_trgm.word_similarity_threshold (0.6 por defecto).
+    """
+
+    def search(self, query, limit=10):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        normalized = " ".join(tokens)
+        condition = (
+            self._name_condition(tokens, "")
+            | models.Q(search_name__trigram_word_similar=normalized)
+            | models.Q(document_number__startswith=query.strip())
+        )
+        return list(
+            Patient.objects.filter(condition)
+            .annotate(similarity=TrigramWordSimilarity(normalized, "search_name"))
+            .order_by("-similarity", "last_name", "first_name")[:limit]
+        )
+
+
+class SqliteFTSBackend(PatientSearchBackend):
+    """
+    FTS5: tabla patients_patient_fts(search_name, document_number) con rowid igual
+    al id del paciente, mantenida desde Patient.save()/delete().
+    """
+
+    def search(self, query, limit=10):
+        match = self._match_expression(search_tokens(query), ["search_name", "document_number"])
+        if not match:
+            return []
+        # ORDER BY rowid permite a FTS5 detenerse en el LIMIT; ORDER BY rank (bm25) calcula
+        # el puntaje de todas las coincidencias y con prefijos cortos son decenas de miles
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s",
+                [match, limit],
+            )
+            patient_ids = [row[0] for row in cursor.fetchall()]
+
+        patients = Patient.objects.in_bulk(patient_ids)
+        return [patients[patient_id] for patient_id in patient_ids if patient_id in patients]
+
+    def filter(self, queryset, name="", document="", prefix=""):
+        match = self._match_expression(search_tokens(name), ["search_name"])
+        if match:
+            matching_ids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            queryset = queryset.filter(**{f"{prefix}id__in": matching_ids})
+        # El documento se filtra con contains como en los demás motores: FTS5 solo encuentra
+        # prefijos y los listados devolverían otras filas para el mismo número
+        return super().filter(queryset, document=document, prefix=prefix)
+
+    def index_patient(self, patient):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [patient.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, search_name, document_number) VALUES (%s, %s, %s)",
+                [patient.pk, patient.search_name, patient.document_number],
+            )
+
+    def index_patients(self, patients):
+        rows = [(patient.pk, patient.search_name, patient.document_number) for patient in patients]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [row[:1] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, search_name, document_number) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove_patient(self, patient_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [patient_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, search_name, document_number) "
+                "SELECT id, search_name, document_number FROM patients_patient"
+            )
+
+    def _match_expression(self, tokens, columns):
+        # Cada palabra como prefijo ("nun"* coincide con "nunez"), todas obligatorias
+        if not tokens:
+            return ""
+        terms = " AND ".join(f'"{token}"*' for token in tokens)
+        return f"{{{' '.join(columns)}}} : ({terms})"
+
+
+def get_backend():
+    """Backend de búsqueda del proceso (se resuelve una sola vez)"""
+    global _backend
+    if _backend is None:
+        if settings.PATIENT_SEARCH_BACKEND:
+            _backend = import_string(settings.PATIENT_SEARCH_BACKEND)()
+        elif connection.vendor == "postgresql":
+            _backend = PostgresTrigramBackend()
+        elif connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names():
+            _backend = SqliteFTSBackend()
+        else:
+            _backend = PatientSearchBackend()
+    return _backend
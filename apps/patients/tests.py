@@ -0,0 +1,227 @@
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from openpyxl import Workbook
+
+from apps.imports import services
+from apps.imports.models import ImportJob
+from apps.patients.imports import PatientImporter
+from apps.patients.models import Patient
+from apps.patients.search import FTS_TABLE, SqliteFTSBackend, get_backend
+
+
+def patients_workbook(numbers):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(PatientImporter.columns))
+    for number in numbers:
+        sheet.append(["Núñez", "José", "DNI", number, "17/10/1990", "M", "999999999"])
+    fileobj = BytesIO()
+    workbook.save(fileobj)
+    return SimpleUploadedFile("pacientes.xlsx", fileobj.getvalue())
+
+
+class PatientImportResumeTests(TestCase):
+    """Una importación que falla a mitad de archivo se reanuda desde el último bloque guardado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        chunk_size = mock.patch.object(PatientImporter, "chunk_size", 2)
+        chunk_size.start()
+        self.addCleanup(chunk_size.stop)
+
+    def run_next_job(self):
+        job = services.claim_next_job()
+        services.run_import_job(job)
+        job.refresh_from_db()
+        return job
+
+    def numbers(self):
+        return sorted(Patient.objects.values_list("document_number", flat=True))
+
+    def test_resume_after_the_database_goes_down(self):
+        # Filas 2-9, en bloques de dos; la fila 9 repite la fila 4
+        numbers = ["10000001", "10000002", "10000003", "10000004", "10000005", "10000006", "10000007", "10000003"]
+        services.enqueue_import(ImportJob.Kind.PATIENTS, patients_workbook(numbers), self.user)
+
+        # La base de datos se cae al guardar el segundo bloque (filas 4-5): tampoco se puede registrar el avance
+        bulk_create = Patient.objects.bulk_create
+        database_down = []
+
+        def failing_bulk_create(patients, *args, **kwargs):
+            if patients[0].document_number == "10000003":
+                database_down.append(True)
+                raise DatabaseError("conexión perdida")
+            return bulk_create(patients, *args, **kwargs)
+
+        progress = services.JobProgress.__call__
+
+        def failing_progress(job_progress, summary):
+            if database_down:
+                raise DatabaseError("conexión perdida")
+            return progress(job_progress, summary)
+
+        with (
+            mock.patch.object(Patient.objects, "bulk_create", side_effect=failing_bulk_create),
+            mock.patch.object(services.JobProgress, "__call__", failing_progress),
+            self.assertLogs("apps", "ERROR"),
+        ):
+            job = self.run_next_job()
+
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertEqual(job.last_row, 3)
+        self.assertEqual(job.counts["created"], 2)
+        self.assertTrue(job.file)
+        self.assertEqual(self.numbers(), ["10000001", "10000002"])
+
+        # Se reanuda desde la fila 4: nada se pierde ni se duplica
+        self.assertTrue(services.resume_import(job))
+        job = self.run_next_job()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.last_row, 9)
+        self.assertEqual(job.progress, 8)
+        self.assertEqual(job.counts, {"created": 7, "updated": 0, "unchanged": 0, "skipped": 1, "errors": 0})
+        self.assertEqual(self.numbers(), sorted(set(numbers)))
+        self.assertEqual(job.error_sample[0]["row"], 9)
+
+    def test_document_of_a_rolled_back_chunk_is_imported_later_in_the_file(self):
+        # Filas 2-7; el bloque de las filas 4-5 falla y la fila 6 repite la fila 4
+        numbers = ["10000001", "10000002", "10000003", "10000004", "10000003", "10000005"]
+        services.enqueue_import(ImportJob.Kind.PATIENTS, patients_workbook(numbers), self.user)
+
+        bulk_create = Patient.objects.bulk_create
+        calls = []
+
+        def failing_second_chunk(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise DatabaseError("restricción violada")
+            return bulk_create(*args, **kwargs)
+
+        with (
+            mock.patch.object(Patient.objects, "bulk_create", side_effect=failing_second_chunk),
+            self.assertLogs("apps.imports.engine", "ERROR"),
+        ):
+            job = self.run_next_job()
+
+        # Las filas del bloque revertido quedan como error; el documento repetido después sí se importa
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.counts, {"created": 4, "updated": 0, "unchanged": 0, "skipped": 0, "errors": 2})
+        self.assertEqual(self.numbers(), ["10000001", "10000002", "10000003", "10000005"])
+        self.assertEqual([issue["row"] for issue in job.error_sample], [4, 5])
+
+
+def create_patient(first_name, last_name, document_number):
+    return Patient.objects.create(
+        document_number=document_number,
+        first_name=first_name,
+        last_name=last_name,
+        birthdate=date(1990, 1, 1),
+        sex="MALE",
+        phone_number="999999999",
+    )
+
+
+class SqliteFTSSearchTests(TestCase):
+    """Tabla FTS5 de la migración 0005 y su sincronización desde Patient.save()/delete()"""
+
+    def setUp(self):
+        self.backend = get_backend()
+        self.jose = create_patient("José", "Núñez Peña", "45678912")
+        self.maria = create_patient("María", "Nuñovero", "12456789")
+
+    def search(self, query):
+        return [patient.pk for patient in self.backend.search(query)]
+
+    def filter(self, **kwargs):
+        return sorted(self.backend.filter(Patient.objects.all(), **kwargs).values_list("pk", flat=True))
+
+    def indexed_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid, search_name, document_number FROM {FTS_TABLE} ORDER BY rowid")
+            return cursor.fetchall()
+
+    def test_sqlite_uses_the_fts_table(self):
+        self.assertIsInstance(self.backend, SqliteFTSBackend)
+        self.assertEqual(
+            self.indexed_rows(),
+            [(self.jose.pk, "jose nunez pena", "45678912"), (self.maria.pk, "maria nunovero", "12456789")],
+        )
+
+    def test_names_match_without_accents_or_case(self):
+        for query in ("nunez", "NÚÑEZ", "Nuñez", "jose nu", "peña jo"):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [self.jose.pk])
+                self.assertEqual(self.filter(name=query), [self.jose.pk])
+
+        # Prefijos de palabra, del más reciente al más antiguo
+        self.assertEqual(self.search("nu"), [self.maria.pk, self.jose.pk])
+        self.assertEqual(self.search("maria nunez"), [])
+        self.assertEqual(self.filter(name="ñez"), [])
+        self.assertEqual(self.search("¿?"), [])
+
+    def test_partial_document_matches(self):
+        # El autocompletado busca el documento por prefijo, los listados en cualquier posición
+        self.assertEqual(self.search("4567"), [self.jose.pk])
+        self.assertEqual(self.search("12"), [self.maria.pk])
+        self.assertEqual(self.filter(document="4567"), [self.jose.pk, self.maria.pk])
+        self.assertEqual(self.filter(document=" 8912 "), [self.jose.pk])
+        self.assertEqual(self.filter(name="maria", document="4567"), [self.maria.pk])
+
+    def test_index_follows_save_and_delete(self):
+        self.jose.last_name = "Quispe"
+        self.jose.save(update_fields=["last_name"])
+        self.assertEqual(self.search("nunez"), [])
+        self.assertEqual(self.search("quispe"), [self.jose.pk])
+
+        self.jose.document_number = "70000001"
+        self.jose.save()
+        self.assertEqual(self.search("4567"), [])
+        self.assertEqual(self.search("7000"), [self.jose.pk])
+
+        maria_id = self.maria.pk
+        self.maria.delete()
+        self.assertEqual(self.search("maria"), [])
+        self.assertEqual(self.indexed_rows(), [(self.jose.pk, "jose quispe", "70000001")])
+        self.assertFalse(Patient.objects.filter(pk=maria_id).exists())
+
+    def test_bulk_changes_need_reindexing(self):
+        # update() no pasa por Patient.save(): ni search_name ni la tabla FTS5 cambian
+        Patient.objects.filter(pk=self.jose.pk).update(last_name="Quispe")
+        self.assertEqual(self.search("quispe"), [])
+
+        call_command("rebuild_patient_search", stdout=StringIO())
+        self.assertEqual(self.search("quispe"), [self.jose.pk])
+        self.assertEqual(self.search("nunez"), [])
+
+        patients = Patient.objects.bulk_create(
+            [
+                Patient(
+                    document_number="33333333",
+                    first_name="Ana",
+                    last_name="Ríos",
+                    search_name="ana rios",
+                    birthdate=date(1990, 1, 1),
+                    sex="FEMALE",
+                    phone_number="999999999",
+                )
+            ]
+        )
+        self.backend.index_patients(patients)
+        self.assertEqual(self.search("rios"), [patients[0].pk])
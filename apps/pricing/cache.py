@@ -0,0 +1,198 @@
+"""
+Caché de precios por tarifario en cada proceso
+
+Un tarifario rara vez supera unos miles de pares (examen -> precio), pero se
+consulta en cada cotización y en cada orden. Cada worker guarda una instantánea
+de los precios:
+
+    - Nombres de todos los tarifarios, cupones activos (código -> tarifario y
+      vencimiento) y referidos activos (id -> tarifario), cargados juntos.
+    - Los precios de cada tarifario como un dict {exam_id: Decimal}, cargado
+      la primera vez que se usa (una consulta por tarifario).
+
+La instantánea se descarta cuando cambia la versión de precios: un contador en
+Sequence (PRICE_VERSION_SCOPE) que incrementan save()/delete() de PriceList,
+PriceListItem, Coupon y Referral y las cargas masivas de tarifarios
+(bump_price_version). La versión se consulta como máximo cada
+PRICE_CACHE_CHECK_SECONDS: los cambios del mismo proceso se ven de inmediato y
+los de otros workers en, a lo sumo, ese intervalo. El vencimiento de los cupones
+se evalúa en cada consulta, por lo que no necesita invalidar nada.
+
+La creación de órdenes sigue validando el cupón y el referido contra la base de
+datos (get_valid_coupon); el caché solo resuelve precios.
+
+stats() expone, para el worker actual, la tasa de aciertos y cuánto tiempo pudo
+haber servido precios desactualizados (ver price_cache_stats_api).
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.sequences import current_value, next_value
+from apps.pricing.models import Coupon, PriceList, PriceListItem
+from apps.referrals.models import Referral
+
+logger = logging.getLogger(__name__)
+
+PRICE_VERSION_SCOPE = "catalog:prices"
+
+_state = {"cache": None, "checked_at": 0.0}
+_load_lock = threading.Lock()
+
+# Métricas del proceso (aproximadas: se incrementan sin bloqueo)
+_metrics = {"hits": 0, "misses": 0, "reloads": 0, "last_stale_seconds": 0.0, "max_stale_seconds": 0.0}
+
+
+class PriceCache:
+    """Instantánea de precios de una versión (solo lectura salvo la carga de cada tarifario)"""
+
+    def __init__(self, version, price_list_names, coupons, referrals):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.price_list_names = price_list_names
+        self.coupons = coupons
+        self.referrals = referrals
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def prices(self, price_list_id):
+        """dict {exam_id: Decimal} del tarifario (vacío si no existe)"""
+        prices = self.items.get(price_list_id)
+        if prices is not None:
+            _metrics["hits"] += 1
+            return prices
+
+        _metrics["misses"] += 1
+        with self.lock:
+            prices = self.items.get(price_list_id)
+            if prices is None:
+                prices = dict(PriceListItem.objects.filter(price_list_id=price_list_id).values_list("exam_id", "price"))
+                self.items[price_list_id] = prices
+        return prices
+
+    def coupon(self, code):
+        """
+        Tarifario de un cupón activo y vigente.
+
+        Returns:
+            tuple (code, price_list_id) o None si no existe, está inactivo o venció
+        """
+        code = code.upper()
+        entry = self.coupons.get(code)
+        if entry is None:
+            return None
+        price_list_id, expiration_date = entry
+        if expiration_date and expiration_date < timezone.now().date():
+            return None
+        return code, price_list_id
+
+    def referral_price_list(self, referral_id):
+        """Id del tarifario de un referido activo, o None"""
+        return self.referrals.get(referral_id)
+
+    def price_list_name(self, price_list_id):
+        return self.price_list_names.get(price_list_id, "")
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "price_lists": len(self.price_list_names),
+            "price_lists_loaded": len(self.items),
+            "items_loaded": sum(len(prices) for prices in self.items.values()),
+            "coupons": len(self.coupons),
+            "referrals": len(self.referrals),
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1),
+        }
+
+
+def bump_price_version():
+    """Registra un cambio de precios: invalida el caché de este proceso y, vía la versión, el de los demás"""
+    _state["checked_at"] = 0.0
+    _state["cache"] = None
+    return next_value(PRICE_VERSION_SCOPE)
+
+
+def price_version():
+    return current_value(PRICE_VERSION_SCOPE)
+
+
+def get_price_cache():
+    """Caché de precios vigente del proceso, recargado si la versión cambió"""
+    cache = _state["cache"]
+    now = time.monotonic()
+    if cache is not None and now - _state["checked_at"] < settings.PRICE_CACHE_CHECK_SECONDS:
+        return cache
+
+    version = price_version()
+    previous_check = _state["checked_at"]
+    _state["checked_at"] = now
+    if cache is not None and cache.version == version:
+        return cache
+
+    with _load_lock:
+        cache = _state["cache"]
+        if cache is None or cache.version != version:
+            if cache is not None and previous_check:
+                # El cambio ocurrió después de la verificación anterior: este es el máximo tiempo desactualizado
+                stale_seconds = now - previous_check
+                _metrics["last_stale_seconds"] = stale_seconds
+                _metrics["max_stale_seconds"] = max(_metrics["max_stale_seconds"], stale_seconds)
+            cache = load_price_cache(version)
+            _state["cache"] = cache
+    return cache
+
+
+def load_price_cache(version):
+    """
+    Carga tarifarios, cupones y referidos en tres consultas; los precios de cada
+    tarifario se cargan al usarlo (PriceCache.prices).
+
+    La versión debe leerse antes de cargar: si los precios cambian durante la
+    carga, la próxima verificación encuentra una versión mayor y recarga.
+    """
+    started = time.monotonic()
+    price_list_names = dict(PriceList.objects.values_list("id", "name"))
+    coupons = {
+        code: (price_list_id, expiration_date)
+        for code, price_list_id, expiration_date in Coupon.objects.filter(is_active=True).values_list(
+            "code", "price_list_id", "expiration_date"
+        )
+    }
+    referrals = dict(Referral.objects.filter(is_active=True).values_list("id", "price_list_id"))
+
+    _metrics["reloads"] += 1
+    logger.info(
+        "Caché de precios v%s cargado: %s tarifarios, %s cupones, %s referidos en %.0f ms (tasa de aciertos %.1f%%)",
+        version,
+        len(price_list_names),
+        len(coupons),
+        len(referrals),
+        (time.monotonic() - started) * 1000,
+        hit_rate() * 100,
+    )
+    return PriceCache(version, price_list_names, coupons, referrals)
+
+
+def hit_rate():
+    lookups = _metrics["hits"] + _metrics["misses"]
+    return _metrics["hits"] / lookups if lookups else 0.0
+
+
+def stats():
+    """Métricas del caché en este proceso, para monitoreo"""
+    cache = get_price_cache()
+    return {
+        **cache.stats(),
+        "hits": _metrics["hits"],
+        "misses": _metrics["misses"],
+        "hit_rate": round(hit_rate(), 4),
+        "reloads": _metrics["reloads"],
+        "check_seconds": settings.PRICE_CACHE_CHECK_SECONDS,
+        "checked_seconds_ago": round(time.monotonic() - _state["checked_at"], 1),
+        "last_stale_seconds": round(_metrics["last_stale_seconds"], 1),
+        "max_stale_seconds": round(_metrics["max_stale_seconds"], 1),
+    }
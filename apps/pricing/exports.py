@@ -0,0 +1,62 @@
+"""
+Exportación de tarifarios a Excel con memoria constante
+"""
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from apps.pricing.models import PriceListItem
+
+# Filas leídas por cada viaje a la base de datos
+EXPORT_CHUNK_SIZE = 2000
+
+
+def write_price_list_workbook(price_list, fileobj, progress=None):
+    """
+    Escribe el Excel del tarifario (Código, Nombre del Examen, Precio) en fileobj.
+
+    Args:
+        price_list: Instancia de PriceList
+        fileobj: Archivo (o ruta) de destino
+        progress: Callable opcional que recibe la cantidad de filas escritas
+
+    Returns:
+        int: Cantidad de filas escritas
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Tarifario")
+
+    # En modo write-only los anchos deben definirse antes de escribir filas
+    ws.column_dimensions["A"].width = 15
+    ws.column_dimensions["B"].width = 50
+    ws.column_dimensions["C"].width = 15
+
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_row = []
+    for header in ["Código", "Nombre del Examen", "Precio"]:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        header_row.append(cell)
+    ws.append(header_row)
+
+    rows = (
+        PriceListItem.objects.filter(price_list=price_list)
+        .order_by("exam__code", "exam__name")
+        .values_list("exam__code", "exam__name", "price")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    count = 0
+    for code, name, price in rows:
+        ws.append([code or "", name, float(price)])
+        count += 1
+        if progress and count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+
+    wb.save(fileobj)
+    if progress:
+        progress(count)
+    return count
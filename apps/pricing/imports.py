@@ -0,0 +1,85 @@
+"""
+Importación de tarifarios desde Excel (ver apps.imports.engine)
+"""
+
+from apps.exams.imports import parse_price
+from apps.exams.models import Exam
+from apps.imports.engine import Importer
+from apps.pricing.cache import bump_price_version
+from apps.pricing.models import PriceListItem
+
+
+class PriceListImporter(Importer):
+    """
+    Carga precios en el tarifario params["price_list_id"]: agrega los exámenes que
+    no tenía y actualiza los que cambiaron. La columna del nombre es informativa.
+
+    Por bloque: una consulta para los códigos, una para los precios actuales
+    (bloqueados hasta el fin de la transacción, para que los conteos sean exactos)
+    y un único INSERT ... ON CONFLICT (price_list, exam) DO UPDATE con las filas
+    nuevas o modificadas. Las que no cambian no se escriben.
+    """
+
+    columns = ("Código", "Nombre del Examen", "Precio")
+    required_columns = ("Código", "Precio")
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        # Examen -> fila del archivo donde apareció primero, de los bloques guardados
+        self.seen_rows = {}
+        # Los del bloque en curso: se suman a seen_rows solo si el bloque se confirma
+        self.chunk_rows = {}
+
+    def parse_row(self, values):
+        code, _name, price = values
+        return {"code": str(code).strip(), "price": parse_price(price)}
+
+    def save_chunk(self, rows, result):
+        price_list_id = self.params["price_list_id"]
+        exams = {
+            code: (exam_id, name)
+            for code, exam_id, name in Exam.objects.filter(code__in={row.data["code"] for row in rows}).values_list(
+                "code", "id", "name"
+            )
+        }
+        current_prices = dict(
+            PriceListItem.objects.select_for_update()
+            .filter(price_list_id=price_list_id, exam_id__in=[exam_id for exam_id, _ in exams.values()])
+            .values_list("exam_id", "price")
+        )
+
+        self.chunk_rows = {}
+        items = []
+        for row in rows:
+            code, price = row.data["code"], row.data["price"]
+            if code not in exams:
+                result.reject(row, f"Examen no encontrado con código '{code}'")
+                continue
+            exam_id, name = exams[code]
+            first_row = self.seen_rows.get(exam_id) or self.chunk_rows.get(exam_id)
+            if first_row:
+                result.skip(row, f"Código '{code}' repetido en el archivo (se usa el precio de la fila {first_row})")
+                continue
+            self.chunk_rows[exam_id] = row.number
+
+            old_price = current_prices.get(exam_id)
+            if old_price == price:
+                result.add("unchanged")
+                continue
+            result.add("created" if old_price is None else "updated")
+            result.change(
+                row, code=code, name=name, old=None if old_price is None else f"{old_price:.2f}", new=f"{price:.2f}"
+            )
+            items.append(PriceListItem(price_list_id=price_list_id, exam_id=exam_id, price=price))
+
+        if not items:
+            return
+        PriceListItem.objects.bulk_create(
+            items, update_conflicts=True, unique_fields=["price_list", "exam"], update_fields=["price"]
+        )
+        # bulk_create no pasa por PriceListItem.save()
+        bump_price_version()
+
+    def chunk_saved(self):
+        self.seen_rows.update(self.chunk_rows)
+        self.chunk_rows = {}
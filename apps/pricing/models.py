@@ -16,6 +16,19 @@ class PriceList(TimeStampedModel):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        super().save(*args, **kwargs)
+        bump_price_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        result = super().delete(*args, **kwargs)
+        bump_price_version()
+        return result
+
 
 class PriceListItem(models.Model):
     price_list = models.ForeignKey(PriceList, on_delete=models.CASCADE, related_name="items", verbose_name="Price List")
@@ -30,6 +43,19 @@ class PriceListItem(models.Model):
     def __str__(self):
         return f"{self.price_list.name} - {self.exam.name}: S/. {self.price}"
 
+    def save(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        super().save(*args, **kwargs)
+        bump_price_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        result = super().delete(*args, **kwargs)
+        bump_price_version()
+        return result
+
 
 class Coupon(TimeStampedModel):
     code = models.CharField(max_length=50, unique=True, verbose_name="Code")
@@ -51,5 +77,15 @@ class Coupon(TimeStampedModel):
 
     def save(self, *args, **kwargs):
         """Convert code to uppercase before saving"""
+        from apps.pricing.cache import bump_price_version
+
         self.code = self.code.upper()
         super().save(*args, **kwargs)
+        bump_price_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        result = super().delete(*args, **kwargs)
+        bump_price_version()
+        return result
@@ -1,7 +1,11 @@
+from decimal import Decimal
+
 from django.utils import timezone
 
+from apps.exams.catalog import get_catalog
 from apps.exams.models import Exam
-from apps.pricing.models import Coupon, PriceListItem
+from apps.pricing.cache import get_price_cache
+from apps.pricing.models import Coupon
 from apps.referrals.models import Referral
 
 
@@ -18,6 +22,8 @@ class PricingService:
         2. Si hay referido → precio del tarifario del referido
         3. Precio base del examen
 
+        Para varios exámenes usar quote(), que los resuelve juntos.
+
         Args:
             exam_id: ID del examen
             referral_id: ID del referido (opcional)
@@ -32,57 +38,153 @@ class PricingService:
 
         Raises:
             Exam.DoesNotExist: Si el examen no existe
-            Referral.DoesNotExist: Si el referido no existe
         """
-        # Obtener el examen (lanzará excepción si no existe)
-        exam = Exam.objects.get(id=exam_id)
-
-        # Prioridad 1: Si hay cupón, intentar obtener precio del tarifario del cupón
-        if coupon_code:
-            try:
-                coupon = Coupon.objects.select_related("price_list").get(code=coupon_code.upper(), is_active=True)
-
-                # Validar fecha de expiración
-                if coupon.expiration_date and coupon.expiration_date < timezone.now().date():
-                    # Cupón expirado, continuar con las siguientes prioridades
-                    pass
-                else:
-                    # Buscar el precio en el tarifario del cupón
-                    price_item = PriceListItem.objects.get(price_list=coupon.price_list, exam=exam)
-
-                    return {
-                        "price": str(price_item.price),
-                        "source": "coupon",
-                        "price_list_id": coupon.price_list.id,
-                        "price_list_name": coupon.price_list.name,
-                        "coupon_code": coupon.code,
-                    }
-            except (Coupon.DoesNotExist, PriceListItem.DoesNotExist):
-                # Si el cupón no existe o no tiene precio para este examen,
-                # continuar con las siguientes prioridades
-                pass
-
-        # Prioridad 2: Si hay referido, buscar en su tarifario
-        if referral_id:
-            try:
-                referral = Referral.objects.select_related("price_list").get(id=referral_id, is_active=True)
-
-                # Buscar el precio en el tarifario del referido
-                price_item = PriceListItem.objects.get(price_list=referral.price_list, exam=exam)
-
-                return {
-                    "price": str(price_item.price),
-                    "source": "price_list",
-                    "price_list_id": referral.price_list.id,
-                    "price_list_name": referral.price_list.name,
+        return PricingService.quote([exam_id], referral_id, coupon_code)["lines"][0]["pricing"]
+
+    @staticmethod
+    def quote(exam_ids: list[int], referral_id: int | None = None, coupon_code: str | None = None) -> dict:
+        """
+        Cotiza un carrito completo con las prioridades de get_exam_price. El cupón, el
+        referido y los precios salen del caché de precios del proceso (apps.pricing.cache)
+        y los exámenes del catálogo en memoria, por lo que normalmente no hace consultas.
+        Un cupón inválido o vencido y un referido inactivo se ignoran, como en get_exam_price.
+
+        Args:
+            exam_ids: IDs de los exámenes en el orden del carrito (pueden repetirse)
+            referral_id: ID del referido (opcional)
+            coupon_code: Código del cupón (opcional)
+
+        Returns:
+            dict con:
+                - lines: una por examen con exam_id, code, name y pricing (el dict de get_exam_price)
+                - total: suma de los precios
+                - coupon_code: código del cupón aplicado (None si no hay o no es válido)
+                - referral_id: ID del referido aplicado (None si no hay o está inactivo)
+
+        Raises:
+            Exam.DoesNotExist: Si algún examen no existe
+        """
+        cache = get_price_cache()
+        coupon = cache.coupon(coupon_code) if coupon_code else None
+        referral_price_list_id = cache.referral_price_list(referral_id) if referral_id else None
+
+        price_lists = []
+        if coupon:
+            price_lists.append(("coupon", coupon[1], coupon[0]))
+        if referral_price_list_id:
+            price_lists.append(("price_list", referral_price_list_id, None))
+
+        lines = PricingService._price_lines(exam_ids, price_lists, cache)
+        return {
+            "lines": [
+                {
+                    "exam_id": line["exam"].id,
+                    "code": line["exam"].code,
+                    "name": line["exam"].name,
+                    "pricing": PricingService.serialize_line(line),
                 }
-            except (Referral.DoesNotExist, PriceListItem.DoesNotExist):
-                # Si el referido no existe o no tiene precio en su tarifario,
-                # continuar para devolver el precio base
-                pass
+                for line in lines
+            ],
+            "total": str(sum((line["price"] for line in lines), Decimal("0.00"))),
+            "coupon_code": coupon[0] if coupon else None,
+            "referral_id": referral_id if referral_price_list_id else None,
+        }
+
+    @staticmethod
+    def price_cart(exam_ids: list[int], referral: Referral | None = None, coupon: Coupon | None = None) -> list[dict]:
+        """
+        Precio de cada examen con el cupón y el referido ya validados contra la base de
+        datos (creación de órdenes); los precios salen del caché de precios.
+
+        Args:
+            exam_ids: IDs de los exámenes en el orden del carrito
+            referral: Referido activo (opcional)
+            coupon: Cupón vigente (opcional)
+
+        Returns:
+            list[dict] con exam (CatalogExam o Exam), price (Decimal), source, price_list_id y coupon_code
+
+        Raises:
+            Exam.DoesNotExist: Si algún examen no existe
+        """
+        price_lists = []
+        if coupon:
+            price_lists.append(("coupon", coupon.price_list_id, coupon.code))
+        if referral:
+            price_lists.append(("price_list", referral.price_list_id, None))
+        return PricingService._price_lines(exam_ids, price_lists, get_price_cache())
+
+    @staticmethod
+    def _price_lines(exam_ids, price_lists, cache):
+        """
+        Args:
+            price_lists: [(source, price_list_id, coupon_code)] en orden de prioridad
+            cache: PriceCache vigente
+        """
+        unique_ids = set(exam_ids)
+        exams = get_catalog().get_many(unique_ids)
+        if len(exams) < len(unique_ids):
+            # Exámenes recién creados en otro worker, antes de que se recargue el catálogo
+            exams.update(Exam.objects.in_bulk(unique_ids - exams.keys()))
+
+        price_lists = [
+            (source, price_list_id, coupon_code, cache.prices(price_list_id))
+            for source, price_list_id, coupon_code in price_lists
+        ]
+
+        lines = []
+        for exam_id in exam_ids:
+            exam = exams.get(exam_id)
+            if exam is None:
+                raise Exam.DoesNotExist(f"Examen con ID {exam_id} no encontrado")
+
+            line = {"exam": exam, "price": exam.price, "source": "base", "price_list_id": None, "coupon_code": None}
+            for source, price_list_id, coupon_code, prices in price_lists:
+                price = prices.get(exam_id)
+                if price is not None:
+                    line.update(
+                        price=price,
+                        source=source,
+                        price_list_id=price_list_id,
+                        price_list_name=cache.price_list_name(price_list_id),
+                        coupon_code=coupon_code,
+                    )
+                    break
+            lines.append(line)
+        return lines
+
+    @staticmethod
+    def serialize_line(line: dict) -> dict:
+        """Línea de price_cart en el formato de get_exam_price"""
+        data = {"price": str(line["price"]), "source": line["source"]}
+        if line["price_list_id"]:
+            data["price_list_id"] = line["price_list_id"]
+            data["price_list_name"] = line["price_list_name"]
+        if line["coupon_code"]:
+            data["coupon_code"] = line["coupon_code"]
+        return data
+
+    @staticmethod
+    def get_valid_coupon(coupon_code: str) -> tuple[Coupon | None, str | None]:
+        """
+        Obtiene un cupón activo y vigente (con su tarifario) en una sola consulta.
+
+        Args:
+            coupon_code: Código del cupón
+
+        Returns:
+            tuple (coupon, error): el cupón si es válido, o None y el mensaje de error
+        """
+        try:
+            coupon = Coupon.objects.select_related("price_list").get(code=coupon_code.upper(), is_active=True)
+        except Coupon.DoesNotExist:
+            return None, "Cupón no válido o inactivo"
+
+        # Validar fecha de expiración
+        if coupon.expiration_date and coupon.expiration_date < timezone.now().date():
+            return None, "El cupón ha expirado"
 
-        # Prioridad 3: Precio base del examen
-        return {"price": str(exam.price), "source": "base"}
+        return coupon, None
 
     @staticmethod
     def validate_coupon(coupon_code: str) -> dict:
@@ -98,21 +200,16 @@ class PricingService:
                 - coupon: datos del cupón si es válido
                 - error: mensaje de error si no es válido
         """
-        try:
-            coupon = Coupon.objects.select_related("price_list").get(code=coupon_code.upper(), is_active=True)
-
-            # Validar fecha de expiración
-            if coupon.expiration_date and coupon.expiration_date < timezone.now().date():
-                return {"valid": False, "error": "El cupón ha expirado"}
-
-            return {
-                "valid": True,
-                "coupon": {
-                    "code": coupon.code,
-                    "price_list_id": coupon.price_list.id,
-                    "price_list_name": coupon.price_list.name,
-                    "expiration_date": str(coupon.expiration_date) if coupon.expiration_date else None,
-                },
-            }
-        except Coupon.DoesNotExist:
-            return {"valid": False, "error": "Cupón no válido o inactivo"}
+        coupon, error = PricingService.get_valid_coupon(coupon_code)
+        if error:
+            return {"valid": False, "error": error}
+
+        return {
+            "valid": True,
+            "coupon": {
+                "code": coupon.code,
+                "price_list_id": coupon.price_list.id,
+                "price_list_name": coupon.price_list.name,
+                "expiration_date": str(coupon.expiration_date) if coupon.expiration_date else None,
+            },
+        }
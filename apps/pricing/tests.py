@@ -0,0 +1,390 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from apps.billing.models import Company
+from apps.core.sequences import next_value
+from apps.exams.models import Exam
+from apps.imports.engine import ErrorReport, run_import
+from apps.orders.services import create_order, resolve_exam_details
+from apps.patients.models import Patient
+from apps.pricing import cache as price_cache
+from apps.pricing.imports import PriceListImporter
+from apps.pricing.models import Coupon, PriceList, PriceListItem
+from apps.pricing.services import PricingService
+from apps.pricing.views import QUOTE_MAX_EXAMS
+from apps.referrals.models import Referral
+
+
+def workbook_file(columns, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(columns))
+    for row in rows:
+        sheet.append(list(row))
+    fileobj = BytesIO()
+    workbook.save(fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+class PriceCacheTestCase(TestCase):
+    """
+    El caché de precios vive en el módulo: se descarta entre pruebas, porque la
+    versión de precios vuelve atrás con el rollback de cada prueba y una
+    instantánea anterior con el mismo número de versión seguiría vigente.
+    """
+
+    def setUp(self):
+        price_cache._state.update(cache=None, checked_at=0.0)
+        price_cache._metrics.update(hits=0, misses=0, reloads=0, last_stale_seconds=0.0, max_stale_seconds=0.0)
+
+
+class PriceListImportTests(PriceCacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.exams = [Exam.objects.create(code=f"EX{i:05d}", name=f"Examen {i}", price=10) for i in range(1, 5)]
+        cls.price_list = PriceList.objects.create(name="Corporativo")
+        # EX00001 con el mismo precio, EX00002 con otro; EX00003 y EX00004 no están en el tarifario
+        PriceListItem.objects.create(price_list=cls.price_list, exam=cls.exams[0], price=Decimal("5.00"))
+        PriceListItem.objects.create(price_list=cls.price_list, exam=cls.exams[1], price=Decimal("8.00"))
+
+    def run_import(self, rows, dry_run=False, chunk_size=None):
+        importer = PriceListImporter({"price_list_id": self.price_list.id})
+        if chunk_size:
+            importer.chunk_size = chunk_size
+        report = ErrorReport(importer.columns)
+        try:
+            return run_import(importer, workbook_file(importer.columns, rows), report, dry_run=dry_run)
+        finally:
+            report.save()
+            report.close()
+
+    def prices(self):
+        return dict(self.price_list.items.values_list("exam__code", "price"))
+
+    def test_counts_created_updated_and_unchanged(self):
+        summary = self.run_import(
+            [
+                ("EX00001", "Examen 1", 5),
+                ("EX00002", "Examen 2", "9.50"),
+                ("EX00003", "Examen 3", 12),
+                ("EX99999", "No existe", 1),
+            ]
+        )
+        self.assertEqual(summary.counts, {"created": 1, "updated": 1, "unchanged": 1, "skipped": 0, "errors": 1})
+        self.assertEqual(
+            self.prices(),
+            {"EX00001": Decimal("5.00"), "EX00002": Decimal("9.50"), "EX00003": Decimal("12.00")},
+        )
+
+    def test_dry_run_previews_the_diff_without_writing(self):
+        rows = [("EX00001", "Examen 1", 5), ("EX00002", "Examen 2", 9), ("EX00003", "Examen 3", 12)]
+        summary = self.run_import(rows, dry_run=True)
+
+        self.assertEqual(summary.counts["created"], 1)
+        self.assertEqual(summary.counts["updated"], 1)
+        self.assertEqual(
+            summary.changes,
+            [
+                {"row": 3, "code": "EX00002", "name": "Examen 2", "old": "8.00", "new": "9.00"},
+                {"row": 4, "code": "EX00003", "name": "Examen 3", "old": None, "new": "12.00"},
+            ],
+        )
+        self.assertEqual(self.prices(), {"EX00001": Decimal("5.00"), "EX00002": Decimal("8.00")})
+
+        # La importación real da exactamente los mismos conteos y cambios
+        applied = self.run_import(rows)
+        self.assertEqual(applied.counts, summary.counts)
+        self.assertEqual(applied.changes, summary.changes)
+
+    def test_repeated_codes_keep_the_first_price(self):
+        summary = self.run_import(
+            [
+                ("EX00003", "Examen 3", 12),
+                ("EX00004", "Examen 4", 20),
+                ("EX00003", "Examen 3", 15),  # Otro bloque
+                ("EX00004", "Examen 4", 25),
+            ],
+            chunk_size=2,
+        )
+        self.assertEqual(summary.counts["created"], 2)
+        self.assertEqual(summary.counts["skipped"], 2)
+        self.assertEqual(self.prices()["EX00003"], Decimal("12.00"))
+        self.assertEqual(self.prices()["EX00004"], Decimal("20.00"))
+        self.assertEqual(self.price_list.items.count(), 4)
+
+    def test_code_of_a_rolled_back_chunk_is_loaded_later(self):
+        bulk_create = PriceListItem.objects.bulk_create
+        calls = []
+
+        def failing_first_chunk(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise DatabaseError("conexión perdida")
+            return bulk_create(*args, **kwargs)
+
+        with (
+            mock.patch.object(PriceListItem.objects, "bulk_create", side_effect=failing_first_chunk),
+            self.assertLogs("apps.imports.engine", "ERROR"),
+        ):
+            summary = self.run_import(
+                [
+                    ("EX00003", "Examen 3", 12),
+                    ("EX00004", "Examen 4", 20),
+                    ("EX00003", "Examen 3", 15),
+                ],
+                chunk_size=2,
+            )
+
+        # Las filas del bloque revertido quedan como error; la repetida del siguiente bloque sí se carga
+        self.assertEqual(summary.counts["errors"], 2)
+        self.assertEqual(summary.counts["skipped"], 0)
+        self.assertEqual(summary.counts["created"], 1)
+        self.assertEqual(self.prices()["EX00003"], Decimal("15.00"))
+        self.assertNotIn("EX00004", self.prices())
+
+
+class PricingServiceTests(PriceCacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.exams = [Exam.objects.create(code=f"EX{i:05d}", name=f"Examen {i}", price=10 * i) for i in range(1, 4)]
+        cls.coupon_list = PriceList.objects.create(name="Campaña")
+        cls.referral_list = PriceList.objects.create(name="Corporativo")
+        # Examen 1: cupón y referido; examen 2: solo referido; examen 3: precio base
+        PriceListItem.objects.create(price_list=cls.coupon_list, exam=cls.exams[0], price=Decimal("1.00"))
+        PriceListItem.objects.create(price_list=cls.referral_list, exam=cls.exams[0], price=Decimal("5.00"))
+        PriceListItem.objects.create(price_list=cls.referral_list, exam=cls.exams[1], price=Decimal("15.00"))
+        cls.coupon = Coupon.objects.create(code="promo", price_list=cls.coupon_list)
+        cls.referral = Referral.objects.create(
+            business_name="Clínica", document_number="20123456789", price_list=cls.referral_list
+        )
+        cls.exam_ids = [exam.id for exam in cls.exams]
+
+    def sources(self, quote):
+        return [(line["pricing"]["source"], line["pricing"]["price"]) for line in quote["lines"]]
+
+    def test_coupon_beats_referral_beats_base_price(self):
+        quote = PricingService.quote(self.exam_ids, self.referral.id, "PROMO")
+        self.assertEqual(self.sources(quote), [("coupon", "1.00"), ("price_list", "15.00"), ("base", "30.00")])
+        self.assertEqual(quote["total"], "46.00")
+        self.assertEqual(quote["coupon_code"], "PROMO")
+        self.assertEqual(quote["referral_id"], self.referral.id)
+        self.assertEqual(quote["lines"][0]["pricing"]["price_list_name"], "Campaña")
+
+        quote = PricingService.quote(self.exam_ids, self.referral.id)
+        self.assertEqual(self.sources(quote), [("price_list", "5.00"), ("price_list", "15.00"), ("base", "30.00")])
+
+        quote = PricingService.quote(self.exam_ids)
+        self.assertEqual(self.sources(quote), [("base", "10.00"), ("base", "20.00"), ("base", "30.00")])
+        self.assertIsNone(quote["coupon_code"])
+        self.assertIsNone(quote["referral_id"])
+
+    def test_invalid_coupon_and_inactive_referral_are_ignored(self):
+        expired = Coupon.objects.create(
+            code="vencido", price_list=self.coupon_list, expiration_date=timezone.localdate() - timedelta(days=1)
+        )
+        Coupon.objects.create(code="inactivo", price_list=self.coupon_list, is_active=False)
+        for code in (expired.code, "INACTIVO", "NOEXISTE"):
+            with self.subTest(code=code):
+                quote = PricingService.quote(self.exam_ids, self.referral.id, code)
+                self.assertIsNone(quote["coupon_code"])
+                self.assertEqual(quote["lines"][0]["pricing"]["source"], "price_list")
+
+        self.referral.is_active = False
+        self.referral.save()
+        quote = PricingService.quote(self.exam_ids, self.referral.id)
+        self.assertIsNone(quote["referral_id"])
+        self.assertEqual(self.sources(quote), [("base", "10.00"), ("base", "20.00"), ("base", "30.00")])
+
+    def test_repeated_exams_are_priced_once_per_line(self):
+        first, second, _ = self.exam_ids
+        quote = PricingService.quote([first, second, first], self.referral.id)
+        self.assertEqual([line["exam_id"] for line in quote["lines"]], [first, second, first])
+        self.assertEqual(quote["total"], "25.00")
+
+    def test_unknown_exam_raises(self):
+        with self.assertRaises(Exam.DoesNotExist):
+            PricingService.quote([self.exam_ids[0], 0])
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        # En frío: versión de precios, tarifarios, cupones, referidos y los precios de los dos tarifarios
+        # (el catálogo de exámenes ya está cargado)
+        PricingService.quote(self.exam_ids[:1])
+        price_cache._state.update(cache=None, checked_at=0.0)
+        with self.assertNumQueries(6):
+            PricingService.quote(self.exam_ids, self.referral.id, "PROMO")
+        # Con el caché cargado, ninguna consulta sin importar el largo del carrito
+        for exam_ids in (self.exam_ids[:1], self.exam_ids * 50):
+            with self.subTest(exams=len(exam_ids)), self.assertNumQueries(0):
+                PricingService.quote(exam_ids, self.referral.id, "PROMO")
+
+    def test_create_order_prices_lines_without_a_client_price(self):
+        patient = Patient.objects.create(
+            document_number="12345678",
+            first_name="José",
+            last_name="Núñez",
+            birthdate=date(1990, 1, 1),
+            sex="MALE",
+            phone_number="999999999",
+        )
+        first, second, third = self.exam_ids
+        details = resolve_exam_details(
+            [{"exam_id": first, "price": None}, {"exam_id": second, "price": ""}, {"exam_id": third, "price": "7.50"}],
+            referral=self.referral,
+        )
+        order = create_order(patient, details, referral=self.referral)
+
+        # Sin precio se usa el del tarifario; un precio enviado es un ajuste manual
+        self.assertEqual(
+            list(order.details.order_by("id").values_list("price", flat=True)),
+            [Decimal("5.00"), Decimal("15.00"), Decimal("7.50")],
+        )
+        self.assertEqual(order.total, Decimal("27.50"))
+
+
+class QuoteApiTests(PriceCacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("recepcion")
+        Company.objects.create(
+            business_name="Laboratorio",
+            document_number="20123456789",
+            phone_number="999999999",
+            email="lab@example.com",
+            legal_address="Lima",
+        )
+        cls.exam = Exam.objects.create(code="EX00001", name="Glucosa", price=10)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def quote(self, exam_ids):
+        return self.client.get(reverse("api_quote"), {"exam_ids": exam_ids})
+
+    def test_quotes_the_cart(self):
+        response = self.quote(f"{self.exam.id},{self.exam.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], "20.00")
+
+    def test_unknown_exam_is_404(self):
+        self.assertEqual(self.quote(f"{self.exam.id},0").status_code, 404)
+
+    def test_invalid_and_too_many_ids_are_rejected(self):
+        self.assertEqual(self.quote("").status_code, 400)
+        self.assertEqual(self.quote("1,a").status_code, 400)
+        self.assertEqual(self.quote(",".join([str(self.exam.id)] * QUOTE_MAX_EXAMS)).status_code, 200)
+        response = self.quote(",".join([str(self.exam.id)] * (QUOTE_MAX_EXAMS + 1)))
+        self.assertEqual(response.status_code, 400)
+
+
+class PriceCacheTests(PriceCacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.exam = Exam.objects.create(code="EX00001", name="Glucosa", price=10)
+        cls.price_list = PriceList.objects.create(name="Corporativo")
+        cls.item = PriceListItem.objects.create(price_list=cls.price_list, exam=cls.exam, price=Decimal("8.00"))
+
+    def assert_bumps(self, change):
+        """change() invalida el caché del proceso e incrementa la versión para los demás"""
+        cache = price_cache.get_price_cache()
+        version = price_cache.price_version()
+        change()
+        self.assertGreater(price_cache.price_version(), version)
+        self.assertIsNot(price_cache.get_price_cache(), cache)
+
+    def test_model_changes_bump_the_version(self):
+        other = PriceList.objects.create(name="Campaña")
+        changes = {
+            "PriceList.save": lambda: self.price_list.save(),
+            "PriceListItem.save": lambda: PriceListItem.objects.create(price_list=other, exam=self.exam, price=1),
+            "PriceListItem.delete": lambda: other.items.get().delete(),
+            "Coupon.save": lambda: Coupon.objects.create(code="promo", price_list=other),
+            "Coupon.delete": lambda: Coupon.objects.get(code="PROMO").delete(),
+            "Referral.save": lambda: Referral.objects.create(
+                business_name="Clínica", document_number="20123456789", price_list=other
+            ),
+            "Referral.delete": lambda: Referral.objects.get().delete(),
+            "PriceList.delete": lambda: other.delete(),
+        }
+        for name, change in changes.items():
+            with self.subTest(name):
+                self.assert_bumps(change)
+
+    def test_new_price_is_served_after_a_save(self):
+        self.assertEqual(price_cache.get_price_cache().prices(self.price_list.id), {self.exam.id: Decimal("8.00")})
+        self.item.price = Decimal("9.00")
+        self.item.save()
+        self.assertEqual(price_cache.get_price_cache().prices(self.price_list.id), {self.exam.id: Decimal("9.00")})
+
+    def test_bulk_upload_bumps_the_version_only_when_prices_change(self):
+        def upload(price):
+            importer = PriceListImporter({"price_list_id": self.price_list.id})
+            report = ErrorReport(importer.columns)
+            run_import(importer, workbook_file(importer.columns, [("EX00001", "Glucosa", price)]), report)
+            report.save()
+            report.close()
+
+        version = price_cache.price_version()
+        upload(8)
+        self.assertEqual(price_cache.price_version(), version)
+        self.assert_bumps(lambda: upload(12))
+        self.assertEqual(price_cache.get_price_cache().prices(self.price_list.id), {self.exam.id: Decimal("12.00")})
+
+    def test_change_in_another_worker_is_seen_after_the_check_interval(self):
+        cache = price_cache.get_price_cache()
+        cache.prices(self.price_list.id)
+        # Otro worker cambia el precio e incrementa la versión sin pasar por este proceso
+        PriceListItem.objects.filter(pk=self.item.pk).update(price=Decimal("9.00"))
+        next_value(price_cache.PRICE_VERSION_SCOPE)
+
+        with override_settings(PRICE_CACHE_CHECK_SECONDS=60):
+            self.assertIs(price_cache.get_price_cache(), cache)
+        with override_settings(PRICE_CACHE_CHECK_SECONDS=0):
+            reloaded = price_cache.get_price_cache()
+        self.assertIsNot(reloaded, cache)
+        self.assertEqual(reloaded.prices(self.price_list.id), {self.exam.id: Decimal("9.00")})
+        self.assertEqual(price_cache._metrics["reloads"], 2)
+
+    def test_coupon_expires_without_a_reload(self):
+        # Mismo "hoy" que PriceCache.coupon y PricingService.get_valid_coupon
+        today = timezone.now().date()
+        Coupon.objects.create(code="hoy", price_list=self.price_list, expiration_date=today)
+        cache = price_cache.get_price_cache()
+        self.assertEqual(cache.coupon("hoy"), ("HOY", self.price_list.id))
+
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch("apps.pricing.cache.timezone.now", return_value=tomorrow):
+            self.assertIs(price_cache.get_price_cache(), cache)
+            self.assertIsNone(cache.coupon("hoy"))
+        self.assertEqual(price_cache._metrics["reloads"], 1)
+
+    def test_stats(self):
+        Coupon.objects.create(code="promo", price_list=self.price_list)
+        Coupon.objects.create(code="inactivo", price_list=self.price_list, is_active=False)
+        Referral.objects.create(business_name="Clínica", document_number="20123456789", price_list=self.price_list)
+        price_cache._metrics.update(hits=0, misses=0, reloads=0)
+
+        cache = price_cache.get_price_cache()
+        for _ in range(3):
+            cache.prices(self.price_list.id)
+
+        stats = price_cache.stats()
+        self.assertEqual(stats["version"], price_cache.price_version())
+        self.assertEqual(
+            {key: stats[key] for key in ("hits", "misses", "hit_rate", "reloads")},
+            {"hits": 2, "misses": 1, "hit_rate": round(2 / 3, 4), "reloads": 1},
+        )
+        self.assertEqual(
+            {key: stats[key] for key in ("price_lists", "price_lists_loaded", "items_loaded", "coupons", "referrals")},
+            {"price_lists": 1, "price_lists_loaded": 1, "items_loaded": 1, "coupons": 1, "referrals": 1},
+        )
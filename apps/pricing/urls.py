@@ -25,5 +25,7 @@ urlpatterns = [
     path("referrals/<int:pk>/update/", views.ReferralUpdateView.as_view(), name="referral_update"),
     # API Endpoints
     path("api/exam-price/", views.get_exam_price_api, name="api_get_exam_price"),
+    path("api/quote/", views.quote_api, name="api_quote"),
+    path("api/cache-stats/", views.price_cache_stats_api, name="api_price_cache_stats"),
     path("api/validate-coupon/", views.validate_coupon_api, name="api_validate_coupon"),
 ]
@@ -11,12 +11,19 @@ from django.views.decorators.http import require_GET
 from django.views.generic import CreateView, ListView, UpdateView
 
 from apps.exams.models import Exam
+from apps.imports.models import ImportJob
+from apps.imports.services import enqueue_import, preview_import_job
+from apps.pricing import cache as price_cache
+from apps.pricing.exports import write_price_list_workbook
 from apps.pricing.models import Coupon, PriceList, PriceListItem
 from apps.pricing.services import PricingService
 from apps.referrals.models import Referral
 
 logger = logging.getLogger(__name__)
 
+# Máximo de exámenes por cotización (una orden real tiene a lo sumo decenas)
+QUOTE_MAX_EXAMS = 200
+
 
 # PriceList Views
 class PriceListListView(LoginRequiredMixin, ListView):
@@ -117,48 +124,13 @@ class PriceListDownloadView(LoginRequiredMixin, View):
     login_url = reverse_lazy("login")
 
     def get(self, request, pk):
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill
-
         price_list = get_object_or_404(PriceList, pk=pk)
 
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Tarifario"
-
-        # Headers
-        headers = ["Código", "Nombre del Examen", "Precio"]
-        ws.append(headers)
-
-        # Style headers
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-
-        # Get price list items for this specific price list
-        items = (
-            PriceListItem.objects.filter(price_list=price_list)
-            .select_related("exam")
-            .order_by("exam__code", "exam__name")
-        )
-
-        for item in items:
-            ws.append([item.exam.code or "", item.exam.name, float(item.price)])
-
-        # Adjust column widths
-        ws.column_dimensions["A"].width = 15
-        ws.column_dimensions["B"].width = 50
-        ws.column_dimensions["C"].width = 15
-
         # Create response
         response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
         response["Content-Disposition"] = f'attachment; filename="tarifario_{price_list.name}.xlsx"'
 
-        wb.save(response)
+        write_price_list_workbook(price_list, response)
         return response
 
 
@@ -242,58 +214,16 @@ class PriceListUploadView(LoginRequiredMixin, View):
             messages.error(request, "No se seleccionó ningún archivo")
             return redirect("price_list_list")
 
-        excel_file = request.FILES["file"]
-
-        try:
-            import openpyxl
-
-            wb = openpyxl.load_workbook(excel_file)
-            ws = wb.active
-
-            created_count = 0
-            updated_count = 0
-            error_count = 0
-
-            # Skip header row
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                code = row[0]
-                price = row[2]
-
-                if not code or not price:
-                    continue
-
-                try:
-                    # Find exam by code
-                    exam = Exam.objects.filter(code=code).first()
-
-                    if not exam:
-                        error_count += 1
-                        continue
-
-                    # Create or update price list item
-                    item, created = PriceListItem.objects.update_or_create(
-                        price_list=price_list, exam=exam, defaults={"price": price}
-                    )
-
-                    if created:
-                        created_count += 1
-                    else:
-                        updated_count += 1
-
-                except Exception:
-                    error_count += 1
-                    continue
-
-            messages.success(
-                request,
-                f"Tarifario cargado: {created_count} nuevos, {updated_count} actualizados, {error_count} errores",
-            )
-
-        except Exception as e:
-            logger.exception("Error al procesar el archivo de tarifario")
-            messages.error(request, f"Error al procesar el archivo: {str(e)}")
-
-        return redirect("price_list_list")
+        # Vista previa en el request (sin guardar); los precios se escriben al confirmar
+        job = enqueue_import(
+            ImportJob.Kind.PRICE_LIST,
+            request.FILES["file"],
+            request.user,
+            params={"price_list_id": price_list.pk},
+            preview=True,
+        )
+        preview_import_job(job)
+        return redirect("import_job_detail", pk=job.pk)
 
     def render_to_response(self, context):
         from django.shortcuts import render
@@ -471,6 +401,58 @@ def get_exam_price_api(request):
         return JsonResponse({"error": f"Error al obtener precio: {str(e)}"}, status=500)
 
 
+@login_required
+@require_GET
+def quote_api(request):
+    """
+    API endpoint para cotizar todos los exámenes de una orden en una sola llamada.
+
+    Query params:
+        - exam_ids: IDs de los exámenes separados por coma, en el orden de las filas
+          (requerido, máximo QUOTE_MAX_EXAMS)
+        - referral_id: ID del referido (opcional)
+        - coupon_code: Código del cupón (opcional)
+
+    Returns:
+        JSON con lines (exam_id, code, name y pricing como en exam-price), total,
+        coupon_code y referral_id aplicados
+    """
+    exam_ids = request.GET.get("exam_ids", "").strip()
+    referral_id = request.GET.get("referral_id")
+    coupon_code = request.GET.get("coupon_code", "").strip()
+
+    if not exam_ids:
+        return JsonResponse({"error": "exam_ids es requerido"}, status=400)
+
+    exam_ids = exam_ids.split(",")
+    if len(exam_ids) > QUOTE_MAX_EXAMS:
+        return JsonResponse({"error": f"Máximo {QUOTE_MAX_EXAMS} exámenes por cotización"}, status=400)
+
+    try:
+        exam_ids = [int(exam_id) for exam_id in exam_ids]
+        referral_id = int(referral_id) if referral_id else None
+    except ValueError:
+        return JsonResponse({"error": "IDs inválidos"}, status=400)
+
+    try:
+        return JsonResponse(PricingService.quote(exam_ids, referral_id, coupon_code or None))
+    except Exam.DoesNotExist as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except Exception as e:
+        logger.exception("Error al cotizar los exámenes")
+        return JsonResponse({"error": f"Error al cotizar: {str(e)}"}, status=500)
+
+
+@login_required
+@require_GET
+def price_cache_stats_api(request):
+    """
+    API endpoint con las métricas del caché de precios del worker que atiende el request
+    (tasa de aciertos, tarifarios cargados y tiempo máximo con precios desactualizados).
+    """
+    return JsonResponse(price_cache.stats())
+
+
 @login_required
 @require_GET
 def validate_coupon_api(request):
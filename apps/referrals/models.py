@@ -25,6 +25,19 @@ class Referral(TimeStampedModel):
     def __str__(self):
         return f"{self.business_name} - {self.document_number}"
 
+    def save(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        super().save(*args, **kwargs)
+        bump_price_version()
+
+    def delete(self, *args, **kwargs):
+        from apps.pricing.cache import bump_price_version
+
+        result = super().delete(*args, **kwargs)
+        bump_price_version()
+        return result
+
     def clean(self):
         """Validate document number length"""
         if len(self.document_number) != 11:
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from apps.results.models import Result
+from apps.results.state_machine import COUNTER_FIELDS
+
+FIELDS = [*COUNTER_FIELDS.values(), "total_count"]
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores por estado de Result desde los detalles y deriva el estado, o verifica que estén sincronizados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Solo reporta los resultados desincronizados, sin modificarlos",
+        )
+
+    def handle(self, *args, **options):
+        expressions = Result.counters_expressions()
+
+        if options["verify"]:
+            expected = {f"expected_{field}": expressions[field] for field in FIELDS}
+            mismatch = Q()
+            for field in FIELDS:
+                mismatch |= ~Q(**{field: F(f"expected_{field}")})
+            mismatched = (
+                Result.objects.annotate(**expected)
+                .filter(mismatch)
+                .values_list("id", "order__code", *FIELDS, *expected)
+            )
+            count = 0
+            for row in mismatched.iterator():
+                count += 1
+                result_id, order_code, values = row[0], row[1], row[2:]
+                current = "/".join(str(value) for value in values[: len(FIELDS)])
+                wanted = "/".join(str(value) for value in values[len(FIELDS) :])
+                self.stdout.write(f"Resultado {result_id} ({order_code}): {current} (esperado {wanted})")
+
+            if count:
+                self.stdout.write(self.style.ERROR(f"{count} resultados desincronizados"))
+            else:
+                self.stdout.write(self.style.SUCCESS("Todos los resultados están sincronizados"))
+            return
+
+        with transaction.atomic():
+            updated = Result.objects.update(**expressions)
+            # Segundo UPDATE: el estado se deriva de los contadores ya recalculados
+            Result.objects.update(status=Result.status_expression())
+        self.stdout.write(self.style.SUCCESS(f"{updated} resultados recalculados"))
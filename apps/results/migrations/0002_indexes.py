@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+from apps.core.db import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ("exams", "0003_indexes"),
+        ("orders", "0004_indexes"),
+        ("results", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="result",
+            index=models.Index(fields=["created_at", "id"], name="result_created_at_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="result",
+            index=models.Index(fields=["status", "created_at"], name="result_status_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="resultdetail",
+            index=models.Index(
+                condition=models.Q(("status", "delivered"), _negated=True),
+                fields=["exam", "status"],
+                name="resultdetail_open_exam_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Estados de detalle por contador (ver apps.results.state_machine)
+COUNTER_STATUSES = {
+    "pending_count": ["pending_sample"],
+    "in_progress_count": ["sample_received", "internal_analysis", "sent_external", "received_external"],
+    "done_count": ["completed", "validated"],
+    "delivered_count": ["delivered"],
+}
+
+
+def backfill_counters(apps, schema_editor):
+    Result = apps.get_model("results", "Result")
+    ResultDetail = apps.get_model("results", "ResultDetail")
+
+    details = ResultDetail.objects.filter(result=OuterRef("pk")).order_by().values("result")
+    expressions = {
+        "total_count": Coalesce(Subquery(details.annotate(count=Count("id")).values("count")), Value(0)),
+    }
+    for field, statuses in COUNTER_STATUSES.items():
+        category_count = Count("id", filter=Q(status__in=statuses))
+        expressions[field] = Coalesce(Subquery(details.annotate(count=category_count).values("count")), Value(0))
+    Result.objects.update(**expressions)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("results", "0002_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="result",
+            name="delivered_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Entregados"),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="done_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Completados"),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="in_progress_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="En Proceso"),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="pending_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Pendientes"),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="total_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Total de Exámenes"),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("exams", "0004_exam_provider"),
+        ("results", "0003_result_status_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResultDetailEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "from_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("pending_sample", "Pendiente de Muestra"),
+                            ("sample_received", "Muestra Recibida"),
+                            ("internal_analysis", "En Análisis Interno"),
+                            ("sent_external", "Enviado a Lab Externo"),
+                            ("received_external", "Recibido de Lab Externo"),
+                            ("completed", "Completado"),
+                            ("validated", "Validado"),
+                            ("delivered", "Entregado"),
+                        ],
+                        default="",
+                        max_length=30,
+                        verbose_name="Estado Anterior",
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        choices=[
+                            ("pending_sample", "Pendiente de Muestra"),
+                            ("sample_received", "Muestra Recibida"),
+                            ("internal_analysis", "En Análisis Interno"),
+                            ("sent_external", "Enviado a Lab Externo"),
+                            ("received_external", "Recibido de Lab Externo"),
+                            ("completed", "Completado"),
+                            ("validated", "Validado"),
+                            ("delivered", "Entregado"),
+                        ],
+                        max_length=30,
+                        verbose_name="Estado Nuevo",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="Fecha")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+                (
+                    "detail",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="results.resultdetail",
+                        verbose_name="Detalle de Resultado",
+                    ),
+                ),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="exams.exam",
+                        verbose_name="Examen",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento de Resultado",
+                "verbose_name_plural": "Eventos de Resultado",
+                "indexes": [
+                    models.Index(fields=["to_status", "created_at"], name="resultdetailevent_status_idx"),
+                    models.Index(fields=["detail", "created_at"], name="resultdetailevent_detail_idx"),
+                ],
+            },
+        ),
+    ]
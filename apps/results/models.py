@@ -1,4 +1,8 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from apps.core.models import TimeStampedModel
 
@@ -27,13 +31,74 @@ class Result(TimeStampedModel):
         verbose_name="Estado",
     )
 
+    # Desnormalizados: cantidad de detalles por categoría de estado (ver apps.results.state_machine).
+    # Se mantienen en cada transición; el estado general se deriva de ellos
+    pending_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Pendientes")
+    in_progress_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="En Proceso")
+    done_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Completados")
+    delivered_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Entregados")
+    total_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Total de Exámenes")
+
     class Meta:
         verbose_name = "Resultado"
         verbose_name_plural = "Resultados"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="result_created_at_id_idx"),
+            # Filtro por grupo de estado del listado de resultados
+            models.Index(fields=["status", "created_at"], name="result_status_created_idx"),
+        ]
 
     def __str__(self):
         return f"Resultado {self.order.code} - {self.get_status_display()}"
 
+    @property
+    def delivered_percent(self):
+        if not self.total_count:
+            return 0
+        return round(self.delivered_count * 100 / self.total_count)
+
+    def update_counters(self):
+        """Recalcula los contadores desde los detalles y deriva el estado (dos UPDATE)"""
+        Result.objects.filter(pk=self.pk).update(**Result.counters_expressions())
+        Result.objects.filter(pk=self.pk).update(status=Result.status_expression())
+        self.refresh_from_db(
+            fields=["pending_count", "in_progress_count", "done_count", "delivered_count", "total_count", "status"]
+        )
+
+    @staticmethod
+    def counters_expressions():
+        """
+        Expresiones para calcular los contadores en la base de datos.
+        Usadas por update_counters y el comando recalculate_result_counters.
+        """
+        from apps.results.state_machine import COUNTER_FIELDS, statuses_in
+
+        details = ResultDetail.objects.filter(result=OuterRef("pk")).order_by().values("result")
+        expressions = {
+            "total_count": Coalesce(Subquery(details.annotate(count=Count("id")).values("count")), Value(0)),
+        }
+        for category, field in COUNTER_FIELDS.items():
+            category_count = Count("id", filter=models.Q(status__in=statuses_in(category)))
+            expressions[field] = Coalesce(Subquery(details.annotate(count=category_count).values("count")), Value(0))
+        return expressions
+
+    @staticmethod
+    def status_expression():
+        """
+        Estado general derivado de los contadores, versión SQL de state_machine.aggregate_categories.
+        Sin detalles conserva el estado actual.
+        """
+        return models.Case(
+            models.When(total_count=0, then=models.F("status")),
+            models.When(delivered_count=models.F("total_count"), then=Value(Result.ResultStatus.DELIVERED)),
+            models.When(delivered_count__gt=0, then=Value(Result.ResultStatus.PARTIAL_DELIVERY)),
+            models.When(done_count=models.F("total_count"), then=Value(Result.ResultStatus.COMPLETED)),
+            models.When(done_count__gt=0, then=Value(Result.ResultStatus.PARTIAL_RESULTS)),
+            models.When(in_progress_count__gt=0, then=Value(Result.ResultStatus.IN_PROGRESS)),
+            default=Value(Result.ResultStatus.PENDING),
+            output_field=models.CharField(),
+        )
+
 
 class ResultDetail(TimeStampedModel):
     """Detalle de resultado por examen"""
@@ -77,82 +142,91 @@ class ResultDetail(TimeStampedModel):
         verbose_name = "Detalle de Resultado"
         verbose_name_plural = "Detalles de Resultado"
         unique_together = [["order_detail", "exam"]]
+        indexes = [
+            # Parcial: solo los detalles aún no entregados, que son los que se consultan por estado
+            models.Index(
+                fields=["exam", "status"],
+                condition=~models.Q(status="delivered"),
+                name="resultdetail_open_exam_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.exam.name} - {self.get_status_display()}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.result.update_counters()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.result.update_counters()
+        return result
+
     def get_allowed_transitions(self):
         """
-        Retorna las transiciones válidas desde el estado actual.
-        Permite saltar a cualquier estado posterior en el flujo.
+        Retorna las transiciones válidas desde el estado actual como [(valor, etiqueta)].
+        Ver apps.results.state_machine.
         """
-        # Orden de los estados en el flujo (índice determina si es "posterior")
-        STATUS_ORDER = [
-            self.ExamResultStatus.PENDING_SAMPLE,
-            self.ExamResultStatus.SAMPLE_RECEIVED,
-            self.ExamResultStatus.INTERNAL_ANALYSIS,  # Rama in-house
-            self.ExamResultStatus.SENT_EXTERNAL,  # Rama tercerizado
-            self.ExamResultStatus.RECEIVED_EXTERNAL,  # Rama tercerizado
-            self.ExamResultStatus.COMPLETED,
-            self.ExamResultStatus.VALIDATED,
-            self.ExamResultStatus.DELIVERED,
+        from apps.results.state_machine import allowed
+
+        return allowed(self.status)
+
+
+class ResultDetailEvent(models.Model):
+    """
+    Cambio de estado de un ResultDetail (tabla de solo inserción).
+
+    Lo escriben create_result_for_order (estado inicial) y apply_transitions, en la
+    misma transacción que el cambio. Es la base del reporte de tiempos de atención
+    (apps.results.reports).
+    """
+
+    detail = models.ForeignKey(
+        ResultDetail,
+        on_delete=models.CASCADE,
+        related_name="events",
+        db_index=False,  # Cubierto por resultdetailevent_detail_idx
+        verbose_name="Detalle de Resultado",
+    )
+    # Desnormalizado: el reporte agrupa por examen sin pasar por ResultDetail
+    exam = models.ForeignKey(
+        "exams.Exam",
+        on_delete=models.PROTECT,
+        related_name="+",
+        verbose_name="Examen",
+    )
+    from_status = models.CharField(
+        max_length=30,
+        choices=ResultDetail.ExamResultStatus.choices,
+        blank=True,
+        default="",
+        verbose_name="Estado Anterior",
+    )
+    to_status = models.CharField(
+        max_length=30,
+        choices=ResultDetail.ExamResultStatus.choices,
+        verbose_name="Estado Nuevo",
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Usuario",
+    )
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+
+    class Meta:
+        verbose_name = "Evento de Resultado"
+        verbose_name_plural = "Eventos de Resultado"
+        indexes = [
+            # Detalles que llegaron a un estado dentro de un rango de fechas
+            models.Index(fields=["to_status", "created_at"], name="resultdetailevent_status_idx"),
+            # Historial de un detalle
+            models.Index(fields=["detail", "created_at"], name="resultdetailevent_detail_idx"),
         ]
 
-        # Encontrar posición actual
-        try:
-            current_index = STATUS_ORDER.index(self.status)
-        except ValueError:
-            # Si el estado no está en la lista, solo permitir el actual
-            return [(self.status, self.ExamResultStatus(self.status).label)]
-
-        # Casos especiales según el estado actual
-        if self.status == self.ExamResultStatus.PENDING_SAMPLE:
-            # Desde PENDING_SAMPLE puede ir a cualquier estado posterior
-            allowed = STATUS_ORDER[current_index:]
-        elif self.status == self.ExamResultStatus.SAMPLE_RECEIVED:
-            # Puede elegir rama in-house o tercerizado, y cualquier estado posterior
-            allowed = [
-                self.ExamResultStatus.SAMPLE_RECEIVED,
-                self.ExamResultStatus.INTERNAL_ANALYSIS,
-                self.ExamResultStatus.SENT_EXTERNAL,
-                self.ExamResultStatus.COMPLETED,
-                self.ExamResultStatus.VALIDATED,
-                self.ExamResultStatus.DELIVERED,
-            ]
-        elif self.status == self.ExamResultStatus.INTERNAL_ANALYSIS:
-            # Rama in-house: puede saltar directamente a estados finales
-            allowed = [
-                self.ExamResultStatus.INTERNAL_ANALYSIS,
-                self.ExamResultStatus.COMPLETED,
-                self.ExamResultStatus.VALIDATED,
-                self.ExamResultStatus.DELIVERED,
-            ]
-        elif self.status == self.ExamResultStatus.SENT_EXTERNAL:
-            # Rama tercerizado: debe pasar por RECEIVED_EXTERNAL
-            allowed = [
-                self.ExamResultStatus.SENT_EXTERNAL,
-                self.ExamResultStatus.RECEIVED_EXTERNAL,
-                self.ExamResultStatus.COMPLETED,
-                self.ExamResultStatus.VALIDATED,
-                self.ExamResultStatus.DELIVERED,
-            ]
-        elif self.status == self.ExamResultStatus.RECEIVED_EXTERNAL:
-            # Después de recibir externo, cualquier estado final
-            allowed = [
-                self.ExamResultStatus.RECEIVED_EXTERNAL,
-                self.ExamResultStatus.COMPLETED,
-                self.ExamResultStatus.VALIDATED,
-                self.ExamResultStatus.DELIVERED,
-            ]
-        elif self.status in [
-            self.ExamResultStatus.COMPLETED,
-            self.ExamResultStatus.VALIDATED,
-            self.ExamResultStatus.DELIVERED,
-        ]:
-            # Estados finales: solo puede avanzar o mantener
-            allowed = STATUS_ORDER[current_index:]
-        else:
-            # Por defecto: estado actual y posteriores
-            allowed = STATUS_ORDER[current_index:]
-
-        return [(status, self.ExamResultStatus(status).label) for status in allowed]
+    def __str__(self):
+        return f"{self.detail_id}: {self.from_status or '-'} -> {self.to_status}"
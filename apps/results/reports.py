@@ -0,0 +1,144 @@
+"""
+Reporte de tiempos de atención (TAT) a partir de ResultDetailEvent
+
+El TAT de un detalle es el tiempo entre el primer evento en que llega al estado
+inicial (por defecto Muestra Recibida) y el primero en que llega al estado final
+(por defecto Completado). "Llegar" incluye saltar a un estado posterior del
+flujo, ej: pasar de Muestra Recibida directo a Validado cuenta como completado.
+
+Todo se calcula en la base de datos:
+    1. GROUP BY detalle: MIN(created_at) filtrado por estado da el inicio y el fin
+       (solo detalles cuyo fin cae en el rango de fechas).
+    2. CUME_DIST() OVER (PARTITION BY grupo ORDER BY tat) ordena los tiempos de
+       cada examen, categoría o proveedor.
+    3. GROUP BY grupo: el percentil p es el menor tat con CUME_DIST >= p.
+"""
+
+from datetime import timedelta
+
+from django.db import connection, models
+from django.db.models.functions import CumeDist
+
+from apps.results import state_machine
+from apps.results.models import ResultDetail, ResultDetailEvent
+
+DetailStatus = ResultDetail.ExamResultStatus
+
+# Dimensiones del reporte: (id, nombre) del grupo desde ResultDetailEvent
+TAT_GROUPINGS = {
+    "exam": ("exam_id", "exam__name"),
+    "category": ("exam__category_id", "exam__category__name"),
+    "provider": ("exam__provider_id", "exam__provider__name"),
+}
+
+TAT_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def turnaround_spans(
+    date_from, date_to, group_by="exam", start=DetailStatus.SAMPLE_RECEIVED, end=DetailStatus.COMPLETED
+):
+    """
+    QuerySet con una fila por detalle terminado en el rango: group_id, group_name,
+    started, finished, tat (duración) y cume (CUME_DIST dentro del grupo).
+
+    Args:
+        date_from: Inicio del rango (incluido), sobre la fecha de fin
+        date_to: Fin del rango (excluido)
+        group_by: "exam", "category" o "provider"
+        start: Estado desde el que se mide
+        end: Estado hasta el que se mide
+    """
+    id_field, name_field = TAT_GROUPINGS[group_by]
+    start_statuses = state_machine.statuses_from(start)
+    end_statuses = state_machine.statuses_from(end)
+
+    # Detalles que llegaron al estado final dentro del rango (índice (to_status, created_at))
+    finished_in_range = ResultDetailEvent.objects.filter(
+        to_status__in=end_statuses, created_at__gte=date_from, created_at__lt=date_to
+    ).values("detail_id")
+
+    return (
+        ResultDetailEvent.objects.filter(detail_id__in=finished_in_range)
+        .annotate(group_id=models.F(id_field), group_name=models.F(name_field))
+        .values("detail_id", "group_id", "group_name")
+        .annotate(
+            started=models.Min("created_at", filter=models.Q(to_status__in=start_statuses)),
+            finished=models.Min("created_at", filter=models.Q(to_status__in=end_statuses)),
+        )
+        # El primer fin debe caer en el rango; sin evento de inicio no hay TAT
+        .filter(started__isnull=False, finished__gte=date_from, finished__lt=date_to)
+        .annotate(
+            tat=models.ExpressionWrapper(
+                models.F("finished") - models.F("started"), output_field=models.DurationField()
+            )
+        )
+        .annotate(cume=models.Window(CumeDist(), partition_by=[models.F("group_id")], order_by=models.F("tat").asc()))
+        .order_by()
+    )
+
+
+def turnaround_report(
+    date_from,
+    date_to,
+    group_by="exam",
+    start=DetailStatus.SAMPLE_RECEIVED,
+    end=DetailStatus.COMPLETED,
+    percentiles=TAT_PERCENTILES,
+):
+    """
+    Percentiles de TAT por grupo en una sola consulta.
+
+    Args:
+        Los de turnaround_spans, más percentiles: fracciones a calcular (ej: 0.5, 0.9)
+
+    Returns:
+        list[dict]: {group_id, group_name, count, percentiles: {p: timedelta}, max}
+        ordenados por nombre del grupo
+    """
+    spans_sql, spans_params = turnaround_spans(date_from, date_to, group_by, start, end).query.sql_with_params()
+
+    percentile_columns = ", ".join("MIN(CASE WHEN spans.cume >= %s THEN spans.tat END)" for _ in percentiles)
+    sql = (
+        f"SELECT spans.group_id, spans.group_name, COUNT(*), {percentile_columns}, MAX(spans.tat) "
+        f"FROM ({spans_sql}) spans "
+        "GROUP BY spans.group_id, spans.group_name "
+        "ORDER BY spans.group_name"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*percentiles, *spans_params])
+        rows = cursor.fetchall()
+
+    report = []
+    for group_id, group_name, count, *durations in rows:
+        durations = [_to_timedelta(value) for value in durations]
+        report.append(
+            {
+                "group_id": group_id,
+                "group_name": group_name,
+                "count": count,
+                "percentiles": dict(zip(percentiles, durations[:-1], strict=True)),
+                "max": durations[-1],
+            }
+        )
+    return report
+
+
+def _to_timedelta(value):
+    # Sin tipo intervalo nativo (SQLite) la resta de fechas de Django devuelve microsegundos
+    if value is None or isinstance(value, timedelta):
+        return value
+    return timedelta(microseconds=int(value))
+
+
+def format_duration(value):
+    """Duración legible para el reporte (ej: "2 d 4 h", "3 h 20 min", "45 min")"""
+    if value is None:
+        return "-"
+    minutes = int(value.total_seconds() // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days} d {hours} h"
+    if hours:
+        return f"{hours} h {minutes} min"
+    return f"{minutes} min"
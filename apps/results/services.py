@@ -2,7 +2,14 @@
 Services para manejo de resultados de laboratorio
 """
 
-from apps.results.models import Result, ResultDetail
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from apps.exams.closure import panel_leaves
+from apps.results import state_machine
+from apps.results.models import Result, ResultDetail, ResultDetailEvent
 
 
 def create_result_for_order(order):
@@ -11,7 +18,18 @@ def create_result_for_order(order):
 
     Para cada OrderDetail:
     - Si el exam NO tiene componentes: crea 1 ResultDetail para ese exam
-    - Si el exam SÍ tiene componentes (panel): crea 1 ResultDetail por cada componente
+    - Si el exam SÍ tiene componentes (panel): crea 1 ResultDetail por cada examen final
+      del panel, expandiendo los paneles anidados a cualquier nivel
+
+    La cantidad de consultas no depende de cuántos exámenes o componentes tenga la
+    orden: SELECT de los detalles (con has_components de cada examen), expansión de
+    todos los paneles desde la clausura (apps.exams.closure.panel_leaves), INSERT
+    del resultado (con sus contadores ya calculados), INSERT en bloque de los
+    ResultDetails e INSERT en bloque de sus eventos de estado inicial.
+
+    La composición se lee de la base de datos y no del catálogo en memoria: un
+    panel creado o modificado en otro worker se expande con sus componentes
+    actuales aunque ese catálogo todavía no se haya recargado.
 
     Args:
         order: Instancia de Order
@@ -19,29 +37,233 @@ def create_result_for_order(order):
     Returns:
         Result: El resultado creado
     """
-    # Crear el resultado principal
-    result = Result.objects.create(order=order)
+    order_details = list(order.details.order_by("id").values_list("id", "exam_id", "exam__has_components"))
 
-    # Iterar sobre cada detalle de la orden
-    for order_detail in order.details.select_related("exam").prefetch_related("exam__components"):
-        exam = order_detail.exam
+    # Exámenes finales de los paneles de la orden
+    leaves_by_panel = panel_leaves({exam_id for _, exam_id, has_components in order_details if has_components})
 
-        if exam.has_components:
-            # Panel: crear ResultDetail por cada componente
-            components = exam.component_items.select_related("component_exam").order_by("order")
-
-            for component_item in components:
-                ResultDetail.objects.create(
-                    result=result,
-                    order_detail=order_detail,
-                    exam=component_item.component_exam,
-                )
+    pairs = []
+    for order_detail_id, exam_id, _has_components in order_details:
+        if exam_id in leaves_by_panel:
+            # Panel: un ResultDetail por cada examen final
+            exam_ids = leaves_by_panel[exam_id]
         else:
-            # Examen simple: crear 1 ResultDetail
-            ResultDetail.objects.create(
-                result=result,
-                order_detail=order_detail,
-                exam=exam,
-            )
+            # Examen simple: un ResultDetail
+            exam_ids = [exam_id]
+        pairs.extend((order_detail_id, component_id) for component_id in exam_ids)
+
+    # Crear el resultado principal; todos los detalles nacen pendientes de muestra
+    result = Result.objects.create(order=order, pending_count=len(pairs), total_count=len(pairs))
+
+    # bulk_create no llama a ResultDetail.save(), los contadores ya se calcularon arriba
+    details = ResultDetail.objects.bulk_create(
+        [
+            ResultDetail(result=result, order_detail_id=order_detail_id, exam_id=exam_id)
+            for order_detail_id, exam_id in pairs
+        ]
+    )
+    now = timezone.now()
+    ResultDetailEvent.objects.bulk_create(
+        [
+            ResultDetailEvent(detail=detail, exam_id=detail.exam_id, to_status=detail.status, created_at=now)
+            for detail in details
+        ]
+    )
 
     return result
+
+
+class TransitionOutcome:
+    """Resultado de aplicar un lote de transiciones"""
+
+    def __init__(self):
+        self.applied = 0
+        self.rejected = []  # [(detail_id, estado actual, estado pedido)]
+        self.result_ids = set()
+
+
+def apply_transitions(changes, scope=None, user=None):
+    """
+    Aplica un lote de cambios de estado de ResultDetail en un número fijo de consultas.
+
+    Las transiciones se validan en memoria; las válidas se escriben con un único
+    UPDATE (CASE por id) y se registran en ResultDetailEvent con un INSERT en
+    bloque. Los contadores de los resultados afectados se ajustan
+    con incrementos F() en otro UPDATE y su estado se deriva de los contadores
+    en un tercero, sin volver a leer los detalles. Todo ocurre en una
+    transacción con los detalles bloqueados (select_for_update), por lo que la
+    validación y los contadores no quedan obsoletos frente a otra edición
+    concurrente.
+
+    Args:
+        changes: dict {detail_id: nuevo estado o state_machine.ADVANCE}; ADVANCE se
+            resuelve con el siguiente estado del flujo según el estado actual
+        scope: QuerySet de ResultDetail que limita los detalles modificables
+            (ej: los de un resultado); por defecto todos
+        user: Usuario que hace el cambio, se guarda en los eventos
+
+    Returns:
+        TransitionOutcome
+    """
+    outcome = TransitionOutcome()
+    if not changes:
+        return outcome
+
+    queryset = scope if scope is not None else ResultDetail.objects.all()
+
+    with transaction.atomic():
+        current = (
+            queryset.filter(id__in=changes).select_for_update().values_list("id", "status", "result_id", "exam_id")
+        )
+
+        new_status_by_id = {}
+        events = []
+        counter_deltas = defaultdict(Counter)  # {result_id: {campo contador: delta}}
+        for detail_id, status, result_id, exam_id in current:
+            new_status = changes[detail_id]
+            if new_status == state_machine.ADVANCE:
+                new_status = state_machine.next_status(status)
+                if new_status is None:
+                    outcome.rejected.append((detail_id, status, state_machine.ADVANCE))
+                    continue
+            if new_status == status:
+                continue
+            if not state_machine.can_transition(status, new_status):
+                outcome.rejected.append((detail_id, status, new_status))
+                continue
+            new_status_by_id[detail_id] = new_status
+            outcome.result_ids.add(result_id)
+            events.append((detail_id, exam_id, status, new_status))
+
+            old_category = state_machine.categorize(status)
+            new_category = state_machine.categorize(new_status)
+            if old_category != new_category:
+                counter_deltas[result_id][state_machine.COUNTER_FIELDS[old_category]] -= 1
+                counter_deltas[result_id][state_machine.COUNTER_FIELDS[new_category]] += 1
+
+        if new_status_by_id:
+            now = timezone.now()
+            ResultDetail.objects.filter(id__in=new_status_by_id).update(
+                status=models.Case(
+                    *[
+                        models.When(id=detail_id, then=models.Value(new_status))
+                        for detail_id, new_status in new_status_by_id.items()
+                    ],
+                    output_field=models.CharField(),
+                ),
+                updated_at=now,
+            )
+            ResultDetailEvent.objects.bulk_create(
+                [
+                    ResultDetailEvent(
+                        detail_id=detail_id,
+                        exam_id=exam_id,
+                        from_status=from_status,
+                        to_status=to_status,
+                        created_by=user,
+                        created_at=now,
+                    )
+                    for detail_id, exam_id, from_status, to_status in events
+                ]
+            )
+            outcome.applied = len(new_status_by_id)
+            _apply_counter_deltas(counter_deltas)
+
+    return outcome
+
+
+def _apply_counter_deltas(counter_deltas):
+    """Ajusta los contadores de varios resultados en un UPDATE y deriva su estado en otro"""
+    now = timezone.now()
+    changed = {result_id: deltas for result_id, deltas in counter_deltas.items() if any(deltas.values())}
+    if changed:
+        fields = {field for deltas in changed.values() for field, delta in deltas.items() if delta}
+        Result.objects.filter(id__in=changed).update(
+            updated_at=now,
+            **{
+                field: models.F(field)
+                + models.Case(
+                    *[
+                        models.When(id=result_id, then=models.Value(deltas[field]))
+                        for result_id, deltas in changed.items()
+                        if deltas[field]
+                    ],
+                    default=models.Value(0),
+                    output_field=models.IntegerField(),
+                )
+                for field in fields
+            },
+        )
+        Result.objects.filter(id__in=changed).update(status=Result.status_expression(), updated_at=now)
+
+
+# Agrupaciones de la mesa de trabajo: columnas (id, código, nombre) del grupo
+WORKLIST_GROUPINGS = {
+    "exam": ("exam_id", "exam__code", "exam__name"),
+    "category": ("exam__category_id", "exam__category__code", "exam__category__name"),
+}
+
+# Máximo de detalles que se muestran (y se pueden seleccionar) de un grupo a la vez
+WORKLIST_LIMIT = 500
+
+
+def worklist_queryset(statuses=None):
+    """
+    ResultDetails abiertos (no entregados) de todas las órdenes.
+
+    La exclusión de los entregados coincide con la condición del índice parcial
+    resultdetail_open_exam_idx (exam, status), por lo que filtrar por examen y
+    estado no recorre el histórico de detalles entregados.
+
+    Args:
+        statuses: Estados de detalle a incluir; por defecto todos los no entregados
+    """
+    queryset = ResultDetail.objects.exclude(status=ResultDetail.ExamResultStatus.DELIVERED)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+def worklist_groups(queryset, group_by="exam"):
+    """
+    Resumen de la mesa de trabajo en una consulta (GROUP BY examen o categoría).
+
+    Args:
+        queryset: QuerySet de worklist_queryset
+        group_by: "exam" o "category"
+
+    Returns:
+        list[dict]: {id, code, name, count, oldest} ordenados por nombre
+    """
+    id_field, code_field, name_field = WORKLIST_GROUPINGS[group_by]
+    rows = (
+        queryset.order_by()
+        .values(id_field, code_field, name_field)
+        .annotate(count=models.Count("id"), oldest=models.Min("created_at"))
+        .order_by(name_field)
+    )
+    return [
+        {
+            "id": row[id_field],
+            "code": row[code_field],
+            "name": row[name_field],
+            "count": row["count"],
+            "oldest": row["oldest"],
+        }
+        for row in rows
+    ]
+
+
+def worklist_details(queryset, group_by, group_id, limit=WORKLIST_LIMIT):
+    """
+    Detalles de un grupo de la mesa de trabajo, del más antiguo al más reciente.
+
+    Returns:
+        list[ResultDetail]: Con examen, resultado, orden y paciente precargados
+    """
+    id_field = WORKLIST_GROUPINGS[group_by][0]
+    return list(
+        queryset.filter(**{id_field: group_id})
+        .select_related("exam", "result__order__patient")
+        .order_by("created_at", "id")[:limit]
+    )
@@ -0,0 +1,196 @@
+"""
+Máquina de estados de los resultados
+
+Fuente única de las reglas de estado: qué transiciones puede hacer un
+ResultDetail y qué estado general le corresponde a un Result según sus
+detalles. Las tablas se calculan una vez al importar el módulo, por lo que
+todas las consultas son búsquedas en diccionarios.
+
+La usan la vista de detalle (formulario de estados), el motor de transiciones
+en lote de apps.results.services y los comandos de reparación.
+"""
+
+from apps.results.models import Result, ResultDetail
+
+DetailStatus = ResultDetail.ExamResultStatus
+ResultStatus = Result.ResultStatus
+
+# Orden de los estados en el flujo (índice determina si es "posterior")
+STATUS_ORDER = (
+    DetailStatus.PENDING_SAMPLE,
+    DetailStatus.SAMPLE_RECEIVED,
+    DetailStatus.INTERNAL_ANALYSIS,  # Rama in-house
+    DetailStatus.SENT_EXTERNAL,  # Rama tercerizado
+    DetailStatus.RECEIVED_EXTERNAL,  # Rama tercerizado
+    DetailStatus.COMPLETED,
+    DetailStatus.VALIDATED,
+    DetailStatus.DELIVERED,
+)
+
+# Destinos permitidos cuando difieren de "el estado actual y todos los posteriores"
+_BRANCH_TRANSITIONS = {
+    # Puede elegir rama in-house o tercerizado, y cualquier estado posterior
+    DetailStatus.SAMPLE_RECEIVED: (
+        DetailStatus.SAMPLE_RECEIVED,
+        DetailStatus.INTERNAL_ANALYSIS,
+        DetailStatus.SENT_EXTERNAL,
+        DetailStatus.COMPLETED,
+        DetailStatus.VALIDATED,
+        DetailStatus.DELIVERED,
+    ),
+    # Rama in-house: puede saltar directamente a estados finales
+    DetailStatus.INTERNAL_ANALYSIS: (
+        DetailStatus.INTERNAL_ANALYSIS,
+        DetailStatus.COMPLETED,
+        DetailStatus.VALIDATED,
+        DetailStatus.DELIVERED,
+    ),
+    # Después de recibir externo, cualquier estado final
+    DetailStatus.RECEIVED_EXTERNAL: (
+        DetailStatus.RECEIVED_EXTERNAL,
+        DetailStatus.COMPLETED,
+        DetailStatus.VALIDATED,
+        DetailStatus.DELIVERED,
+    ),
+}
+
+# Siguiente paso del flujo habitual, usado por la mesa de trabajo para avanzar en lote.
+# Desde SAMPLE_RECEIVED se asume la rama in-house; el envío a terceros se elige explícitamente
+_NEXT_STATUS = {
+    DetailStatus.PENDING_SAMPLE: DetailStatus.SAMPLE_RECEIVED,
+    DetailStatus.SAMPLE_RECEIVED: DetailStatus.INTERNAL_ANALYSIS,
+    DetailStatus.INTERNAL_ANALYSIS: DetailStatus.COMPLETED,
+    DetailStatus.SENT_EXTERNAL: DetailStatus.RECEIVED_EXTERNAL,
+    DetailStatus.RECEIVED_EXTERNAL: DetailStatus.COMPLETED,
+    DetailStatus.COMPLETED: DetailStatus.VALIDATED,
+    DetailStatus.VALIDATED: DetailStatus.DELIVERED,
+}
+
+# Valor de cambio que apply_transitions resuelve con next_status del estado actual de cada detalle
+ADVANCE = "next"
+
+# Categorías de los detalles para derivar el estado del resultado
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+DELIVERED = "delivered"
+
+CATEGORY_BY_STATUS = {
+    DetailStatus.PENDING_SAMPLE: PENDING,
+    DetailStatus.SAMPLE_RECEIVED: IN_PROGRESS,
+    DetailStatus.INTERNAL_ANALYSIS: IN_PROGRESS,
+    DetailStatus.SENT_EXTERNAL: IN_PROGRESS,
+    DetailStatus.RECEIVED_EXTERNAL: IN_PROGRESS,
+    DetailStatus.COMPLETED: DONE,
+    DetailStatus.VALIDATED: DONE,
+    DetailStatus.DELIVERED: DELIVERED,
+}
+
+_CATEGORY_BITS = {PENDING: 1, IN_PROGRESS: 2, DONE: 4, DELIVERED: 8}
+
+# Contador de Result que lleva la cantidad de detalles de cada categoría
+COUNTER_FIELDS = {
+    PENDING: "pending_count",
+    IN_PROGRESS: "in_progress_count",
+    DONE: "done_count",
+    DELIVERED: "delivered_count",
+}
+
+
+def _build_transitions():
+    labels = dict(DetailStatus.choices)
+    transitions = {}
+    for index, status in enumerate(STATUS_ORDER):
+        targets = _BRANCH_TRANSITIONS.get(status, STATUS_ORDER[index:])
+        transitions[status] = tuple((target.value, labels[target]) for target in targets)
+    return transitions
+
+
+def _result_status_for_mask(mask):
+    """Estado del resultado según qué categorías tienen al menos un detalle (de más a menos avanzado)"""
+    if mask == 0:
+        return None
+    if mask == _CATEGORY_BITS[DELIVERED]:
+        return ResultStatus.DELIVERED
+    if mask & _CATEGORY_BITS[DELIVERED]:
+        return ResultStatus.PARTIAL_DELIVERY
+    if mask == _CATEGORY_BITS[DONE]:
+        return ResultStatus.COMPLETED
+    if mask & _CATEGORY_BITS[DONE]:
+        return ResultStatus.PARTIAL_RESULTS
+    if mask & _CATEGORY_BITS[IN_PROGRESS]:
+        return ResultStatus.IN_PROGRESS
+    return ResultStatus.PENDING
+
+
+# Tablas precalculadas
+TRANSITIONS = _build_transitions()
+_ALLOWED_SETS = {status: frozenset(value for value, _ in targets) for status, targets in TRANSITIONS.items()}
+_AGGREGATE_TABLE = tuple(_result_status_for_mask(mask) for mask in range(16))
+
+
+def allowed(status):
+    """
+    Transiciones válidas desde status como [(valor, etiqueta)], incluido el mismo status.
+    Un estado desconocido solo puede mantenerse.
+    """
+    targets = TRANSITIONS.get(status)
+    if targets is None:
+        return ((status, status),)
+    return targets
+
+
+def can_transition(from_status, to_status):
+    return to_status in _ALLOWED_SETS.get(from_status, (from_status,))
+
+
+def next_status(status):
+    """Siguiente estado del flujo habitual, o None si el detalle ya está entregado"""
+    return _NEXT_STATUS.get(status)
+
+
+def statuses_from(status):
+    """Estados desde status en adelante en el flujo (ej: "llegó a COMPLETED" incluye VALIDATED y DELIVERED)"""
+    return list(STATUS_ORDER[STATUS_ORDER.index(status) :])
+
+
+def categorize(status):
+    """Categoría (PENDING, IN_PROGRESS, DONE, DELIVERED) de un estado de detalle"""
+    return CATEGORY_BY_STATUS[status]
+
+
+def statuses_in(category):
+    """Estados de detalle que pertenecen a la categoría"""
+    return [status for status, status_category in CATEGORY_BY_STATUS.items() if status_category == category]
+
+
+def aggregate(status_counts):
+    """
+    Estado general de un resultado a partir de la cantidad de detalles por estado.
+
+    Args:
+        status_counts: dict {estado de detalle: cantidad}
+
+    Returns:
+        Valor de Result.ResultStatus, o None si no hay detalles (el resultado conserva su estado)
+    """
+    mask = 0
+    for status, count in status_counts.items():
+        if count:
+            mask |= _CATEGORY_BITS[CATEGORY_BY_STATUS[status]]
+    return _AGGREGATE_TABLE[mask]
+
+
+def aggregate_categories(category_counts):
+    """
+    Igual que aggregate, a partir de la cantidad de detalles por categoría
+    (ej: los contadores de Result).
+
+    Args:
+        category_counts: dict {categoría: cantidad}
+    """
+    mask = 0
+    for category, count in category_counts.items():
+        if count:
+            mask |= _CATEGORY_BITS[category]
+    return _AGGREGATE_TABLE[mask]
@@ -0,0 +1,417 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+from io import StringIO
+from itertools import combinations_with_replacement
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.billing.models import Company
+from apps.exams.models import Exam, Provider
+from apps.orders.services import create_order, resolve_exam_details
+from apps.patients.models import Patient
+from apps.results import state_machine
+from apps.results.models import Result, ResultDetail, ResultDetailEvent
+from apps.results.reports import turnaround_report
+from apps.results.services import apply_transitions, create_result_for_order
+
+DetailStatus = ResultDetail.ExamResultStatus
+ResultStatus = Result.ResultStatus
+
+FLOW = list(state_machine.STATUS_ORDER)
+FINAL = [DetailStatus.COMPLETED, DetailStatus.VALIDATED, DetailStatus.DELIVERED]
+IN_PROCESS = [
+    DetailStatus.SAMPLE_RECEIVED,
+    DetailStatus.INTERNAL_ANALYSIS,
+    DetailStatus.SENT_EXTERNAL,
+    DetailStatus.RECEIVED_EXTERNAL,
+]
+
+# Reglas de negocio escritas de forma explícita, independiente de las tablas del módulo
+EXPECTED_TRANSITIONS = {
+    DetailStatus.PENDING_SAMPLE: FLOW,
+    DetailStatus.SAMPLE_RECEIVED: [
+        DetailStatus.SAMPLE_RECEIVED,
+        DetailStatus.INTERNAL_ANALYSIS,
+        DetailStatus.SENT_EXTERNAL,
+        *FINAL,
+    ],
+    DetailStatus.INTERNAL_ANALYSIS: [DetailStatus.INTERNAL_ANALYSIS, *FINAL],
+    DetailStatus.SENT_EXTERNAL: [DetailStatus.SENT_EXTERNAL, DetailStatus.RECEIVED_EXTERNAL, *FINAL],
+    DetailStatus.RECEIVED_EXTERNAL: [DetailStatus.RECEIVED_EXTERNAL, *FINAL],
+    DetailStatus.COMPLETED: FINAL,
+    DetailStatus.VALIDATED: FINAL[1:],
+    DetailStatus.DELIVERED: FINAL[2:],
+}
+
+
+def expected_result_status(statuses):
+    """Estado del resultado según las prioridades de más a menos avanzado"""
+    if not statuses:
+        return None
+    if all(status == DetailStatus.DELIVERED for status in statuses):
+        return ResultStatus.DELIVERED
+    if DetailStatus.DELIVERED in statuses:
+        return ResultStatus.PARTIAL_DELIVERY
+    done = [DetailStatus.COMPLETED, DetailStatus.VALIDATED]
+    if all(status in done for status in statuses):
+        return ResultStatus.COMPLETED
+    if any(status in done for status in statuses):
+        return ResultStatus.PARTIAL_RESULTS
+    if any(status in IN_PROCESS for status in statuses):
+        return ResultStatus.IN_PROGRESS
+    return ResultStatus.PENDING
+
+
+class TransitionTests(SimpleTestCase):
+    def test_allowed_matches_the_business_rules(self):
+        self.assertEqual(set(EXPECTED_TRANSITIONS), set(DetailStatus))
+        for status, expected in EXPECTED_TRANSITIONS.items():
+            with self.subTest(status=status):
+                self.assertEqual([value for value, _ in state_machine.allowed(status)], expected)
+
+    def test_can_transition_for_every_pair(self):
+        for from_status in DetailStatus:
+            for to_status in DetailStatus:
+                with self.subTest(from_status=from_status, to_status=to_status):
+                    self.assertEqual(
+                        state_machine.can_transition(from_status, to_status),
+                        to_status in EXPECTED_TRANSITIONS[from_status],
+                    )
+
+    def test_transitions_never_go_back_and_always_allow_staying(self):
+        for from_status in DetailStatus:
+            for to_status, _ in state_machine.allowed(from_status):
+                with self.subTest(from_status=from_status, to_status=to_status):
+                    self.assertGreaterEqual(FLOW.index(to_status), FLOW.index(from_status))
+            self.assertTrue(state_machine.can_transition(from_status, from_status))
+
+    def test_unknown_status_can_only_stay(self):
+        self.assertEqual(state_machine.allowed("unknown"), (("unknown", "unknown"),))
+        self.assertTrue(state_machine.can_transition("unknown", "unknown"))
+        for status in DetailStatus:
+            self.assertFalse(state_machine.can_transition("unknown", status))
+
+    def test_next_status_is_allowed_and_reaches_delivered(self):
+        status = DetailStatus.PENDING_SAMPLE
+        path = [status]
+        while (following := state_machine.next_status(status)) is not None:
+            self.assertTrue(state_machine.can_transition(status, following))
+            self.assertNotIn(following, path)
+            status = following
+            path.append(status)
+        self.assertEqual(status, DetailStatus.DELIVERED)
+
+        for status in DetailStatus:
+            following = state_machine.next_status(status)
+            if following is not None:
+                with self.subTest(status=status):
+                    self.assertTrue(state_machine.can_transition(status, following))
+
+    def test_statuses_from_follows_the_flow(self):
+        for index, status in enumerate(FLOW):
+            self.assertEqual(state_machine.statuses_from(status), FLOW[index:])
+
+
+class AggregateTests(SimpleTestCase):
+    def test_aggregate_for_every_combination_of_up_to_five_details(self):
+        self.assertIsNone(state_machine.aggregate({}))
+        self.assertIsNone(state_machine.aggregate_categories({}))
+        for size in range(1, 6):
+            for statuses in combinations_with_replacement(list(DetailStatus), size):
+                expected = expected_result_status(statuses)
+                with self.subTest(statuses=statuses):
+                    self.assertEqual(state_machine.aggregate(Counter(statuses)), expected)
+                    categories = Counter(state_machine.categorize(status) for status in statuses)
+                    self.assertEqual(state_machine.aggregate_categories(categories), expected)
+
+    def test_zero_counts_are_ignored(self):
+        counts = {status: 0 for status in DetailStatus}
+        self.assertIsNone(state_machine.aggregate(counts))
+        counts[DetailStatus.VALIDATED] = 2
+        self.assertEqual(state_machine.aggregate(counts), ResultStatus.COMPLETED)
+
+    def test_categories_cover_every_status(self):
+        categorized = [
+            status for category in state_machine.COUNTER_FIELDS for status in state_machine.statuses_in(category)
+        ]
+        self.assertCountEqual(categorized, list(DetailStatus))
+
+
+def create_patient():
+    return Patient.objects.create(
+        document_number="12345678",
+        first_name="José",
+        last_name="Núñez",
+        birthdate=date(1990, 1, 1),
+        sex="MALE",
+        phone_number="999999999",
+    )
+
+
+def create_result(patient, exams):
+    order = create_order(patient, resolve_exam_details([{"exam_id": exam.id} for exam in exams]))
+    return create_result_for_order(order)
+
+
+class TransitionEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bioquimico")
+        cls.exams = [Exam.objects.create(code=f"EX{i:05d}", name=f"Examen {i}", price=10) for i in range(1, 4)]
+        cls.result = create_result(create_patient(), cls.exams)
+
+    def test_result_creation_logs_the_initial_status(self):
+        events = ResultDetailEvent.objects.filter(detail__result=self.result)
+        self.assertEqual(
+            sorted(events.values_list("exam_id", "from_status", "to_status")),
+            [(exam.id, "", DetailStatus.PENDING_SAMPLE) for exam in self.exams],
+        )
+
+    def test_apply_transitions_logs_one_event_per_applied_change(self):
+        first, second, third = self.result.details.order_by("id")
+        ResultDetailEvent.objects.all().delete()
+
+        outcome = apply_transitions(
+            {
+                first.id: DetailStatus.SAMPLE_RECEIVED,
+                second.id: state_machine.ADVANCE,
+                third.id: DetailStatus.PENDING_SAMPLE,  # Sin cambio: no se registra
+            },
+            user=self.user,
+        )
+        self.assertEqual(outcome.applied, 2)
+        self.assertEqual(
+            sorted(
+                ResultDetailEvent.objects.values_list("detail_id", "exam_id", "from_status", "to_status", "created_by")
+            ),
+            [
+                (first.id, first.exam_id, DetailStatus.PENDING_SAMPLE, DetailStatus.SAMPLE_RECEIVED, self.user.id),
+                (second.id, second.exam_id, DetailStatus.PENDING_SAMPLE, DetailStatus.SAMPLE_RECEIVED, self.user.id),
+            ],
+        )
+
+    def test_rejected_transitions_are_not_logged(self):
+        detail = self.result.details.order_by("id").first()
+        apply_transitions({detail.id: DetailStatus.COMPLETED})
+        ResultDetailEvent.objects.all().delete()
+
+        outcome = apply_transitions({detail.id: DetailStatus.SAMPLE_RECEIVED})
+        self.assertEqual(outcome.applied, 0)
+        self.assertEqual(outcome.rejected, [(detail.id, DetailStatus.COMPLETED, DetailStatus.SAMPLE_RECEIVED)])
+        self.assertFalse(ResultDetailEvent.objects.exists())
+
+
+class TurnaroundReportTests(TestCase):
+    """Percentiles de TAT calculados en la base de datos (ver apps.results.reports)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.central = Provider.objects.create(name="Laboratorio Central")
+        cls.glucose = Exam.objects.create(code="EX00001", name="Glucosa", price=10, provider=cls.central)
+        cls.insulin = Exam.objects.create(code="EX00002", name="Insulina", price=20, provider=cls.central)
+        cls.urea = Exam.objects.create(code="EX00003", name="Urea", price=10)
+        cls.day = timezone.make_aware(datetime(2026, 3, 2, 8, 0))
+
+        patient = create_patient()
+        # Glucosa: 1 h, 2 h, 3 h y 4 h; Insulina: 10 min y 30 min; Urea: 5 h
+        spans = [
+            (cls.glucose, timedelta(hours=1)),
+            (cls.glucose, timedelta(hours=2)),
+            (cls.glucose, timedelta(hours=3)),
+            (cls.glucose, timedelta(hours=4)),
+            (cls.insulin, timedelta(minutes=10)),
+            (cls.insulin, timedelta(minutes=30)),
+            (cls.urea, timedelta(hours=5)),
+        ]
+        events = []
+        for exam, span in spans:
+            detail = create_result(patient, [exam]).details.get()
+            events.append(cls.event(detail, DetailStatus.SAMPLE_RECEIVED, cls.day))
+            events.append(cls.event(detail, DetailStatus.COMPLETED, cls.day + span))
+
+        # Saltar a Validado también cuenta como completado
+        detail = create_result(patient, [cls.urea]).details.get()
+        events.append(cls.event(detail, DetailStatus.SAMPLE_RECEIVED, cls.day))
+        events.append(cls.event(detail, DetailStatus.VALIDATED, cls.day + timedelta(hours=7)))
+        # Terminado fuera del rango o sin terminar: no cuentan
+        detail = create_result(patient, [cls.glucose]).details.get()
+        events.append(cls.event(detail, DetailStatus.SAMPLE_RECEIVED, cls.day - timedelta(days=3)))
+        events.append(cls.event(detail, DetailStatus.COMPLETED, cls.day - timedelta(days=2)))
+        detail = create_result(patient, [cls.insulin]).details.get()
+        events.append(cls.event(detail, DetailStatus.SAMPLE_RECEIVED, cls.day))
+        ResultDetailEvent.objects.bulk_create(events)
+
+    @staticmethod
+    def event(detail, to_status, created_at):
+        return ResultDetailEvent(detail=detail, exam_id=detail.exam_id, to_status=to_status, created_at=created_at)
+
+    def report(self, group_by):
+        start = self.day.replace(hour=0)
+        rows = turnaround_report(start, start + timedelta(days=1), group_by=group_by)
+        return {
+            row["group_name"]: (row["count"], [row["percentiles"][p] for p in (0.5, 0.9, 0.99)], row["max"])
+            for row in rows
+        }
+
+    def test_percentiles_by_exam(self):
+        hour, minute = timedelta(hours=1), timedelta(minutes=1)
+        self.assertEqual(
+            self.report("exam"),
+            {
+                "Glucosa": (4, [2 * hour, 4 * hour, 4 * hour], 4 * hour),
+                "Insulina": (2, [10 * minute, 30 * minute, 30 * minute], 30 * minute),
+                "Urea": (2, [5 * hour, 7 * hour, 7 * hour], 7 * hour),
+            },
+        )
+
+    def test_percentiles_by_provider(self):
+        report = self.report("provider")
+        self.assertEqual(set(report), {"Laboratorio Central", None})
+        # Glucosa e Insulina juntas: 10 min, 30 min, 1 h, 2 h, 3 h, 4 h
+        self.assertEqual(
+            report["Laboratorio Central"],
+            (6, [timedelta(hours=1), timedelta(hours=4), timedelta(hours=4)], timedelta(hours=4)),
+        )
+        # Exámenes sin proveedor ("Sin asignar")
+        self.assertEqual(report[None][0], 2)
+
+
+class ResultCounterTests(TestCase):
+    """Los contadores por estado de Result siguen a los detalles (ver _apply_counter_deltas)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exams = [Exam.objects.create(code=f"EX{i:05d}", name=f"Examen {i}", price=10) for i in range(1, 5)]
+        patient = create_patient()
+        cls.results = [create_result(patient, cls.exams), create_result(patient, cls.exams[:2])]
+
+    def assert_counters_match_details(self):
+        for result in Result.objects.all():
+            statuses = list(result.details.values_list("status", flat=True))
+            categories = Counter(state_machine.categorize(status) for status in statuses)
+            with self.subTest(result=result.id):
+                self.assertEqual(
+                    {field: getattr(result, field) for field in state_machine.COUNTER_FIELDS.values()},
+                    {field: categories[category] for category, field in state_machine.COUNTER_FIELDS.items()},
+                )
+                self.assertEqual(result.total_count, len(statuses))
+                self.assertEqual(result.status, state_machine.aggregate(Counter(statuses)))
+
+    def verify(self):
+        output = StringIO()
+        call_command("recalculate_result_counters", "--verify", stdout=output)
+        return output.getvalue()
+
+    def test_counters_follow_creation_transitions_and_deletes(self):
+        self.assert_counters_match_details()
+
+        first = list(self.results[0].details.order_by("id"))
+        second = list(self.results[1].details.order_by("id"))
+        outcome = apply_transitions(
+            {
+                first[0].id: DetailStatus.SAMPLE_RECEIVED,
+                first[1].id: DetailStatus.COMPLETED,
+                first[2].id: DetailStatus.DELIVERED,
+                second[0].id: state_machine.ADVANCE,
+                second[1].id: DetailStatus.VALIDATED,
+            }
+        )
+        self.assertEqual(outcome.applied, 5)
+        self.assert_counters_match_details()
+
+        # Transiciones dentro de la misma categoría, inválidas o sin cambio no mueven los contadores
+        outcome = apply_transitions(
+            {
+                first[0].id: DetailStatus.INTERNAL_ANALYSIS,
+                first[1].id: DetailStatus.SAMPLE_RECEIVED,
+                first[2].id: DetailStatus.DELIVERED,
+                second[1].id: DetailStatus.DELIVERED,
+            }
+        )
+        self.assertEqual(outcome.applied, 2)
+        self.assert_counters_match_details()
+
+        first[3].delete()
+        ResultDetail.objects.get(pk=second[0].pk).delete()
+        self.assert_counters_match_details()
+        self.assertIn("Todos los resultados están sincronizados", self.verify())
+
+    def test_verify_reports_drift_and_recalculate_fixes_it(self):
+        result = self.results[0]
+        Result.objects.filter(pk=result.pk).update(done_count=3, pending_count=1)
+
+        output = self.verify()
+        self.assertIn(f"Resultado {result.id} ({result.order.code}): 1/0/3/0/4 (esperado 4/0/0/0/4)", output)
+        self.assertIn("1 resultados desincronizados", output)
+
+        call_command("recalculate_result_counters", stdout=StringIO())
+        self.assert_counters_match_details()
+        self.assertIn("Todos los resultados están sincronizados", self.verify())
+
+
+class ResultDetailViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bioquimico")
+        Company.objects.create(
+            business_name="Laboratorio",
+            document_number="20123456789",
+            phone_number="999999999",
+            email="lab@example.com",
+            legal_address="Lima",
+        )
+        exams = [Exam.objects.create(code=f"EX{i:05d}", name=f"Examen {i}", price=10) for i in range(1, 4)]
+        patient = create_patient()
+        cls.result = create_result(patient, exams)
+        cls.other_result = create_result(patient, exams[:1])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.details = list(self.result.details.order_by("id"))
+        apply_transitions({self.details[1].id: DetailStatus.COMPLETED})
+
+    def post(self, changes):
+        response = self.client.post(
+            reverse("result_detail", args=[self.result.pk]),
+            {f"detail_{detail_id}_status": status for detail_id, status in changes.items()},
+        )
+        self.assertRedirects(response, reverse("result_detail", args=[self.result.pk]), fetch_redirect_response=False)
+        return [(message.level_tag, message.message) for message in get_messages(response.wsgi_request)]
+
+    def statuses(self):
+        return list(ResultDetail.objects.filter(result=self.result).order_by("id").values_list("status", flat=True))
+
+    def test_mixed_batch_reports_applied_and_rejected_counts(self):
+        other_detail = self.other_result.details.get()
+        messages = self.post(
+            {
+                self.details[0].id: DetailStatus.SAMPLE_RECEIVED,
+                self.details[1].id: DetailStatus.SAMPLE_RECEIVED,  # Completado no vuelve atrás
+                self.details[2].id: DetailStatus.PENDING_SAMPLE,  # Sin cambio
+                other_detail.id: DetailStatus.SAMPLE_RECEIVED,  # De otro resultado: se ignora
+            }
+        )
+        self.assertEqual(
+            messages,
+            [
+                ("success", "1 estados actualizados exitosamente"),
+                ("warning", "1 cambios de estado no son válidos y se ignoraron"),
+            ],
+        )
+        self.assertEqual(
+            self.statuses(), [DetailStatus.SAMPLE_RECEIVED, DetailStatus.COMPLETED, DetailStatus.PENDING_SAMPLE]
+        )
+        self.assertEqual(ResultDetail.objects.get(pk=other_detail.pk).status, DetailStatus.PENDING_SAMPLE)
+
+    def test_batch_with_only_rejected_changes_is_not_reported_as_success(self):
+        messages = self.post({self.details[1].id: DetailStatus.PENDING_SAMPLE})
+        self.assertEqual(messages, [("warning", "1 cambios de estado no son válidos y se ignoraron")])
+
+    def test_batch_without_changes(self):
+        messages = self.post({self.details[0].id: DetailStatus.PENDING_SAMPLE})
+        self.assertEqual(messages, [("info", "No hubo cambios de estado")])
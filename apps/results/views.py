@@ -1,13 +1,35 @@
+import json
+from datetime import datetime, time, timedelta
+
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
 from django.shortcuts import redirect
-from django.urls import reverse_lazy
-from django.views.generic import DetailView, ListView
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+from django.views.generic import DetailView, ListView, TemplateView
 
+from apps.core.pagination import CursorPaginationMixin
+from apps.patients.search import get_backend
+from apps.results import state_machine
 from apps.results.models import Result, ResultDetail
+from apps.results.reports import TAT_GROUPINGS, TAT_PERCENTILES, format_duration, turnaround_report
+from apps.results.services import (
+    WORKLIST_GROUPINGS,
+    WORKLIST_LIMIT,
+    apply_transitions,
+    worklist_details,
+    worklist_groups,
+    worklist_queryset,
+)
+
+# Máximo de detalles por lote en la API de la mesa de trabajo
+WORKLIST_BATCH_LIMIT = 1000
 
 
-class ResultListView(LoginRequiredMixin, ListView):
+class ResultListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Result
     template_name = "results/result_list.html"
     context_object_name = "results"
@@ -15,9 +37,8 @@ class ResultListView(LoginRequiredMixin, ListView):
     login_url = reverse_lazy("login")
 
     def get_queryset(self):
-        from django.db import models
-
-        queryset = Result.objects.select_related("order", "order__patient").prefetch_related("details")
+        # El avance se muestra con los contadores de Result, sin leer los detalles
+        queryset = Result.objects.select_related("order", "order__patient")
 
         # Mapeo de grupos de status por color
         status_groups = {
@@ -36,18 +57,13 @@ class ResultListView(LoginRequiredMixin, ListView):
         if status_group and status_group in status_groups:
             queryset = queryset.filter(status__in=status_groups[status_group])
 
-        # Filtrar por número de documento del paciente
-        document_number = self.request.GET.get("document_number")
-        if document_number:
-            queryset = queryset.filter(order__patient__document_number__icontains=document_number)
-
-        # Filtrar por nombre del paciente (first_name OR last_name)
-        patient_name = self.request.GET.get("patient_name")
-        if patient_name:
-            queryset = queryset.filter(
-                models.Q(order__patient__first_name__icontains=patient_name)
-                | models.Q(order__patient__last_name__icontains=patient_name)
-            )
+        # Filtrar por número de documento y nombre del paciente (índice de búsqueda de pacientes)
+        queryset = get_backend().filter(
+            queryset,
+            name=self.request.GET.get("patient_name", ""),
+            document=self.request.GET.get("document_number", ""),
+            prefix="order__patient__",
+        )
 
         # Filtrar por código de orden
         order_code = self.request.GET.get("order_code")
@@ -78,81 +94,262 @@ class ResultDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Verificar si todos los exámenes están entregados
-        result = self.get_object()
-        all_delivered = all(detail.status == ResultDetail.ExamResultStatus.DELIVERED for detail in result.details.all())
+        # Verificar si todos los exámenes están entregados (detalles ya precargados)
+        all_delivered = all(
+            detail.status == ResultDetail.ExamResultStatus.DELIVERED for detail in self.object.details.all()
+        )
         context["all_delivered"] = all_delivered
         return context
 
     def post(self, request, *args, **kwargs):
-        """Procesar cambios de estado de los detalles"""
-        result = self.get_object()
-
-        # Procesar cada detalle
-        for detail in result.details.all():
-            # Obtener nuevo estado del form
-            new_status = request.POST.get(f"detail_{detail.id}_status")
-            if new_status and new_status != detail.status:
-                # Validar que la transición es válida
-                allowed_statuses = [status for status, label in detail.get_allowed_transitions()]
-                if new_status in allowed_statuses:
-                    detail.status = new_status
-                    detail.save()
-
-        # Recalcular estado general del resultado
-        self._update_result_status(result)
-
-        messages.success(request, "Estados actualizados exitosamente")
-        return redirect("result_detail", pk=result.pk)
-
-    def _update_result_status(self, result):
-        """
-        Actualiza el estado general del resultado basado en los estados de los detalles.
-        La prioridad es de los estados más avanzados a los menos avanzados.
-        """
-        details = result.details.all()
-        if not details.exists():
-            return
-
-        statuses = [d.status for d in details]
-
-        # PRIORIDAD 1: Estados de entrega (más avanzados)
-        # Todos entregados -> DELIVERED
-        if all(s == ResultDetail.ExamResultStatus.DELIVERED for s in statuses):
-            result.status = Result.ResultStatus.DELIVERED
-        # Al menos uno entregado pero no todos -> PARTIAL_DELIVERY
-        elif any(s == ResultDetail.ExamResultStatus.DELIVERED for s in statuses):
-            result.status = Result.ResultStatus.PARTIAL_DELIVERY
-
-        # PRIORIDAD 2: Estados de completado
-        # Todos completados o validados (ninguno entregado) -> COMPLETED
-        elif all(
-            s in [ResultDetail.ExamResultStatus.COMPLETED, ResultDetail.ExamResultStatus.VALIDATED] for s in statuses
-        ):
-            result.status = Result.ResultStatus.COMPLETED
-        # Algunos completados/validados pero no todos -> PARTIAL_RESULTS
-        elif any(
-            s in [ResultDetail.ExamResultStatus.COMPLETED, ResultDetail.ExamResultStatus.VALIDATED] for s in statuses
-        ):
-            result.status = Result.ResultStatus.PARTIAL_RESULTS
-
-        # PRIORIDAD 3: Estados intermedios
-        # Al menos uno en proceso -> IN_PROGRESS
-        elif any(
-            s
-            in [
-                ResultDetail.ExamResultStatus.SAMPLE_RECEIVED,
-                ResultDetail.ExamResultStatus.INTERNAL_ANALYSIS,
-                ResultDetail.ExamResultStatus.SENT_EXTERNAL,
-                ResultDetail.ExamResultStatus.RECEIVED_EXTERNAL,
-            ]
-            for s in statuses
-        ):
-            result.status = Result.ResultStatus.IN_PROGRESS
-
-        # PRIORIDAD 4: Estado inicial
-        # Todos pendiente muestra -> PENDING
-        elif all(s == ResultDetail.ExamResultStatus.PENDING_SAMPLE for s in statuses):
-            result.status = Result.ResultStatus.PENDING
-
-        result.save()
+        """Procesar cambios de estado de los detalles como un solo lote"""
+        changes = {}
+        for key, new_status in request.POST.items():
+            # Campos con formato detail_<id>_status
+            if key.startswith("detail_") and key.endswith("_status") and new_status:
+                try:
+                    changes[int(key[len("detail_") : -len("_status")])] = new_status
+                except ValueError:
+                    continue
+
+        # Solo se pueden modificar detalles de este resultado
+        outcome = apply_transitions(
+            changes, scope=ResultDetail.objects.filter(result_id=kwargs["pk"]), user=request.user
+        )
+
+        if outcome.applied:
+            messages.success(request, f"{outcome.applied} estados actualizados exitosamente")
+        if outcome.rejected:
+            messages.warning(request, f"{len(outcome.rejected)} cambios de estado no son válidos y se ignoraron")
+        if not outcome.applied and not outcome.rejected:
+            messages.info(request, "No hubo cambios de estado")
+        return redirect("result_detail", pk=kwargs["pk"])
+
+
+def _worklist_filters(params):
+    """
+    Lee los filtros de la mesa de trabajo desde GET.
+
+    Returns:
+        tuple (group_by, status, group_selected, group_id); group_id es None para
+        los exámenes sin categoría ("none")
+    """
+    group_by = params.get("group_by", "exam")
+    if group_by not in WORKLIST_GROUPINGS:
+        group_by = "exam"
+
+    status = params.get("status", "")
+    if status not in state_machine.CATEGORY_BY_STATUS or status == ResultDetail.ExamResultStatus.DELIVERED:
+        status = ""
+
+    group = params.get("group", "")
+    if group == "none":
+        return group_by, status, True, None
+    try:
+        return group_by, status, True, int(group)
+    except ValueError:
+        return group_by, status, False, None
+
+
+class WorklistView(LoginRequiredMixin, TemplateView):
+    """
+    Mesa de trabajo: detalles pendientes de todas las órdenes agrupados por examen
+    o categoría, con cambio de estado en lote sobre los seleccionados.
+    """
+
+    template_name = "results/worklist.html"
+    login_url = reverse_lazy("login")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        group_by, status, group_selected, group_id = _worklist_filters(self.request.GET)
+        queryset = worklist_queryset([status] if status else None)
+
+        groups = worklist_groups(queryset, group_by)
+        context["groups"] = groups
+        context["group_by"] = group_by
+        context["status"] = status
+        context["status_choices"] = [
+            choice
+            for choice in ResultDetail.ExamResultStatus.choices
+            if choice[0] != ResultDetail.ExamResultStatus.DELIVERED
+        ]
+        context["target_choices"] = context["status_choices"][1:] + [
+            (ResultDetail.ExamResultStatus.DELIVERED.value, ResultDetail.ExamResultStatus.DELIVERED.label)
+        ]
+        context["advance"] = state_machine.ADVANCE
+        context["group_selected"] = group_selected
+        context["group"] = "none" if group_selected and group_id is None else group_id
+        context["details"] = worklist_details(queryset, group_by, group_id) if group_selected else []
+        context["limit"] = WORKLIST_LIMIT
+        context["selected_group"] = next(
+            (group for group in groups if group_selected and group["id"] == group_id), None
+        )
+        return context
+
+    def post(self, request, *args, **kwargs):
+        """Aplica el estado elegido (o el siguiente paso) a todos los detalles seleccionados"""
+        target = request.POST.get("target", "")
+        detail_ids = []
+        for value in request.POST.getlist("detail_ids"):
+            try:
+                detail_ids.append(int(value))
+            except ValueError:
+                continue
+
+        if not target or not detail_ids:
+            messages.warning(request, "Seleccione al menos un examen y el estado a aplicar")
+        else:
+            outcome = apply_transitions(dict.fromkeys(detail_ids, target), scope=worklist_queryset(), user=request.user)
+            if outcome.rejected:
+                messages.warning(
+                    request, f"{len(outcome.rejected)} exámenes no admiten ese cambio de estado y se omitieron"
+                )
+            messages.success(
+                request, f"{outcome.applied} exámenes actualizados en {len(outcome.result_ids)} resultados"
+            )
+
+        url = reverse("results_worklist")
+        if request.GET:
+            url = f"{url}?{request.GET.urlencode()}"
+        return redirect(url)
+
+
+@login_required
+@require_GET
+def worklist_api(request):
+    """
+    API de la mesa de trabajo.
+
+    Sin "group" retorna el resumen de grupos; con "group" también los detalles del
+    grupo (máximo WORKLIST_LIMIT, del más antiguo al más reciente).
+    """
+    group_by, status, group_selected, group_id = _worklist_filters(request.GET)
+    queryset = worklist_queryset([status] if status else None)
+
+    groups_data = [
+        {
+            "id": group["id"],
+            "code": group["code"],
+            "name": group["name"] or "Sin categoría",
+            "count": group["count"],
+            "oldest": group["oldest"].isoformat() if group["oldest"] else None,
+        }
+        for group in worklist_groups(queryset, group_by)
+    ]
+
+    details_data = []
+    if group_selected:
+        for detail in worklist_details(queryset, group_by, group_id):
+            patient = detail.result.order.patient
+            details_data.append(
+                {
+                    "id": detail.id,
+                    "result_id": detail.result_id,
+                    "order_code": detail.result.order.code,
+                    "patient": f"{patient.last_name}, {patient.first_name}",
+                    "exam_id": detail.exam_id,
+                    "exam_name": detail.exam.name,
+                    "status": detail.status,
+                    "next_status": state_machine.next_status(detail.status),
+                    "created_at": detail.created_at.isoformat(),
+                }
+            )
+
+    return JsonResponse({"group_by": group_by, "groups": groups_data, "details": details_data})
+
+
+@login_required
+@require_POST
+def worklist_transition_api(request):
+    """
+    API para cambiar el estado de varios detalles en un lote.
+
+    Body JSON: {"detail_ids": [1, 2, ...], "status": "<estado>" o "next"}
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+
+    detail_ids = data.get("detail_ids") or []
+    target = data.get("status", "")
+
+    if not isinstance(detail_ids, list) or not all(isinstance(detail_id, int) for detail_id in detail_ids):
+        return JsonResponse({"error": "detail_ids debe ser una lista de ids"}, status=400)
+    if not detail_ids:
+        return JsonResponse({"error": "Debe seleccionar al menos un examen"}, status=400)
+    if len(detail_ids) > WORKLIST_BATCH_LIMIT:
+        return JsonResponse({"error": f"Máximo {WORKLIST_BATCH_LIMIT} exámenes por lote"}, status=400)
+    if target != state_machine.ADVANCE and target not in state_machine.CATEGORY_BY_STATUS:
+        return JsonResponse({"error": "Estado inválido"}, status=400)
+
+    outcome = apply_transitions(dict.fromkeys(detail_ids, target), scope=worklist_queryset(), user=request.user)
+
+    return JsonResponse(
+        {
+            "applied": outcome.applied,
+            "rejected": [
+                {"id": detail_id, "status": status, "requested": requested}
+                for detail_id, status, requested in outcome.rejected
+            ],
+            "results": sorted(outcome.result_ids),
+        }
+    )
+
+
+class TurnaroundReportView(LoginRequiredMixin, TemplateView):
+    """Percentiles del tiempo de atención por examen, categoría o proveedor en un rango de fechas"""
+
+    template_name = "results/turnaround_report.html"
+    login_url = reverse_lazy("login")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET
+        today = timezone.localdate()
+
+        date_from = self._parse_date(params.get("date_from"), today - timedelta(days=29))
+        date_to = self._parse_date(params.get("date_to"), today)
+        group_by = params.get("group_by", "exam")
+        if group_by not in TAT_GROUPINGS:
+            group_by = "exam"
+        start = params.get("start", ResultDetail.ExamResultStatus.SAMPLE_RECEIVED)
+        end = params.get("end", ResultDetail.ExamResultStatus.COMPLETED)
+        if start not in state_machine.CATEGORY_BY_STATUS:
+            start = ResultDetail.ExamResultStatus.SAMPLE_RECEIVED
+        if end not in state_machine.CATEGORY_BY_STATUS:
+            end = ResultDetail.ExamResultStatus.COMPLETED
+
+        # Rango por fecha de fin: desde el inicio de date_from hasta el fin de date_to
+        report = turnaround_report(
+            timezone.make_aware(datetime.combine(date_from, time.min)),
+            timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)),
+            group_by=group_by,
+            start=start,
+            end=end,
+        )
+
+        context["rows"] = [
+            {
+                "name": row["group_name"] or "Sin asignar",
+                "count": row["count"],
+                "percentiles": [format_duration(row["percentiles"][p]) for p in TAT_PERCENTILES],
+                "max": format_duration(row["max"]),
+            }
+            for row in report
+        ]
+        context["percentile_labels"] = [f"p{round(p * 100)}" for p in TAT_PERCENTILES]
+        context["date_from"] = date_from.isoformat()
+        context["date_to"] = date_to.isoformat()
+        context["group_by"] = group_by
+        context["start"] = start
+        context["end"] = end
+        context["status_choices"] = ResultDetail.ExamResultStatus.choices
+        return context
+
+    def _parse_date(self, value, default):
+        try:
+            return datetime.strptime(value or "", "%Y-%m-%d").date()
+        except ValueError:
+            return default
@@ -0,0 +1,47 @@
+#!/bin/bash
+# Proceso del contenedor según PROCESS_TYPE:
+#   web            - gunicorn
+#   import-worker  - run_import_worker (importaciones de planillas)
+#   export-worker  - run_export_worker (exportaciones a Excel)
+#   pdf-renderer   - run_pdf_renderer (escucha en PDF_RENDER_LISTEN o PDF_RENDER_ADDRESS)
+#   all            - todos los anteriores en el mismo contenedor (por defecto)
+#
+# Con servicios separados (ver docker-compose.yml) la web y los workers deben
+# compartir MEDIA_ROOT (/app/mediafiles): la web guarda ahí las planillas subidas
+# y los workers los reportes y exportaciones que la web descarga.
+set -euo pipefail
+
+case "${PROCESS_TYPE:-all}" in
+    web)
+        exec uv run gunicorn --config gunicorn.conf.py libre_lims.wsgi:application
+        ;;
+    import-worker)
+        exec uv run python manage.py run_import_worker
+        ;;
+    export-worker)
+        exec uv run python manage.py run_export_worker
+        ;;
+    pdf-renderer)
+        exec uv run python manage.py run_pdf_renderer --address "${PDF_RENDER_LISTEN:-${PDF_RENDER_ADDRESS:-}}"
+        ;;
+    all)
+        # El servicio de PDFs escucha en un socket local del contenedor
+        export PDF_RENDER_ADDRESS="${PDF_RENDER_ADDRESS:-unix:/tmp/libre-lims-pdf.sock}"
+        uv run python manage.py run_pdf_renderer &
+        uv run python manage.py run_import_worker &
+        uv run python manage.py run_export_worker &
+        uv run gunicorn --config gunicorn.conf.py libre_lims.wsgi:application &
+        # Si un proceso termina se detienen los demás, para que el orquestador reinicie el contenedor
+        trap 'kill $(jobs -p) 2>/dev/null || true' EXIT
+        trap 'exit 143' TERM INT
+        set +e
+        wait -n
+        status=$?
+        echo "Un proceso del contenedor terminó (código ${status}), deteniendo los demás" >&2
+        exit "${status}"
+        ;;
+    *)
+        echo "PROCESS_TYPE desconocido: ${PROCESS_TYPE} (web, import-worker, export-worker, pdf-renderer o all)" >&2
+        exit 64
+        ;;
+esac
@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "apps.core",
     "apps.patients",
     "apps.exams",
     "apps.orders",
@@ -62,6 +63,8 @@ INSTALLED_APPS = [
     "apps.billing",
     "apps.pricing",
     "apps.referrals",
+    "apps.exports",
+    "apps.imports",
 ]
 
 MIDDLEWARE = [
@@ -108,6 +111,20 @@ DATABASES = {
     )
 }
 
+# Búsqueda de pacientes por trigramas (pg_trgm), ver apps.patients.search
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    INSTALLED_APPS.append("django.contrib.postgres")
+
+# Ruta a una subclase de apps.patients.search.PatientSearchBackend; vacío para elegirla según el motor
+PATIENT_SEARCH_BACKEND = os.environ.get("PATIENT_SEARCH_BACKEND", "")
+
+
+# Catálogo de exámenes en memoria: cada cuántos segundos se verifica su versión (apps.exams.catalog)
+EXAM_CATALOG_CHECK_SECONDS = float(os.environ.get("EXAM_CATALOG_CHECK_SECONDS", "2"))
+
+# Caché de precios por tarifario: cada cuántos segundos se verifica su versión (apps.pricing.cache)
+PRICE_CACHE_CHECK_SECONDS = float(os.environ.get("PRICE_CACHE_CHECK_SECONDS", "2"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,6 +168,30 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "mediafiles"
 
+# Caché en disco de PDFs (tickets y formularios de resultados)
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+# Servicio de renderizado de PDFs (comando run_pdf_renderer)
+# "unix:/ruta/al/socket" o "host:puerto"; vacío para renderizar en el worker web
+PDF_RENDER_ADDRESS = os.environ.get("PDF_RENDER_ADDRESS", "")
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_MAX_QUEUE = int(os.environ.get("PDF_RENDER_MAX_QUEUE", "20"))
+# Segundos de espera por un PDF; debe quedar bajo el timeout de gunicorn (30 s)
+PDF_RENDER_TIMEOUT = int(os.environ.get("PDF_RENDER_TIMEOUT", "25"))
+
+# Exportaciones en segundo plano (comando run_export_worker)
+EXPORT_JOB_TTL_HOURS = int(os.environ.get("EXPORT_JOB_TTL_HOURS", "24"))
+EXPORT_WORKER_POLL_SECONDS = int(os.environ.get("EXPORT_WORKER_POLL_SECONDS", "2"))
+# Un job en proceso sin avance en este tiempo se considera abandonado (worker detenido) y se retoma
+EXPORT_JOB_STALE_MINUTES = int(os.environ.get("EXPORT_JOB_STALE_MINUTES", "15"))
+# Cada cuánto el worker marca como vivo el job en proceso; debe quedar muy por debajo del anterior
+EXPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get("EXPORT_JOB_HEARTBEAT_SECONDS", "60"))
+
+# Importaciones de planillas en segundo plano (comando run_import_worker)
+IMPORT_WORKER_POLL_SECONDS = int(os.environ.get("IMPORT_WORKER_POLL_SECONDS", "2"))
+# Un job en proceso sin avance en este tiempo se considera abandonado (worker detenido) y se reanuda
+IMPORT_JOB_STALE_MINUTES = int(os.environ.get("IMPORT_JOB_STALE_MINUTES", "15"))
+
 # WhiteNoise configuration
 STORAGES = {
     "default": {
@@ -41,6 +41,7 @@ from apps.orders.views import (
     create_order_api,
     create_referral_order_api,
     download_orders_excel,
+    pdf_cache_stats_api,
     search_referrals_api,
 )
 from apps.patients.views import (
@@ -58,7 +59,14 @@ from apps.patients.views import (
     patient_details_api,
     search_patient_api,
 )
-from apps.results.views import ResultDetailView, ResultListView
+from apps.results.views import (
+    ResultDetailView,
+    ResultListView,
+    TurnaroundReportView,
+    WorklistView,
+    worklist_api,
+    worklist_transition_api,
+)
 
 
 def health_check(request):
@@ -81,6 +89,8 @@ urlpatterns = [
     path("orders/<int:pk>/results-form/", OrderResultsFormView.as_view(), name="order_results_form"),
     path("results/", ResultListView.as_view(), name="results_list"),
     path("results/<int:pk>/", ResultDetailView.as_view(), name="result_detail"),
+    path("results/worklist/", WorklistView.as_view(), name="results_worklist"),
+    path("results/turnaround/", TurnaroundReportView.as_view(), name="results_turnaround"),
     path("patients/", PatientsListView.as_view(), name="patients_list"),
     path("patients/create/", CreatePatientView.as_view(), name="patients_create"),
     path("patients/<int:pk>/update/", UpdatePatientView.as_view(), name="patients_update"),
@@ -102,7 +112,12 @@ urlpatterns = [
     path("api/exams/search/", search_exams_api, name="api_exams_search"),
     path("api/orders/create/", create_order_api, name="api_orders_create"),
     path("api/orders/referral/create/", create_referral_order_api, name="api_referral_orders_create"),
+    path("api/orders/pdf-cache-stats/", pdf_cache_stats_api, name="api_orders_pdf_cache_stats"),
+    path("api/results/worklist/", worklist_api, name="api_results_worklist"),
+    path("api/results/worklist/transition/", worklist_transition_api, name="api_results_worklist_transition"),
     path("api/referrals/search/", search_referrals_api, name="api_referrals_search"),
     path("company/", include("apps.billing.urls")),
     path("pricing/", include("apps.pricing.urls")),
+    path("exports/", include("apps.exports.urls")),
+    path("imports/", include("apps.imports.urls")),
 ]